@@ -0,0 +1,55 @@
+"""Gunicorn settings for multi-worker deployments.
+
+The app is imported once in the master (`preload_app`) and the RAG index is loaded there
+before the workers are forked, so the workers share one copy of it (copy-on-write) and only
+the master ever builds a missing index. Workers still pick up newly published index bundles
+on their own (see `RAG_INDEX_RELOAD_ENABLED`).
+
+Prometheus metrics run in multiprocess mode so /metrics aggregates all workers, not just the
+one that serves the scrape.
+"""
+
+import glob
+import os
+import tempfile
+
+from src.config import settings
+
+# like gunicorn's own default, listen on the platform-assigned $PORT when set
+bind = os.getenv("BIND") or f"0.0.0.0:{os.getenv('PORT', '8001')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = settings.RAG_PRELOAD_BEFORE_FORK
+
+# must be set before prometheus_client is imported, i.e. before the (preloaded) app
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "rag-prometheus"))
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+
+def on_starting(server):
+    # drop metric files of earlier runs; a preloaded master has already written its own
+    for path in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+        if not path.endswith(f"_{os.getpid()}.db"):
+            os.remove(path)
+
+
+def when_ready(server):
+    # runs in the master after the preloaded app was imported, before any worker is forked
+    if preload_app:
+        from src.chat.rag import prepare_for_fork
+
+        if prepare_for_fork() is None:
+            server.log.warning("RAG components could not be preloaded, workers will load them on their own")
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from src.chat.rag import reinit_after_fork
+
+        reinit_after_fork()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
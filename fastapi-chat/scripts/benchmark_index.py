@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark FAISS index types against the exact (flat) index.
+
+Reports recall@k, p50/p99 single-query search latency, build time and index
+memory for each configuration, so an index setting can be chosen with evidence.
+
+Examples:
+    python scripts/benchmark_index.py
+    python scripts/benchmark_index.py --synthetic 200000 --configs flat ivf:nlist=1024,nprobe=16 hnsw sq8
+"""
+
+import os
+import sys
+
+# Add the parent directory to the path to import from src
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import json
+import logging
+import time
+
+import faiss
+import numpy as np
+
+from src.chat.index_factory import IndexSpec, build_index
+from src.chat.rag import current_index_bundle
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIGS = [
+    "flat",
+    "ivf:nlist=64,nprobe=4",
+    "ivf:nlist=64,nprobe=16",
+    "hnsw:hnsw_m=32,ef_search=64",
+    "sq8",
+    "ivf_sq8:nlist=64,nprobe=16",
+]
+
+
+def load_vectors(args) -> np.ndarray:
+    """Base vectors: synthetic clusters, an .npy file or the vectors of the current index."""
+    if args.synthetic:
+        rng = np.random.default_rng(args.seed)
+        centers = rng.standard_normal((max(1, args.synthetic // 100), args.dim)).astype("float32")
+        assignments = rng.integers(0, len(centers), args.synthetic)
+        vectors = centers[assignments] + 0.3 * rng.standard_normal((args.synthetic, args.dim)).astype("float32")
+    elif args.embeddings:
+        vectors = np.load(args.embeddings).astype("float32")
+    else:
+        index = faiss.read_index(current_index_bundle().faiss_index_path)
+        vectors = index.reconstruct_n(0, index.ntotal)
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def make_queries(vectors: np.ndarray, count: int, noise: float, seed: int) -> np.ndarray:
+    """Perturbed knowledge base vectors, standing in for paraphrased customer questions."""
+    rng = np.random.default_rng(seed + 1)
+    queries = vectors[rng.integers(0, len(vectors), count)]
+    queries = queries + noise * rng.standard_normal(queries.shape).astype("float32")
+    queries = np.ascontiguousarray(queries, dtype="float32")
+    faiss.normalize_L2(queries)
+    return queries
+
+
+def benchmark(spec: IndexSpec, vectors: np.ndarray, queries: np.ndarray, ground_truth: np.ndarray, k: int) -> dict:
+    start_time = time.perf_counter()
+    index = build_index(vectors.copy(), spec)
+    build_s = time.perf_counter() - start_time
+
+    latencies_ms = []
+    found = np.empty((len(queries), k), dtype=np.int64)
+    for i, query in enumerate(queries):
+        start_time = time.perf_counter()
+        _, ids = index.search(query.reshape(1, -1), k)
+        latencies_ms.append((time.perf_counter() - start_time) * 1000)
+        found[i] = ids[0]
+
+    recall = np.mean([len(set(found[i]) & set(ground_truth[i])) / k for i in range(len(queries))])
+    return {
+        "config": spec.label,
+        "index_type": spec.index_type,
+        "params": {key: value for key, value in vars(spec).items() if key != "index_type"},
+        f"recall@{k}": round(float(recall), 4),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 3),
+        "build_s": round(build_s, 3),
+        "memory_mb": round(len(faiss.serialize_index(index)) / (1024 * 1024), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FAISS index types (recall, latency, memory).")
+    parser.add_argument(
+        "--configs",
+        nargs="+",
+        default=DEFAULT_CONFIGS,
+        help='Index specs, e.g. "flat" "ivf:nlist=256,nprobe=16" "hnsw:hnsw_m=32,ef_search=128".',
+    )
+    parser.add_argument("--embeddings", help="Path to an .npy file with base vectors (default: current index).")
+    parser.add_argument("--synthetic", type=int, default=0, help="Benchmark on N synthetic clustered vectors.")
+    parser.add_argument("--dim", type=int, default=1024, help="Dimension of synthetic vectors (bge-m3: 1024).")
+    parser.add_argument("--queries", type=int, default=500, help="Number of queries.")
+    parser.add_argument("--noise", type=float, default=0.05, help="Gaussian noise added to query vectors.")
+    parser.add_argument("-k", type=int, default=5, help="Neighbours per query (recall@k).")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    args = parser.parse_args()
+
+    vectors = load_vectors(args)
+    queries = make_queries(vectors, args.queries, args.noise, args.seed)
+    print(f"Base vectors: {vectors.shape[0]} x {vectors.shape[1]}, queries: {len(queries)}, k={args.k}")
+
+    exact = faiss.IndexFlatIP(vectors.shape[1])
+    exact.add(vectors)
+    _, ground_truth = exact.search(queries, args.k)
+
+    results = []
+    print(f"\n{'config':<42} {'recall@' + str(args.k):>9} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8} {'MB':>8}")
+    print("-" * 88)
+    for config in args.configs:
+        result = benchmark(IndexSpec.parse(config), vectors, queries, ground_truth, args.k)
+        results.append(result)
+        print(
+            f"{result['config']:<42} {result[f'recall@{args.k}']:>9.4f} {result['p50_ms']:>8.3f} "
+            f"{result['p99_ms']:>8.3f} {result['build_s']:>8.2f} {result['memory_mb']:>8.2f}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "vectors": int(vectors.shape[0]),
+                    "dimension": int(vectors.shape[1]),
+                    "queries": len(queries),
+                    "k": args.k,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+        print(f"\nResults written to {args.output}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
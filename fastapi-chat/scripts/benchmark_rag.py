@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark of the multi-level RAG pipeline.
+
+Replays a query corpus built from the knowledge base (exact questions, perturbed variants
+and out-of-domain text) concurrently against `generate_hint_async` (or `generate_hint` in
+threads) and reports throughput, p50/p95/p99 latency per route and per query kind, Scibox
+API calls per query and cache hit rates. Results can be written as JSON to compare runs.
+
+Examples:
+    python scripts/benchmark_rag.py --offline --concurrency 32 --output bench.json
+    python scripts/benchmark_rag.py --mode sync --concurrency 8 --repeat 2
+"""
+
+import os
+import sys
+
+# Add the parent directory to the path to import from src
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+OUT_OF_DOMAIN = [
+    "Какая погода будет завтра в Минске?",
+    "Посоветуйте рецепт борща",
+    "Кто выиграл чемпионат мира по футболу?",
+    "Как настроить wi-fi роутер дома?",
+    "Сколько стоит билет в кино?",
+    "Привет, как дела?",
+    "Расскажи анекдот",
+    "Во сколько открывается зоопарк?",
+    "Как выучить английский за месяц?",
+    "Какой фильм посмотреть вечером?",
+    "Где купить зимние шины?",
+    "Как приготовить кофе в турке?",
+]
+
+FILLERS_BEFORE = ["Здравствуйте!", "Подскажите, пожалуйста,", "Скажите,", "Добрый день,"]
+FILLERS_AFTER = ["пожалуйста", "срочно", "спасибо", "заранее спасибо"]
+
+
+def perturb(question: str, rng: random.Random) -> str:
+    """Paraphrase-like noise: a typo, a dropped word, filler words or lost case and punctuation."""
+    words = question.split()
+    kind = rng.choice(["typo", "drop", "filler", "case"])
+    if kind == "typo":
+        candidates = [i for i, word in enumerate(words) if len(word) > 3]
+        if candidates:
+            i = rng.choice(candidates)
+            word = words[i]
+            pos = rng.randrange(1, len(word) - 1)
+            if rng.random() < 0.5:
+                words[i] = word[:pos] + word[pos + 1 :]
+            else:
+                words[i] = word[: pos - 1] + word[pos] + word[pos - 1] + word[pos + 1 :]
+    elif kind == "drop" and len(words) > 3:
+        del words[rng.randrange(len(words))]
+    elif kind == "filler":
+        if rng.random() < 0.5:
+            words = [rng.choice(FILLERS_BEFORE)] + words
+        else:
+            words = words + [rng.choice(FILLERS_AFTER)]
+    else:
+        return question.lower().rstrip("?!. ")
+    return " ".join(words)
+
+
+def build_corpus(questions: List[str], exact: int, perturbed: int, ood: int, seed: int) -> List[Tuple[str, str]]:
+    """(kind, query) pairs: exact KB questions, perturbed KB questions and out-of-domain text."""
+    rng = random.Random(seed)
+    corpus = [("exact", question) for question in rng.sample(questions, min(exact, len(questions)))]
+    corpus += [("perturbed", perturb(rng.choice(questions), rng)) for _ in range(perturbed)]
+    corpus += [
+        (
+            "out_of_domain",
+            rng.choice(OUT_OF_DOMAIN)
+            if i < len(OUT_OF_DOMAIN)
+            else f"{rng.choice(OUT_OF_DOMAIN)} {rng.choice(OUT_OF_DOMAIN)}",
+        )
+        for i in range(ood)
+    ]
+    rng.shuffle(corpus)
+    return corpus
+
+
+def percentiles(latencies_ms: List[float]) -> Dict[str, float]:
+    values = np.asarray(latencies_ms)
+    return {
+        "count": len(values),
+        "mean_ms": round(float(values.mean()), 2),
+        "p50_ms": round(float(np.percentile(values, 50)), 2),
+        "p95_ms": round(float(np.percentile(values, 95)), 2),
+        "p99_ms": round(float(np.percentile(values, 99)), 2),
+        "max_ms": round(float(values.max()), 2),
+    }
+
+
+async def replay_async(rag, queries: List[Tuple[str, str]], concurrency: int) -> List[Tuple[str, str, float]]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(kind: str, query: str) -> Tuple[str, str, float]:
+        async with semaphore:
+            start_time = time.perf_counter()
+            hint = await rag.generate_hint_async(query)
+            return kind, hint.route, (time.perf_counter() - start_time) * 1000
+
+    return await asyncio.gather(*[run(kind, query) for kind, query in queries])
+
+
+def replay_sync(rag, queries: List[Tuple[str, str]], concurrency: int) -> List[Tuple[str, str, float]]:
+    def run(item: Tuple[str, str]) -> Tuple[str, str, float]:
+        kind, query = item
+        start_time = time.perf_counter()
+        hint = rag.generate_hint(query)
+        return kind, hint.route, (time.perf_counter() - start_time) * 1000
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(run, queries))
+
+
+def git_commit() -> str:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the multi-level RAG hint pipeline.")
+    parser.add_argument(
+        "--mode",
+        choices=["async", "sync"],
+        default="async",
+        help="async: generate_hint_async on one event loop; sync: generate_hint in threads.",
+    )
+    parser.add_argument("--concurrency", type=int, default=16, help="Queries in flight.")
+    parser.add_argument("--exact", type=int, default=100, help="Exact knowledge base questions.")
+    parser.add_argument("--perturbed", type=int, default=200, help="Perturbed knowledge base questions.")
+    parser.add_argument("--ood", type=int, default=50, help="Out-of-domain queries.")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the corpus this many times (warm caches).")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--offline", action="store_true", help="Use the offline Scibox stand-in.")
+    parser.add_argument("--no-redis", action="store_true", help="Disable the Redis tier of the embedding cache.")
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    args = parser.parse_args()
+
+    # settings are read when src is imported
+    if args.offline:
+        os.environ["SCIBOX_OFFLINE"] = "true"
+    if args.no_redis:
+        os.environ["RAG_EMBEDDING_CACHE_REDIS_ENABLED"] = "false"
+    from src.chat import rag
+    from src.config import settings
+
+    start_time = time.perf_counter()
+    components = rag.rag_registry.load()
+    if components is None:
+        print(f"RAG components failed to load: {rag.rag_registry.error}")
+        return 1
+    load_ms = (time.perf_counter() - start_time) * 1000
+
+    questions = [item["question"] for item in components.dataset_metadata if item["question"]]
+    corpus = build_corpus(questions, args.exact, args.perturbed, args.ood, args.seed)
+    queries = corpus * args.repeat
+    print(
+        f"Components loaded in {load_ms:.0f}ms; replaying {len(queries)} queries "
+        f"({args.mode}, concurrency {args.concurrency})..."
+    )
+
+    calls_before = Counter(rag.scibox_calls)
+    start_time = time.perf_counter()
+    if args.mode == "async":
+        results = asyncio.run(replay_async(rag, queries, args.concurrency))
+    else:
+        results = replay_sync(rag, queries, args.concurrency)
+    elapsed_s = time.perf_counter() - start_time
+    api_calls = {endpoint: count - calls_before[endpoint] for endpoint, count in rag.scibox_calls.items()}
+
+    by_route: Dict[str, List[float]] = defaultdict(list)
+    by_kind: Dict[str, List[float]] = defaultdict(list)
+    route_mix: Dict[str, Counter] = defaultdict(Counter)
+    for kind, route, latency_ms in results:
+        by_route[route].append(latency_ms)
+        by_kind[kind].append(latency_ms)
+        route_mix[kind][route] += 1
+
+    caches = {
+        "embedding_cache": rag.embedding_cache.stats() if rag.embedding_cache is not None else None,
+        "rerank_cache": rag.rerank_cache.stats() if rag.rerank_cache is not None else None,
+        "fuzzy_match": components.fuzzy_matcher.stats() if components.fuzzy_matcher is not None else None,
+    }
+    if hasattr(components.async_embedding_model, "stats"):
+        caches["embedding_batching"] = components.async_embedding_model.stats()
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.time(),
+        "mode": args.mode,
+        "concurrency": args.concurrency,
+        "offline": rag.is_offline(),
+        "queries": len(results),
+        "load_ms": round(load_ms, 1),
+        "elapsed_s": round(elapsed_s, 3),
+        "throughput_qps": round(len(results) / elapsed_s, 2),
+        "latency": percentiles([latency_ms for _, _, latency_ms in results]),
+        "routes": {route: percentiles(latencies) for route, latencies in sorted(by_route.items())},
+        "kinds": {kind: percentiles(latencies) for kind, latencies in sorted(by_kind.items())},
+        "route_mix": {kind: dict(counts) for kind, counts in route_mix.items()},
+        "api_calls": api_calls,
+        "api_calls_per_query": round(sum(api_calls.values()) / len(results), 3),
+        "caches": caches,
+        "settings": {name: value for name, value in settings.model_dump().items() if name.startswith("RAG_")},
+    }
+
+    print(
+        f"\nThroughput: {report['throughput_qps']} queries/s, "
+        f"{report['api_calls_per_query']} API calls/query {api_calls}"
+    )
+    print(f"\n{'route / kind':<36} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    print("-" * 72)
+    for section in ("routes", "kinds"):
+        for name, stats in report[section].items():
+            print(
+                f"{name:<36} {stats['count']:>6} "
+                f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}"
+            )
+        print("-" * 72)
+    for kind, counts in report["route_mix"].items():
+        print(f"{kind}: {dict(counts)}")
+    for name, stats in caches.items():
+        if stats is not None:
+            print(f"{name}: {stats}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
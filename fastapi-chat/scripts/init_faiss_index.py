@@ -3,17 +3,28 @@
 Script to initialize FAISS index from smart_support.xlsx dataset.
 This script should be run once before starting the FastAPI server.
 """
-import sys
 import os
+import sys
 
 # Add the parent directory to the path to import from src
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.chat.rag import create_faiss_index, SciboxEmbeddings, DATASET_PATH, FAISS_INDEX_PATH, METADATA_PATH
-from src.config import settings
-from openai import OpenAI
-import logging
 import argparse
+import logging
+
+from src.chat.index_factory import INDEX_TYPES, IndexSpec
+from src.chat.rag import (
+    DATASET_PATH,
+    EMBEDDING_STORE_PATH,
+    SciboxEmbeddings,
+    create_client,
+    create_faiss_index,
+    current_index_bundle,
+    ensure_index_bundle,
+    load_metadata,
+    read_faiss_index,
+)
+from src.config import settings
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -22,22 +33,41 @@ def main():
     """Initialize FAISS index from dataset."""
     parser = argparse.ArgumentParser(description="Initialize FAISS index.")
     parser.add_argument("--recreate", action="store_true", help="Recreate the index if it already exists.")
+    parser.add_argument("--dataset", default=DATASET_PATH,
+                        help="Knowledge base export to index (.xlsx, .csv or .parquet).")
+    parser.add_argument("--full", action="store_true",
+                        help="Re-embed every question instead of reusing stored embeddings of unchanged ones.")
+    defaults = IndexSpec.from_settings()
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=defaults.index_type, help="FAISS index type.")
+    parser.add_argument("--nlist", type=int, default=defaults.nlist, help="IVF: number of inverted lists.")
+    parser.add_argument("--nprobe", type=int, default=defaults.nprobe, help="IVF: lists probed per query.")
+    parser.add_argument("--hnsw-m", type=int, default=defaults.hnsw_m, help="HNSW: graph degree M.")
+    parser.add_argument("--ef-construction", type=int, default=defaults.ef_construction, help="HNSW: efConstruction.")
+    parser.add_argument("--ef-search", type=int, default=defaults.ef_search, help="HNSW: efSearch.")
     args = parser.parse_args()
+    index_spec = IndexSpec(
+        index_type=args.index_type,
+        nlist=args.nlist,
+        nprobe=args.nprobe,
+        hnsw_m=args.hnsw_m,
+        ef_construction=args.ef_construction,
+        ef_search=args.ef_search,
+    )
 
     logger.info("=" * 80)
     logger.info("FAISS INDEX INITIALIZATION")
     logger.info("=" * 80)
     
     # Check if dataset exists
-    if not os.path.exists(DATASET_PATH):
-        logger.error(f"Dataset not found at {DATASET_PATH}")
+    if not os.path.exists(args.dataset):
+        logger.error(f"Dataset not found at {args.dataset}")
         logger.error("Please ensure smart_support.xlsx is in the data/ directory")
         return 1
     
-    logger.info(f"✓ Dataset found: {DATASET_PATH}")
+    logger.info(f"✓ Dataset found: {args.dataset}")
     
     # Check if index already exists
-    if os.path.exists(FAISS_INDEX_PATH) and os.path.exists(METADATA_PATH):
+    if current_index_bundle().exists():
         if not args.recreate:
             logger.info("FAISS index already exists. Skipping creation. Use --recreate to overwrite.")
             return 0
@@ -46,10 +76,7 @@ def main():
     try:
         # Initialize OpenAI client for Scibox API
         logger.info(f"Connecting to Scibox API: {settings.SCIBOX_BASE_URL}")
-        client = OpenAI(
-            api_key=settings.SCIBOX_API_KEY,
-            base_url=settings.SCIBOX_BASE_URL
-        )
+        client = create_client()
         
         # Initialize embedding model
         logger.info(f"Using embedding model: {settings.SCIBOX_EMBEDDING_MODEL}")
@@ -60,13 +87,27 @@ def main():
         
         logger.info("Creating FAISS index and L1 cache...")
         logger.info("-" * 80)
-        index, metadata = create_faiss_index(embedding_model)
+        logger.info(f"Index type: {index_spec.label}")
+        if args.recreate:
+            index, metadata = create_faiss_index(
+                embedding_model, index_spec, incremental=not args.full, dataset_path=args.dataset
+            )
+            bundle = current_index_bundle()
+        else:
+            # another process may be building it right now: wait for it instead of building twice
+            bundle = ensure_index_bundle(
+                embedding_model, index_spec, incremental=not args.full, dataset_path=args.dataset
+            )
+            index, metadata = read_faiss_index(bundle), load_metadata(bundle)
         
         logger.info("-" * 80)
         logger.info("✓ INITIALIZATION COMPLETE!")
-        logger.info(f"  - Index file: {FAISS_INDEX_PATH}")
-        logger.info(f"  - Metadata file: {METADATA_PATH}")
-        logger.info(f"  - L1 cache file: {os.path.join('data', 'l1_cache.json')}")
+        logger.info(f"  - Index bundle: {bundle.version} (running workers switch to it automatically)")
+        logger.info(f"  - Index file: {bundle.faiss_index_path}")
+        logger.info(f"  - Metadata file: {bundle.metadata_path}")
+        logger.info(f"  - Index config file: {bundle.index_config_path}")
+        logger.info(f"  - Embedding store: {EMBEDDING_STORE_PATH}")
+        logger.info(f"  - L1 index file: {bundle.l1_index_path}")
         logger.info(f"  - Total vectors: {index.ntotal}")
         logger.info(f"  - Dimension: {index.d}")
         logger.info(f"  - Metadata entries: {len(metadata)}")
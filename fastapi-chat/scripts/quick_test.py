@@ -4,6 +4,7 @@ Quick test script to verify RAG system is working.
 """
 import sys
 import os
+from itertools import islice
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -11,14 +12,21 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
 
-from src.chat.rag import generate_hint, l1_cache, dataset_metadata
+from src.chat.rag import generate_hint, rag_registry
 
 def main():
     print("=" * 80)
     print("QUICK RAG SYSTEM TEST")
     print("=" * 80)
     
-    # Check if components are loaded
+    # Load components (builds the index when missing)
+    components = rag_registry.load()
+    if components is None:
+        print("\n⚠ WARNING: RAG components failed to load. Run 'python scripts/init_faiss_index.py' first.")
+        return 1
+    l1_cache = components.l1_cache
+    dataset_metadata = components.dataset_metadata
+    
     print(f"\n✓ L1 Cache entries: {len(l1_cache) if l1_cache else 0}")
     print(f"✓ Dataset metadata entries: {len(dataset_metadata) if dataset_metadata else 0}")
     
@@ -34,7 +42,7 @@ def main():
     print("\n" + "-" * 80)
     print("SAMPLE QUESTIONS FROM L1 CACHE (first 5):")
     print("-" * 80)
-    for i, (hash_key, entry) in enumerate(list(l1_cache.items())[:5]):
+    for i, entry in enumerate(islice(l1_cache.entries(), 5)):
         print(f"\n{i+1}. Question: {entry['question'][:80]}...")
         print(f"   Normalized: {entry.get('normalized_question', 'N/A')[:80]}...")
         print(f"   Category: {entry['category']} / {entry['subcategory']}")
@@ -45,7 +53,7 @@ def main():
     print("=" * 80)
     
     # Get first question from cache
-    first_entry = list(l1_cache.values())[0]
+    first_entry = next(l1_cache.entries())
     test_question = first_entry['question']
     
     print(f"\nTest Question: {test_question}")
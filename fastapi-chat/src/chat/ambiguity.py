@@ -0,0 +1,125 @@
+import logging
+import math
+import os
+from typing import Any, Dict, Optional, Sequence
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _template_groups(templates: Sequence[str]) -> np.ndarray:
+    """Group id per entry; entries with the same (whitespace/case-normalized) template share it."""
+    keys = [" ".join((template or "").lower().split()) for template in templates]
+    _, groups = np.unique(np.array(keys, dtype=object), return_inverse=True)
+    return groups.astype(np.int32)
+
+
+class AmbiguityMap:
+    """Precomputed confusability of KB entries, used to skip L3 for unambiguous L2 hits.
+
+    For every entry it keeps the cosine similarity to its nearest neighbour with a different
+    template (entries sharing a template are not confusable: either gives the same answer).
+    If a query is closer in angle to entry `t` than half the angle between `t` and that
+    neighbour, no entry with another template can be closer to the query than `t` is.
+    """
+
+    def __init__(self, neighbor_similarity: np.ndarray, template_groups: np.ndarray):
+        self.neighbor_similarity = neighbor_similarity.astype(np.float32)
+        self.template_groups = template_groups.astype(np.int32)
+
+    @classmethod
+    def build(
+        cls,
+        vectors: np.ndarray,
+        templates: Sequence[str],
+        neighbors: int = 10,
+        index: Optional[faiss.Index] = None,
+        chunk_size: int = 1024,
+        max_neighbors: int = 1024,
+    ) -> "AmbiguityMap":
+        """Nearest different-template neighbour of each entry (vectors must be L2-normalized).
+
+        Neighbours come from `index` (the serving ANN index, with its nprobe/efSearch) searched
+        `chunk_size` entries at a time; an exact flat index is built when it is not given. An
+        entry whose `max_neighbors` nearest all share its template keeps the similarity of the
+        farthest of them, an upper bound of the true neighbour similarity.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        groups = _template_groups(templates)
+        n = len(vectors)
+        if index is None:
+            index = faiss.IndexFlatIP(vectors.shape[1])
+            index.add(vectors)
+
+        neighbor_similarity = np.full(n, -1.0, dtype=np.float32)
+        for start in range(0, n, chunk_size):
+            pending = np.arange(start, min(start + chunk_size, n))
+            k = min(neighbors + 1, n)
+            while len(pending):
+                similarities, rows = index.search(vectors[pending], k)
+                unresolved = []
+                for i, row in enumerate(pending):
+                    found = rows[i] >= 0
+                    other = found & (rows[i] != row) & (groups[np.maximum(rows[i], 0)] != groups[row])
+                    if other.any():
+                        neighbor_similarity[row] = similarities[i][np.argmax(other)]
+                    elif k < min(n, max_neighbors):
+                        unresolved.append(row)
+                    elif k < n and found.any():
+                        neighbor_similarity[row] = similarities[i][found][-1]
+                # all `k` neighbours share the template: look further for these entries
+                pending = np.array(unresolved, dtype=np.int64)
+                k = min(k * 4, n, max_neighbors)
+
+        logger.info(f"Ambiguity map built for {n} entries, {int(groups.max(initial=-1)) + 1} template groups")
+        return cls(neighbor_similarity, groups)
+
+    @classmethod
+    def load(cls, path: str) -> "AmbiguityMap":
+        data = np.load(path)
+        return cls(data["neighbor_similarity"], data["template_groups"])
+
+    def save(self, path: str):
+        # np.savez appends .npz to names without it, write under the exact name
+        with open(path, "wb") as f:
+            np.savez(f, neighbor_similarity=self.neighbor_similarity, template_groups=self.template_groups)
+
+    def __len__(self) -> int:
+        return len(self.neighbor_similarity)
+
+    def margin(self, row: int, similarity: float) -> float:
+        """Share of the safe angular radius around entry `row` left at this query similarity.
+
+        1 at the entry itself, 0 halfway to its nearest different-template neighbour,
+        negative beyond that (another template may be closer).
+        """
+        half_angle = math.acos(min(max(float(self.neighbor_similarity[row]), -1.0), 1.0)) / 2
+        if half_angle <= 0:
+            return -1.0
+        return 1 - math.acos(min(max(similarity, -1.0), 1.0)) / half_angle
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self),
+            "template_groups": int(self.template_groups.max(initial=-1)) + 1,
+            "median_neighbor_similarity": round(float(np.median(self.neighbor_similarity)), 4) if len(self) else None,
+        }
+
+
+def load_ambiguity_map(
+    path: str, index: faiss.Index, templates: Sequence[str], neighbors: int = 10
+) -> Optional[AmbiguityMap]:
+    """Ambiguity map saved with the index, or built by searching the index when missing or stale."""
+    if os.path.exists(path):
+        ambiguity_map = AmbiguityMap.load(path)
+        if len(ambiguity_map) == index.ntotal:
+            return ambiguity_map
+        logger.warning(f"Ambiguity map has {len(ambiguity_map)} entries, index {index.ntotal}; rebuilding")
+    try:
+        vectors = index.reconstruct_n(0, index.ntotal)
+    except RuntimeError as e:
+        logger.warning(f"Cannot rebuild ambiguity map, index vectors are not reconstructable: {e}")
+        return None
+    return AmbiguityMap.build(vectors, templates, neighbors, index=index)
@@ -0,0 +1,154 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RerankDecision:
+    """L3 rerank outcome expressed in knowledge base ids, independent of candidate order."""
+
+    candidate_ids: Tuple[int, ...]
+    selected_id: int
+    confidence: float
+    alternatives: List[Tuple[int, float]] = field(default_factory=list)
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class RerankDecisionCache:
+    """Semantic cache of L3 rerank decisions.
+
+    Query embeddings of completed reranks are kept in a small secondary FAISS index.
+    A new query reuses a stored decision when its embedding is within `threshold`
+    cosine similarity of a cached query and L2 produced the same candidate set.
+
+    Decisions are keyed by the knowledge base index version and only reused for the same
+    version. While a new index bundle is swapped in, requests on the old and the new
+    snapshot alternate, so the decisions of the `versions_kept` most recently seen versions
+    are kept; older ones are dropped when another version shows up.
+    """
+
+    def __init__(
+        self, threshold: float, max_entries: int, ttl_seconds: int, neighbours: int = 4, versions_kept: int = 2
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.neighbours = neighbours
+        self.versions_kept = max(1, versions_kept)
+
+        # most recently seen index versions, newest last
+        self.index_versions: List[Optional[str]] = []
+        self._index: Optional[faiss.IndexIDMap2] = None
+        self._entries: OrderedDict[int, RerankDecision] = OrderedDict()
+        self._entry_versions: Dict[int, Optional[str]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _prepare(query_vector: np.ndarray) -> np.ndarray:
+        vector = np.array([query_vector], dtype=np.float32)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def _check_version(self, index_version: Optional[str]):
+        if index_version in self.index_versions:
+            return
+        self.index_versions.append(index_version)
+        if len(self.index_versions) <= self.versions_kept:
+            return
+
+        dropped = self.index_versions[: -self.versions_kept]
+        self.index_versions = self.index_versions[-self.versions_kept :]
+        stale = [entry_id for entry_id, version in self._entry_versions.items() if version in dropped]
+        if stale:
+            logger.info(f"Rerank cache: dropping {len(stale)} decisions of index versions {dropped}")
+            for entry_id in stale:
+                del self._entries[entry_id]
+                del self._entry_versions[entry_id]
+            self._index.remove_ids(np.array(stale, dtype=np.int64))
+
+    def _reset(self):
+        self._index = None
+        self._entries.clear()
+        self._entry_versions.clear()
+
+    def _remove(self, entry_id: int):
+        del self._entries[entry_id]
+        del self._entry_versions[entry_id]
+        self._index.remove_ids(np.array([entry_id], dtype=np.int64))
+
+    def _evict(self):
+        expired_before = time.monotonic() - self.ttl_seconds
+        while self._entries:
+            oldest_id, oldest = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_entries and oldest.created_at > expired_before:
+                break
+            self._remove(oldest_id)
+
+    def lookup(
+        self, query_vector: np.ndarray, candidate_ids: Sequence[int], index_version: Optional[str]
+    ) -> Optional[RerankDecision]:
+        """Return a cached decision for a near-identical query with the same candidate set."""
+        with self._lock:
+            self._check_version(index_version)
+            if self._index is None or not self._entries:
+                self.misses += 1
+                return None
+
+            expired_before = time.monotonic() - self.ttl_seconds
+            candidate_set = set(candidate_ids)
+            similarities, ids = self._index.search(self._prepare(query_vector), self.neighbours)
+            for similarity, entry_id in zip(similarities[0], ids[0]):
+                if entry_id < 0 or similarity < self.threshold:
+                    break
+                decision = self._entries.get(int(entry_id))
+                if decision is None or decision.created_at <= expired_before:
+                    continue
+                if self._entry_versions[int(entry_id)] != index_version:
+                    continue
+                if set(decision.candidate_ids) == candidate_set:
+                    self._entries.move_to_end(int(entry_id))
+                    self.hits += 1
+                    return decision
+
+            self.misses += 1
+            return None
+
+    def store(self, query_vector: np.ndarray, decision: RerankDecision, index_version: Optional[str]):
+        """Remember a completed rerank decision for the given query embedding."""
+        with self._lock:
+            self._check_version(index_version)
+            vector = self._prepare(query_vector)
+            if self._index is None:
+                self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(vector, np.array([entry_id], dtype=np.int64))
+            self._entries[entry_id] = decision
+            self._entry_versions[entry_id] = index_version
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
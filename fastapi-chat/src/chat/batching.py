@@ -0,0 +1,82 @@
+import asyncio
+import logging
+from typing import List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class BatchingEmbedder:
+    """Coalesces concurrent `embed_query` calls into batched embedding requests.
+
+    Queries are collected for up to `max_batch_size` items or `max_wait_ms` milliseconds,
+    whichever comes first, and sent as a single `embed_documents` call of the wrapped
+    async embedder. Every caller receives its own vector.
+    """
+
+    def __init__(self, embedder, max_batch_size: int, max_wait_ms: float):
+        self.embedder = embedder
+        self.model = embedder.model
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.requests = 0
+        self.items = 0
+
+    async def embed_query(self, text: str) -> List[float]:
+        """Embed a single query as part of the next batch."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._flush)
+
+        return await future
+
+    async def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed multiple documents directly, bypassing the batch queue."""
+        return await self.embedder.embed_documents(texts)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: List[Tuple[str, asyncio.Future]]):
+        # identical texts within a batch are embedded once
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        self.requests += 1
+        self.items += len(batch)
+        try:
+            vectors = await self.embedder.embed_documents(texts)
+        except Exception as e:
+            logger.warning(f"Batched embedding request of {len(texts)} texts failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        vectors_by_text = dict(zip(texts, vectors))
+        for text, future in batch:
+            if not future.done():
+                future.set_result(vectors_by_text[text])
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "items": self.items,
+            "average_batch_size": self.items / self.requests if self.requests else 0.0,
+        }
@@ -0,0 +1,126 @@
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-zа-я0-9]+")
+
+RUSSIAN_STOPWORDS = frozenset(
+    """
+    а без более бы был была были было быть в вам вас ведь во вот все всего всех вы где да даже для до
+    его ее ей ему если есть еще же за здесь и из или им их к как какая какой когда кто ли между меня
+    мне может мы на над надо нас не него нее нет ни них но ну о об однако он она они оно от очень по
+    под при про с со так также такой там те тем то того тоже той только том ту ты у уже чего чем что
+    чтобы чтоб эта эти это этого этой этом этот эту я
+""".split()
+)
+
+# Inflectional endings stripped by the light stemmer, longest first
+RUSSIAN_SUFFIXES = tuple(
+    sorted(
+        """
+    ать ять ить еть уть ться тся ешь ишь ете ите ет ит ут ют ат ят ил ила ило или ла ли ло
+    ами ями ого его ому ему ыми ими ых их ую юю ая яя ое ее ые ие ой ей ий ый ом ем ам ям ах ях
+    ов ев ию ью ия ья ие ье а я о е ы и у ю ь
+""".split(),
+        key=len,
+        reverse=True,
+    )
+)
+
+MIN_STEM_LENGTH = 3
+
+
+def stem(token: str) -> str:
+    """Strip a common Russian inflectional ending so word forms share a term."""
+    if not token.isalpha() or not ("а" <= token[0] <= "я"):
+        return token
+    for suffix in RUSSIAN_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM_LENGTH:
+            return token[: -len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, fold ё to е, drop stopwords and stem Russian words."""
+    text = (text or "").lower().replace("ё", "е")
+    return [stem(token) for token in TOKEN_PATTERN.findall(text) if token not in RUSSIAN_STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over an in-memory inverted index.
+
+    Document ids are positions in the corpus, i.e. the same row ids the FAISS index uses.
+    """
+
+    def __init__(self, documents: Iterable[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        doc_lengths = []
+        for doc_id, document in enumerate(documents):
+            tokens = tokenize(document)
+            doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings[term].append((doc_id, tf))
+
+        self.doc_lengths = np.array(doc_lengths, dtype=np.float32)
+        self.avgdl = float(self.doc_lengths.mean()) if len(doc_lengths) and self.doc_lengths.mean() > 0 else 1.0
+
+        n_docs = len(doc_lengths)
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.idf: Dict[str, float] = {}
+        for term, entries in postings.items():
+            doc_ids, tfs = zip(*entries)
+            self.postings[term] = (np.array(doc_ids, dtype=np.int64), np.array(tfs, dtype=np.float32))
+            self.idf[term] = math.log(1 + (n_docs - len(entries) + 0.5) / (len(entries) + 0.5))
+
+        # length normalization per document, precomputed once
+        self._norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / self.avgdl)
+        logger.info(f"BM25 index built over {n_docs} documents, {len(self.postings)} terms")
+
+    @classmethod
+    def from_metadata(
+        cls, metadata: Sequence[Dict[str, str]], fields: Sequence[str] = ("question", "keywords"), **kwargs
+    ) -> "BM25Index":
+        return cls((" ".join(item.get(field, "") or "" for field in fields) for item in metadata), **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def search(self, query: str, top_k: int = 20, allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Return up to `top_k` (doc_id, score) pairs with a positive score, best first.
+
+        `allowed` restricts results to the given doc ids (e.g. one category).
+        """
+        scores = np.zeros(len(self), dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            doc_ids, tfs = self.postings[term]
+            scores[doc_ids] += self.idf[term] * tfs * (self.k1 + 1) / (tfs + self._norm[doc_ids])
+        if allowed is not None:
+            mask = np.zeros(len(self), dtype=bool)
+            mask[allowed] = True
+            scores[~mask] = 0
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        order = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(int(doc_id), float(scores[doc_id])) for doc_id in order]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """Fuse ranked id lists: score(d) = sum over lists of 1 / (k + rank of d), ranks starting at 1."""
+    scores: Dict[int, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,74 @@
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def category_key(category: Optional[str]) -> str:
+    """Case-, ё- and whitespace-insensitive key of a category name."""
+    return " ".join((category or "").lower().replace("ё", "е").split())
+
+
+def filtered_search_params(index: faiss.Index, selector: faiss.IDSelector) -> faiss.SearchParameters:
+    """Search parameters restricting results to `selector`, keeping the index's nprobe/efSearch."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+
+class CategoryPartitions:
+    """Row ids of the FAISS index grouped by KB category, for category-filtered L2 search.
+
+    A filtered search runs on the shared (memory-mapped) main index with an `IDSelectorBatch`
+    over the category's rows, so no vectors are copied per category or per worker.
+    """
+
+    def __init__(self, categories: Sequence[str]):
+        rows: Dict[str, List[int]] = {}
+        self.names: Dict[str, str] = {}
+        for row, category in enumerate(categories):
+            key = category_key(category)
+            if not key:
+                continue
+            rows.setdefault(key, []).append(row)
+            self.names.setdefault(key, category)
+
+        self.ids: Dict[str, np.ndarray] = {key: np.array(ids, dtype=np.int64) for key, ids in rows.items()}
+        # hash set of the rows per category; the vectors stay in the shared index
+        self._selectors = {key: faiss.IDSelectorBatch(ids) for key, ids in self.ids.items()}
+        logger.info(f"Category partitions: {len(self.ids)} categories")
+
+    @classmethod
+    def from_metadata(cls, metadata: Sequence[Dict[str, Any]]) -> "CategoryPartitions":
+        if hasattr(metadata, "get_value"):
+            categories = [metadata.get_value(row, "category") for row in range(len(metadata))]
+        else:
+            categories = [item.get("category", "") for item in metadata]
+        return cls(categories)
+
+    def __contains__(self, category: Optional[str]) -> bool:
+        return category_key(category) in self.ids
+
+    def allowed(self, category: Optional[str]) -> Optional[np.ndarray]:
+        """Row ids of a category, None when it is unknown."""
+        return self.ids.get(category_key(category))
+
+    def search(
+        self, index: faiss.Index, query_embeddings: np.ndarray, k: int, category: str
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """`index.search` restricted to one category; returned ids are rows of the main index."""
+        return index.search(
+            query_embeddings, k, params=filtered_search_params(index, self._selectors[category_key(category)])
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "categories": len(self.ids),
+            "largest": max((len(ids) for ids in self.ids.values()), default=0),
+        }
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import threading
+import time
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+from openai import APIConnectionError, APIStatusError, APITimeoutError
+
+from src.chat.metrics import CIRCUIT_REJECTIONS, CIRCUIT_STATE
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+
+# values of the rag_circuit_state gauge
+CIRCUIT_STATE_VALUES = {CircuitState.CLOSED: 0, CircuitState.HALF_OPEN: 1, CircuitState.OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """The upstream endpoint is failing; the call was rejected without being made."""
+
+
+class BudgetTimeout(Exception):
+    """The call was cut short by the caller's own latency budget.
+
+    Raise it from the wrapped callable in place of the client's timeout error: the reservation
+    is released without counting a failure, a tight budget says nothing about upstream health.
+    """
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """Errors that indicate the upstream is unhealthy (not our own bad requests or budgets)."""
+    if isinstance(error, BudgetTimeout):
+        return False
+    if isinstance(error, APIStatusError):
+        return error.status_code >= 500 or error.status_code == 429
+    return isinstance(error, (APIConnectionError, APITimeoutError, httpx.TransportError))
+
+
+class CircuitBreaker:
+    """Per-endpoint circuit breaker.
+
+    After `failure_threshold` consecutive upstream failures the circuit opens and calls fail
+    fast with CircuitOpenError. After `recovery_seconds` it is half-open: up to
+    `half_open_max_calls` probe calls go through; a successful probe closes the circuit,
+    a failed one opens it again.
+    """
+
+    def __init__(
+        self, name: str, failure_threshold: int = 5, recovery_seconds: float = 30.0, half_open_max_calls: int = 1
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.labels(endpoint=name).set(0)
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            if self._state == CircuitState.OPEN and time.monotonic() - self._opened_at >= self.recovery_seconds:
+                return CircuitState.HALF_OPEN
+            return self._state
+
+    def _set_state(self, state: CircuitState):
+        if state != self._state:
+            logger.warning(f"Circuit '{self.name}': {self._state.value} -> {state.value}")
+        self._state = state
+        CIRCUIT_STATE.labels(endpoint=self.name).set(CIRCUIT_STATE_VALUES[state])
+
+    def allow_request(self) -> bool:
+        """Reserve a call; False when the circuit is open (or half-open with probes in flight)."""
+        with self._lock:
+            if self._state == CircuitState.OPEN:
+                if time.monotonic() - self._opened_at < self.recovery_seconds:
+                    return False
+                self._set_state(CircuitState.HALF_OPEN)
+                self._probes = 0
+            if self._state == CircuitState.HALF_OPEN:
+                if self._probes >= self.half_open_max_calls:
+                    return False
+                self._probes += 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self._state != CircuitState.CLOSED:
+                self._set_state(CircuitState.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == CircuitState.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state(CircuitState.OPEN)
+
+    def release(self):
+        """Give back a reserved call that finished without a verdict (e.g. cancelled)."""
+        with self._lock:
+            if self._state == CircuitState.HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def _reject(self):
+        CIRCUIT_REJECTIONS.labels(endpoint=self.name).inc()
+        raise CircuitOpenError(f"Circuit '{self.name}' is open, upstream calls are suspended")
+
+    def _record(self, error: Optional[BaseException]):
+        if error is None:
+            self.record_success()
+        elif is_upstream_failure(error):
+            self.record_failure()
+        else:
+            self.release()
+
+    def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        if not self.allow_request():
+            self._reject()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self._record(e)
+            raise
+        self._record(None)
+        return result
+
+    async def acall(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        if not self.allow_request():
+            self._reject()
+        try:
+            result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            self.release()
+            raise
+        except Exception as e:
+            self._record(e)
+            raise
+        self._record(None)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            failures = self._failures
+        return {"state": self.state.value, "consecutive_failures": failures}
@@ -0,0 +1,71 @@
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+
+import numpy as np
+
+from src.chat.circuit_breaker import BudgetTimeout
+
+
+class RerankDeadlineExceeded(BudgetTimeout):
+    """The L3 rerank did not answer within the hint's latency budget."""
+
+
+class LatencyTracker:
+    """Recent latencies of a call in a sliding window, for percentile-based hedge delays."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, latency_ms: float):
+        with self._lock:
+            self._samples.append(latency_ms)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            samples = list(self._samples)
+        if not samples:
+            return None
+        return float(np.percentile(samples, q))
+
+
+async def hedged(
+    call: Callable[[], Awaitable[Any]],
+    hedge_delay_s: Optional[float],
+    on_hedge: Optional[Callable[[], None]] = None,
+) -> Any:
+    """Await `call()`; if it has not finished after `hedge_delay_s`, start a duplicate and
+    return whichever finishes first. The other request is cancelled.
+
+    A failing request does not win while the other one is still running.
+    """
+    if hedge_delay_s is None:
+        return await call()
+
+    tasks = [asyncio.ensure_future(call())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_delay_s)
+        if done:
+            return tasks[0].result()
+
+        if on_hedge is not None:
+            on_hedge()
+        tasks.append(asyncio.ensure_future(call()))
+        pending, error = set(tasks), None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        # also reached when the caller is cancelled (e.g. by its deadline)
+        for task in tasks:
+            if not task.done():
+                task.cancel()
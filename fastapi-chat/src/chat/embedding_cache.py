@@ -0,0 +1,169 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+import redis
+import redis.asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+
+class QueryEmbeddingCache:
+    """Two-tier cache of query embeddings.
+
+    The first tier is an in-process LRU bounded by number of entries and total bytes,
+    the second one is Redis holding float32 blobs, so embeddings are shared by all workers.
+    Keys are normalized query texts, namespaced by the embedding model name.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        max_entries: int,
+        max_bytes: int,
+        ttl_seconds: int,
+        redis_client: Optional[redis.Redis] = None,
+        async_redis_client: Optional[aioredis.Redis] = None,
+    ):
+        self.model = model
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.redis_client = redis_client
+        self.async_redis_client = async_redis_client
+
+        self._entries: OrderedDict[str, Tuple[float, np.ndarray]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def redis_key(self, normalized_text: str) -> str:
+        text_hash = hashlib.sha1(normalized_text.encode("utf-8")).hexdigest()
+        return f"query_embedding:{self.model}:{text_hash}"
+
+    # --- local tier ---
+
+    def _local_get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, vector = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return vector
+
+    def _local_set(self, key: str, vector: np.ndarray, ttl_seconds: Optional[float] = None):
+        if vector.nbytes > self.max_bytes:
+            return
+        expires_at = time.monotonic() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, vector)
+            self._bytes += vector.nbytes
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        _, vector = self._entries.pop(key)
+        self._bytes -= vector.nbytes
+
+    # --- public API ---
+
+    def get(self, normalized_text: str) -> Optional[np.ndarray]:
+        """Look up an embedding in the local tier, then in Redis."""
+        key = self.redis_key(normalized_text)
+        vector = self._local_get(key)
+        if vector is not None:
+            self.local_hits += 1
+            return vector
+
+        if self.redis_client is not None:
+            try:
+                blob, ttl = self.redis_client.pipeline().get(key).ttl(key).execute()
+            except redis.RedisError as e:
+                logger.warning(f"Embedding cache: Redis GET failed: {e}")
+                blob, ttl = None, None
+            if blob:
+                vector = np.frombuffer(blob, dtype=np.float32)
+                self._local_set(key, vector, ttl_seconds=ttl if ttl and ttl > 0 else None)
+                self.redis_hits += 1
+                return vector
+
+        self.misses += 1
+        return None
+
+    def set(self, normalized_text: str, vector: np.ndarray):
+        """Store an embedding in both tiers."""
+        key = self.redis_key(normalized_text)
+        vector = np.asarray(vector, dtype=np.float32)
+        self._local_set(key, vector)
+        if self.redis_client is not None:
+            try:
+                self.redis_client.set(key, vector.tobytes(), ex=self.ttl_seconds)
+            except redis.RedisError as e:
+                logger.warning(f"Embedding cache: Redis SET failed: {e}")
+
+    async def aget(self, normalized_text: str) -> Optional[np.ndarray]:
+        """Async variant of `get`, uses the async Redis client."""
+        key = self.redis_key(normalized_text)
+        vector = self._local_get(key)
+        if vector is not None:
+            self.local_hits += 1
+            return vector
+
+        if self.async_redis_client is not None:
+            try:
+                blob, ttl = await self.async_redis_client.pipeline().get(key).ttl(key).execute()
+            except redis.RedisError as e:
+                logger.warning(f"Embedding cache: Redis GET failed: {e}")
+                blob, ttl = None, None
+            if blob:
+                vector = np.frombuffer(blob, dtype=np.float32)
+                self._local_set(key, vector, ttl_seconds=ttl if ttl and ttl > 0 else None)
+                self.redis_hits += 1
+                return vector
+
+        self.misses += 1
+        return None
+
+    async def aset(self, normalized_text: str, vector: np.ndarray):
+        """Async variant of `set`, uses the async Redis client."""
+        key = self.redis_key(normalized_text)
+        vector = np.asarray(vector, dtype=np.float32)
+        self._local_set(key, vector)
+        if self.async_redis_client is not None:
+            try:
+                await self.async_redis_client.set(key, vector.tobytes(), ex=self.ttl_seconds)
+            except redis.RedisError as e:
+                logger.warning(f"Embedding cache: Redis SET failed: {e}")
+
+    def clear(self):
+        """Drop the local tier (Redis entries expire by TTL)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.local_hits + self.redis_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.local_hits + self.redis_hits) / lookups if lookups else 0.0,
+        }
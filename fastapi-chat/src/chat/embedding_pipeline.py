@@ -0,0 +1,143 @@
+import hashlib
+import logging
+import os
+import random
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Optional, TypeVar
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class EmbeddingCheckpoint:
+    """Per-batch embedding results of one build job, saved as .npy files.
+
+    The directory is keyed by the model and the exact list of texts, so a rerun of the
+    same job picks up the finished batches while a different job starts clean.
+    """
+
+    def __init__(self, root: str, model: str, texts: List[str], batch_size: int):
+        digest = hashlib.md5(f"{model}\x00{batch_size}".encode("utf-8"))
+        for text in texts:
+            digest.update(b"\x00" + text.encode("utf-8"))
+        self.path = os.path.join(root, digest.hexdigest())
+
+    def _batch_path(self, batch_id: int) -> str:
+        return os.path.join(self.path, f"batch_{batch_id:06d}.npy")
+
+    def load(self, batch_id: int) -> Optional[np.ndarray]:
+        path = self._batch_path(batch_id)
+        if not os.path.exists(path):
+            return None
+        try:
+            return np.load(path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint {path}: {e}")
+            return None
+
+    def save(self, batch_id: int, vectors: np.ndarray):
+        os.makedirs(self.path, exist_ok=True)
+        path = self._batch_path(batch_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, vectors)
+        os.replace(tmp_path, path)
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def call_with_retry(func: Callable[[], T], max_retries: int, backoff_seconds: float, description: str = "call") -> T:
+    """Call `func`, retrying failures with jittered exponential backoff."""
+    for attempt in range(max_retries + 1):
+        try:
+            return func()
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            delay = backoff_seconds * (2**attempt) * random.uniform(0.5, 1.5)
+            logger.warning(f"{description} failed ({e}), retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def embed_texts_concurrently(
+    embed_batch: Callable[[List[str]], List[List[float]]],
+    texts: List[str],
+    model: str,
+    batch_size: int = 32,
+    concurrency: int = 4,
+    max_retries: int = 5,
+    backoff_seconds: float = 1.0,
+    checkpoint_root: Optional[str] = None,
+) -> np.ndarray:
+    """Embed `texts` in batches sent by `concurrency` worker threads.
+
+    Failed batches are retried with backoff. With `checkpoint_root`, every finished batch
+    is saved to disk, so an interrupted or failed build resumes from the remaining batches.
+    Returns a float32 array in the order of `texts`.
+    """
+    if not texts:
+        return np.zeros((0, 0), dtype="float32")
+
+    batches = [texts[i : i + batch_size] for i in range(0, len(texts), batch_size)]
+    results: List[Optional[np.ndarray]] = [None] * len(batches)
+    checkpoint = EmbeddingCheckpoint(checkpoint_root, model, texts, batch_size) if checkpoint_root else None
+
+    pending = []
+    for batch_id, batch in enumerate(batches):
+        vectors = checkpoint.load(batch_id) if checkpoint else None
+        if vectors is not None and len(vectors) == len(batch):
+            results[batch_id] = vectors
+        else:
+            pending.append(batch_id)
+    restored = len(batches) - len(pending)
+    if restored:
+        logger.info(f"Resuming embedding: {restored}/{len(batches)} batches restored from checkpoint")
+
+    total = len(texts)
+    done = sum(len(batches[batch_id]) for batch_id in range(len(batches)) if results[batch_id] is not None)
+    embedded = 0
+    start_time = time.perf_counter()
+
+    def run(batch_id: int) -> np.ndarray:
+        vectors = call_with_retry(
+            lambda: embed_batch(batches[batch_id]),
+            max_retries=max_retries,
+            backoff_seconds=backoff_seconds,
+            description=f"Embedding batch {batch_id}",
+        )
+        vectors = np.asarray(vectors, dtype="float32")
+        if checkpoint:
+            checkpoint.save(batch_id, vectors)
+        return vectors
+
+    logger.info(
+        f"Generating embeddings for {total - done} texts in {len(pending)} batches ({concurrency} concurrent)..."
+    )
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="embed")
+    try:
+        futures = {executor.submit(run, batch_id): batch_id for batch_id in pending}
+        for completed, future in enumerate(as_completed(futures), 1):
+            batch_id = futures[future]
+            results[batch_id] = future.result()
+            done += len(batches[batch_id])
+            embedded += len(batches[batch_id])
+            if completed % 5 == 0 or completed == len(pending):
+                rate = embedded / max(time.perf_counter() - start_time, 1e-9)
+                logger.info(f"Processed {done}/{total} texts ({rate:.1f} texts/s)")
+    except Exception as e:
+        logger.error(f"Embedding failed: {e}")
+        if checkpoint:
+            logger.error(f"Finished batches are kept in {checkpoint.path}; rerun the build to resume")
+        raise
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    if checkpoint:
+        checkpoint.clear()
+    return np.vstack(results).astype("float32")
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Iterable, List, Optional, Sequence
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def content_id(text: str) -> int:
+    """Stable non-negative int64 id of an embedded text (first 8 bytes of its md5)."""
+    digest = hashlib.md5(text.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "little") & ((1 << 63) - 1)
+
+
+class EmbeddingStore:
+    """Embeddings of knowledge base questions keyed by a hash of the question text.
+
+    Backed by a FAISS `IndexIDMap2`, so vectors of unchanged questions are reconstructed
+    by id on rebuilds, new or edited questions are added and deleted ones removed, without
+    re-embedding the whole knowledge base. Vectors are stored L2-normalized.
+    """
+
+    def __init__(self, path: str, model: str, index: Optional[faiss.Index] = None):
+        self.path = path
+        self.model = model
+        self.index = index
+        self._ids = set(faiss.vector_to_array(index.id_map).tolist()) if index is not None else set()
+
+    @property
+    def meta_path(self) -> str:
+        return f"{os.path.splitext(self.path)[0]}.json"
+
+    @classmethod
+    def open(cls, path: str, model: str) -> "EmbeddingStore":
+        """Open the store at `path`; a missing store or one built with another model starts empty."""
+        meta_path = f"{os.path.splitext(path)[0]}.json"
+        if not (os.path.exists(path) and os.path.exists(meta_path)):
+            return cls(path, model)
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("model") != model:
+            logger.info(f"Embedding store was built with '{meta.get('model')}', not '{model}'; starting empty")
+            return cls(path, model)
+        store = cls(path, model, faiss.read_index(path))
+        logger.info(f"Opened embedding store with {len(store)} vectors")
+        return store
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, text_id: int) -> bool:
+        return text_id in self._ids
+
+    @property
+    def ids(self) -> List[int]:
+        return list(self._ids)
+
+    def add(self, ids: Sequence[int], vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        faiss.normalize_L2(vectors)
+        if self.index is None:
+            self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(vectors.shape[1]))
+        self.index.add_with_ids(vectors, np.asarray(ids, dtype=np.int64))
+        self._ids.update(int(text_id) for text_id in ids)
+
+    def remove(self, ids: Iterable[int]) -> int:
+        ids = [text_id for text_id in ids if text_id in self._ids]
+        if ids:
+            self.index.remove_ids(np.asarray(ids, dtype=np.int64))
+            self._ids.difference_update(ids)
+        return len(ids)
+
+    def get(self, ids: Sequence[int]) -> np.ndarray:
+        """Vectors for `ids` in the given order (ids may repeat)."""
+        return np.vstack([self.index.reconstruct(int(text_id)) for text_id in ids]).astype("float32")
+
+    def save(self):
+        if self.index is None:
+            return
+        tmp_path = f"{self.path}.tmp"
+        faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, self.path)
+        with open(self.meta_path, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model, "dimension": int(self.index.d), "size": len(self)}, f)
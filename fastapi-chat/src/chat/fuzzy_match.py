@@ -0,0 +1,239 @@
+import logging
+import os
+import time
+import zlib
+from difflib import SequenceMatcher
+from typing import Any, Callable, Dict, FrozenSet, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.chat.metadata_store import MetadataStore
+
+logger = logging.getLogger(__name__)
+
+# Mersenne prime for the universal hash family; keeps a * x + b within uint64
+MERSENNE_PRIME = (1 << 31) - 1
+# multiplier folding the rows of a signature band into one 64-bit bucket key (wraps around)
+BAND_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def char_ngrams(text: str, n: int = 3) -> FrozenSet[str]:
+    """Character n-grams of a normalized text, padded so short words contribute too."""
+    padded = f" {text} "
+    if len(padded) <= n:
+        return frozenset([padded])
+    return frozenset(padded[i : i + n] for i in range(len(padded) - n + 1))
+
+
+class FuzzyMatcher:
+    """Near-duplicate lookup over L1 cache questions with MinHash/LSH.
+
+    Each question is indexed by a MinHash signature of its character n-grams split into
+    LSH bands. A query only verifies the entries sharing at least one band bucket, by
+    exact n-gram Jaccard and edit similarity, so typos and an extra word still match
+    without an embedding request.
+
+    Only metadata row ids and the band keys of the signatures are kept (sorted per band and
+    searched with binary search); question texts are read from the metadata store for the
+    few candidates of a lookup. The tables are built with the index and saved to the bundle.
+    """
+
+    def __init__(
+        self,
+        rows: np.ndarray,
+        band_keys: np.ndarray,
+        metadata: MetadataStore,
+        normalize: Callable[[str], str],
+        threshold: float = 0.85,
+        num_perm: int = 64,
+        ngram: int = 3,
+        seed: int = 1,
+    ):
+        self.bands = band_keys.shape[0]
+        if num_perm % self.bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.rows = num_perm // self.bands
+        self.ngram = ngram
+        self.seed = seed
+        self.metadata = metadata
+        self.normalize = normalize
+
+        self._a, self._b = _hash_params(num_perm, seed)
+        self.row_ids = np.asarray(rows, dtype=np.int32)
+        self.band_keys = np.asarray(band_keys, dtype=np.uint64)
+        # per band: keys in ascending order and the entry each of them belongs to
+        self._order = np.argsort(self.band_keys, axis=1, kind="stable").astype(np.int32)
+        self._sorted_keys = np.take_along_axis(self.band_keys, self._order, axis=1)
+
+        self.lookups = 0
+        self.hits = 0
+        self.total_lookup_us = 0.0
+
+    @classmethod
+    def build(
+        cls,
+        metadata: MetadataStore,
+        rows: Sequence[int],
+        normalize: Callable[[str], str],
+        threshold: float = 0.85,
+        num_perm: int = 64,
+        bands: int = 16,
+        ngram: int = 3,
+        seed: int = 1,
+    ) -> "FuzzyMatcher":
+        """Index the questions of the given metadata rows (the rows of the L1 table)."""
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        a, b = _hash_params(num_perm, seed)
+        rows = np.asarray(rows, dtype=np.int32)
+        signatures = np.zeros((len(rows), num_perm), dtype=np.uint64)
+        for entry_id, row in enumerate(rows):
+            signatures[entry_id] = _signature(
+                char_ngrams(normalize(metadata.get_value(int(row), "question")), ngram), a, b
+            )
+
+        matcher = cls(
+            rows,
+            _band_keys(signatures, bands),
+            metadata,
+            normalize,
+            threshold=threshold,
+            num_perm=num_perm,
+            ngram=ngram,
+            seed=seed,
+        )
+        logger.info(f"Fuzzy matcher indexed {len(matcher)} questions ({bands} bands x {matcher.rows} rows)")
+        return matcher
+
+    @classmethod
+    def load(
+        cls, path: str, metadata: MetadataStore, normalize: Callable[[str], str], threshold: float = 0.85
+    ) -> "FuzzyMatcher":
+        data = np.load(path)
+        num_perm, ngram, seed = (int(value) for value in data["params"])
+        return cls(
+            data["rows"],
+            data["band_keys"],
+            metadata,
+            normalize,
+            threshold=threshold,
+            num_perm=num_perm,
+            ngram=ngram,
+            seed=seed,
+        )
+
+    def save(self, path: str):
+        # np.savez appends .npz to names without it, write under the exact name
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                rows=self.row_ids,
+                band_keys=self.band_keys,
+                params=np.array([self.num_perm, self.ngram, self.seed], dtype=np.int64),
+            )
+
+    def __len__(self) -> int:
+        return len(self.row_ids)
+
+    def _text(self, entry_id: int) -> str:
+        return self.normalize(self.metadata.get_value(int(self.row_ids[entry_id]), "question"))
+
+    def similarity(self, text: str, entry_id: int, shingles: Optional[FrozenSet[str]] = None) -> float:
+        """Mean of n-gram Jaccard and edit (SequenceMatcher) similarity, 0..1."""
+        shingles = shingles if shingles is not None else char_ngrams(text, self.ngram)
+        entry_text = self._text(entry_id)
+        entry_shingles = char_ngrams(entry_text, self.ngram)
+        jaccard = len(shingles & entry_shingles) / len(shingles | entry_shingles)
+        edit = SequenceMatcher(None, text, entry_text, autojunk=False).ratio()
+        return (jaccard + edit) / 2
+
+    def candidates(self, shingles: FrozenSet[str]) -> np.ndarray:
+        """Entries sharing at least one band bucket with these n-grams."""
+        keys = _band_keys(_signature(shingles, self._a, self._b)[np.newaxis, :], self.bands)[:, 0]
+        found = []
+        for band, key in enumerate(keys):
+            sorted_keys = self._sorted_keys[band]
+            lo, hi = np.searchsorted(sorted_keys, key, side="left"), np.searchsorted(sorted_keys, key, side="right")
+            found.append(self._order[band, lo:hi])
+        return np.unique(np.concatenate(found))
+
+    def match(self, normalized_text: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Return (entry, similarity) of the closest question above the threshold, or None."""
+        start_time = time.perf_counter()
+        self.lookups += 1
+        best: Optional[Tuple[int, float]] = None
+        if normalized_text and len(self):
+            shingles = char_ngrams(normalized_text, self.ngram)
+            for entry_id in self.candidates(shingles):
+                score = self.similarity(normalized_text, int(entry_id), shingles)
+                if score >= self.threshold and (best is None or score > best[1]):
+                    best = (int(entry_id), score)
+
+        self.total_lookup_us += (time.perf_counter() - start_time) * 1_000_000
+        if best is None:
+            return None
+        self.hits += 1
+        entry = self.metadata[int(self.row_ids[best[0]])]
+        entry["normalized_question"] = self._text(best[0])
+        return entry, best[1]
+
+    @staticmethod
+    def confidence(similarity: float) -> int:
+        """Confidence on the 0-100 scale used by L2, capped at 99 so it never claims an exact match."""
+        return min(99, int(similarity * 100))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "misses": self.lookups - self.hits,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "avg_lookup_us": self.total_lookup_us / self.lookups if self.lookups else 0.0,
+            "nbytes": self.row_ids.nbytes + self.band_keys.nbytes + self._order.nbytes + self._sorted_keys.nbytes,
+        }
+
+
+def _hash_params(num_perm: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    return (
+        rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.uint64),
+        rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64),
+    )
+
+
+def _signature(shingles: FrozenSet[str], a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    hashes = (
+        np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+        % MERSENNE_PRIME
+    )
+    return ((np.outer(hashes, a) + b) % MERSENNE_PRIME).min(axis=0)
+
+
+def _band_keys(signatures: np.ndarray, bands: int) -> np.ndarray:
+    """(bands, n) bucket keys of (n, num_perm) signatures."""
+    banded = signatures.reshape(len(signatures), bands, -1)
+    keys = np.zeros((bands, len(signatures)), dtype=np.uint64)
+    for row in range(banded.shape[2]):
+        keys = keys * BAND_HASH_MULTIPLIER + banded[:, :, row].T
+    return keys
+
+
+def load_fuzzy_matcher(
+    path: str,
+    metadata: MetadataStore,
+    rows: np.ndarray,
+    normalize: Callable[[str], str],
+    threshold: float = 0.85,
+    num_perm: int = 64,
+    bands: int = 16,
+) -> FuzzyMatcher:
+    """LSH tables saved with the index, or built from the metadata rows when missing or stale."""
+    if os.path.exists(path):
+        matcher = FuzzyMatcher.load(path, metadata, normalize, threshold)
+        if matcher.num_perm == num_perm and matcher.bands == bands and np.array_equal(matcher.row_ids, rows):
+            return matcher
+        logger.warning("Fuzzy matcher tables do not match the L1 table or settings; rebuilding")
+    return FuzzyMatcher.build(metadata, rows, normalize, threshold=threshold, num_perm=num_perm, bands=bands)
@@ -0,0 +1,303 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+import redis
+import redis.asyncio as aioredis
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """An in-process computation of a hint other threads can wait for."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Optional[str] = None
+
+
+class HintCache:
+    """Final hints shared by all workers through Redis.
+
+    Keys combine the KB index version with the normalized query (and category filter), so a
+    reindex starts a new key space; entries of old builds expire by TTL. Concurrent identical
+    queries are coalesced: within a process followers wait for the leader's result, across
+    processes a Redis lock elects the leader and the others poll for its entry.
+    Values are stored as JSON of `model`; only hints accepted by `cacheable` are stored.
+    """
+
+    def __init__(
+        self,
+        model: type,
+        ttl_seconds: int,
+        lock_timeout_seconds: float,
+        wait_seconds: float,
+        poll_seconds: float = 0.05,
+        redis_client: Optional[redis.Redis] = None,
+        async_redis_client: Optional[aioredis.Redis] = None,
+    ):
+        self.model = model
+        self.ttl_seconds = ttl_seconds
+        self.lock_timeout_seconds = lock_timeout_seconds
+        self.wait_seconds = wait_seconds
+        self.poll_seconds = poll_seconds
+        self.redis_client = redis_client
+        self.async_redis_client = async_redis_client
+
+        self._flights: Dict[str, _Flight] = {}
+        self._async_flights: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def key(index_version: Optional[str], normalized_text: str, category: Optional[str] = None) -> str:
+        text_hash = hashlib.sha1(f"{normalized_text}\x1f{category or ''}".encode("utf-8")).hexdigest()
+        return f"hint:{index_version or 'none'}:{text_hash}"
+
+    @staticmethod
+    def cacheable(hint: BaseModel) -> bool:
+        """Degraded, failed and not-found hints depend on transient state and are not shared."""
+        return not getattr(hint, "degraded", False) and getattr(hint, "confidence", 0) > 0
+
+    def _load(self, value) -> Optional[BaseModel]:
+        if not value:
+            return None
+        try:
+            return self.model.model_validate_json(value)
+        except ValueError as e:
+            logger.warning(f"Hint cache: dropping unreadable entry: {e}")
+            return None
+
+    # --- sync API ---
+
+    def get(self, key: str) -> Optional[BaseModel]:
+        if self.redis_client is None:
+            return None
+        try:
+            hint = self._load(self.redis_client.get(key))
+        except redis.RedisError as e:
+            logger.warning(f"Hint cache: Redis GET failed: {e}")
+            return None
+        if hint is not None:
+            self.hits += 1
+        return hint
+
+    def set(self, key: str, hint: BaseModel):
+        with self._lock:
+            flight = self._flights.get(key)
+        if flight is not None:
+            flight.value = hint.model_dump_json() if self.cacheable(hint) else None
+        if self.redis_client is None or not self.cacheable(hint):
+            return
+        try:
+            self.redis_client.set(key, hint.model_dump_json(), ex=self.ttl_seconds)
+        except redis.RedisError as e:
+            logger.warning(f"Hint cache: Redis SET failed: {e}")
+
+    @contextmanager
+    def coalesce(self, key: str, max_wait: Optional[float] = None) -> Iterator[Optional[BaseModel]]:
+        """Yield a cached hint, or None when the caller should compute it and `set` the result.
+
+        Waits at most `max_wait` seconds (default `wait_seconds`) for another computation.
+        """
+        wait = self.wait_seconds if max_wait is None else max(min(max_wait, self.wait_seconds), 0)
+        hint = self.get(key)
+        if hint is not None:
+            yield hint
+            return
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            self.coalesced += 1
+            flight.done.wait(wait)
+            hint = self._load(flight.value)
+            if hint is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+            yield hint
+            return
+
+        lock = None
+        try:
+            lock = self._acquire(key)
+            if lock is False:
+                # another worker computes this hint
+                hint = self._poll(key, wait)
+                if hint is not None:
+                    flight.value = hint.model_dump_json()
+                    yield hint
+                    return
+            self.misses += 1
+            yield None
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+            if lock:
+                try:
+                    lock.release()
+                except redis.RedisError:
+                    # expired or lost: the entry is written anyway
+                    pass
+
+    def _acquire(self, key: str):
+        """Redis lock object when acquired, False when held by another worker, None without Redis."""
+        if self.redis_client is None:
+            return None
+        lock = self.redis_client.lock(f"{key}:lock", timeout=self.lock_timeout_seconds)
+        try:
+            return lock if lock.acquire(blocking=False) else False
+        except redis.RedisError as e:
+            logger.warning(f"Hint cache: Redis lock failed: {e}")
+            return None
+
+    def _poll(self, key: str, wait: float) -> Optional[BaseModel]:
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_seconds)
+            hint = self.get(key)
+            if hint is not None:
+                self.coalesced += 1
+                return hint
+        return None
+
+    # --- async API ---
+
+    async def aget(self, key: str) -> Optional[BaseModel]:
+        if self.async_redis_client is None:
+            return None
+        try:
+            hint = self._load(await self.async_redis_client.get(key))
+        except redis.RedisError as e:
+            logger.warning(f"Hint cache: Redis GET failed: {e}")
+            return None
+        if hint is not None:
+            self.hits += 1
+        return hint
+
+    async def aset(self, key: str, hint: BaseModel):
+        future = self._async_flights.get(key)
+        if future is not None and not future.done():
+            future.set_result(hint.model_dump_json() if self.cacheable(hint) else None)
+        if self.async_redis_client is None or not self.cacheable(hint):
+            return
+        try:
+            await self.async_redis_client.set(key, hint.model_dump_json(), ex=self.ttl_seconds)
+        except redis.RedisError as e:
+            logger.warning(f"Hint cache: Redis SET failed: {e}")
+
+    async def aget_many(self, keys: List[str]) -> List[Optional[BaseModel]]:
+        """Look up many keys with one MGET (batch API, no coalescing)."""
+        if self.async_redis_client is None or not keys:
+            return [None] * len(keys)
+        try:
+            values = await self.async_redis_client.mget(keys)
+        except redis.RedisError as e:
+            logger.warning(f"Hint cache: Redis MGET failed: {e}")
+            return [None] * len(keys)
+        hints = [self._load(value) for value in values]
+        found = sum(1 for hint in hints if hint is not None)
+        self.hits += found
+        self.misses += len(keys) - found
+        return hints
+
+    async def aset_many(self, items: Dict[str, BaseModel]):
+        items = {key: hint for key, hint in items.items() if self.cacheable(hint)}
+        if self.async_redis_client is None or not items:
+            return
+        try:
+            pipeline = self.async_redis_client.pipeline(transaction=False)
+            for key, hint in items.items():
+                pipeline.set(key, hint.model_dump_json(), ex=self.ttl_seconds)
+            await pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Hint cache: Redis SET failed: {e}")
+
+    @asynccontextmanager
+    async def acoalesce(self, key: str, max_wait: Optional[float] = None) -> AsyncIterator[Optional[BaseModel]]:
+        """Async variant of `coalesce`; the caller computes the hint and calls `aset`."""
+        wait = self.wait_seconds if max_wait is None else max(min(max_wait, self.wait_seconds), 0)
+        hint = await self.aget(key)
+        if hint is not None:
+            yield hint
+            return
+
+        future = self._async_flights.get(key)
+        if future is not None:
+            self.coalesced += 1
+            try:
+                hint = self._load(await asyncio.wait_for(asyncio.shield(future), wait))
+            except asyncio.TimeoutError:
+                hint = None
+            if hint is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+            yield hint
+            return
+
+        future = self._async_flights[key] = asyncio.get_running_loop().create_future()
+        lock = None
+        try:
+            lock = await self._aacquire(key)
+            if lock is False:
+                hint = await self._apoll(key, wait)
+                if hint is not None:
+                    future.set_result(hint.model_dump_json())
+                    yield hint
+                    return
+            self.misses += 1
+            yield None
+        finally:
+            if self._async_flights.get(key) is future:
+                del self._async_flights[key]
+            if not future.done():
+                future.set_result(None)
+            if lock:
+                try:
+                    await lock.release()
+                except redis.RedisError:
+                    pass
+
+    async def _aacquire(self, key: str):
+        if self.async_redis_client is None:
+            return None
+        lock = self.async_redis_client.lock(f"{key}:lock", timeout=self.lock_timeout_seconds)
+        try:
+            return lock if await lock.acquire(blocking=False) else False
+        except redis.RedisError as e:
+            logger.warning(f"Hint cache: Redis lock failed: {e}")
+            return None
+
+    async def _apoll(self, key: str, wait: float) -> Optional[BaseModel]:
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_seconds)
+            hint = await self.aget(key)
+            if hint is not None:
+                self.coalesced += 1
+                return hint
+        return None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._flights) + len(self._async_flights),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,275 @@
+import asyncio
+import fcntl
+import logging
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterator, List, Optional
+
+import redis
+import redis.asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+# files of one knowledge base build
+FAISS_INDEX_FILE = "faiss_index_bge_m3.bin"
+METADATA_FILE = "metadata.json"
+METADATA_STORE_DIR = "metadata_store"
+INDEX_CONFIG_FILE = "index_config.json"
+L1_INDEX_FILE = "l1_index.npy"
+AMBIGUITY_MAP_FILE = "ambiguity_map.npz"
+FUZZY_INDEX_FILE = "fuzzy_lsh.npz"
+
+BUNDLES_DIR = "bundles"
+# name of the published bundle, replaced atomically by `publish_bundle`
+CURRENT_FILE = "CURRENT"
+STAGING_PREFIX = ".staging-"
+# held (flock) by the process building a bundle
+BUILD_LOCK_FILE = ".build.lock"
+
+
+@dataclass(frozen=True)
+class IndexBundle:
+    """Directory holding the files of one knowledge base build.
+
+    Published bundles live in `<data_dir>/bundles/<version>` and are never modified after
+    publishing, so a worker can keep serving (and memory-mapping) an old bundle while a new
+    one is built. Without a published bundle the files are read from `data_dir` itself
+    (the original flat layout) and `version` is None.
+    """
+
+    root: str
+    version: Optional[str] = None
+
+    @property
+    def faiss_index_path(self) -> str:
+        return os.path.join(self.root, FAISS_INDEX_FILE)
+
+    @property
+    def metadata_path(self) -> str:
+        return os.path.join(self.root, METADATA_FILE)
+
+    @property
+    def metadata_store_path(self) -> str:
+        return os.path.join(self.root, METADATA_STORE_DIR)
+
+    @property
+    def index_config_path(self) -> str:
+        return os.path.join(self.root, INDEX_CONFIG_FILE)
+
+    @property
+    def l1_index_path(self) -> str:
+        return os.path.join(self.root, L1_INDEX_FILE)
+
+    @property
+    def ambiguity_map_path(self) -> str:
+        return os.path.join(self.root, AMBIGUITY_MAP_FILE)
+
+    @property
+    def fuzzy_index_path(self) -> str:
+        return os.path.join(self.root, FUZZY_INDEX_FILE)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.faiss_index_path) and os.path.exists(self.metadata_path)
+
+
+def read_current_version(data_dir: str) -> Optional[str]:
+    """Version of the published bundle, None when nothing was published yet."""
+    try:
+        with open(os.path.join(data_dir, CURRENT_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def current_bundle(data_dir: str) -> IndexBundle:
+    """The published bundle, or the flat layout in `data_dir` when there is none."""
+    version = read_current_version(data_dir)
+    if version is not None:
+        root = os.path.join(data_dir, BUNDLES_DIR, version)
+        if os.path.isdir(root):
+            return IndexBundle(root, version)
+        logger.warning(f"Index bundle '{version}' named in {CURRENT_FILE} is missing, using {data_dir}")
+    return IndexBundle(data_dir)
+
+
+def create_staging_bundle(data_dir: str) -> IndexBundle:
+    """Empty directory a new build is written to before `publish_bundle`."""
+    root = os.path.join(data_dir, BUNDLES_DIR, f"{STAGING_PREFIX}{os.getpid()}-{time.time_ns()}")
+    os.makedirs(root)
+    return IndexBundle(root)
+
+
+@contextmanager
+def build_lock(data_dir: str) -> Iterator[None]:
+    """Exclusive lock across processes, so only one of them builds the index at a time."""
+    os.makedirs(data_dir, exist_ok=True)
+    with open(os.path.join(data_dir, BUILD_LOCK_FILE), "a") as f:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logger.info("Index build in progress in another process, waiting for it...")
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _fsync_dir(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def publish_bundle(data_dir: str, staging: IndexBundle, version: str) -> IndexBundle:
+    """Move a finished staging bundle to `bundles/<version>` and point CURRENT at it.
+
+    Both steps are renames, so readers see either the old or the new bundle, never a
+    partially written one. Publishing a version that already exists (an identical rebuild)
+    drops the staging copy.
+    """
+    bundles_dir = os.path.join(data_dir, BUNDLES_DIR)
+    root = os.path.join(bundles_dir, version)
+    if os.path.isdir(root):
+        shutil.rmtree(staging.root)
+        os.utime(root)
+    else:
+        os.rename(staging.root, root)
+    _fsync_dir(bundles_dir)
+
+    tmp_path = os.path.join(data_dir, f"{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(data_dir, CURRENT_FILE))
+    _fsync_dir(data_dir)
+    logger.info(f"Published index bundle {version}")
+    return IndexBundle(root, version)
+
+
+def prune_bundles(data_dir: str, keep: int) -> List[str]:
+    """Delete all but the `keep` most recently published bundles (never the current one).
+
+    Workers still serving a deleted bundle are unaffected: its files stay readable through
+    the open memory maps until the worker switches over.
+    """
+    bundles_dir = os.path.join(data_dir, BUNDLES_DIR)
+    if not os.path.isdir(bundles_dir):
+        return []
+    current = read_current_version(data_dir)
+    bundles = [
+        entry for entry in os.scandir(bundles_dir) if entry.is_dir() and not entry.name.startswith(STAGING_PREFIX)
+    ]
+    bundles.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+
+    removed = []
+    for entry in bundles[max(keep, 1) :]:
+        if entry.name == current:
+            continue
+        shutil.rmtree(entry.path, ignore_errors=True)
+        removed.append(entry.name)
+    if removed:
+        logger.info(f"Removed old index bundles: {removed}")
+    return removed
+
+
+def notify_published(redis_client: Optional[redis.Redis], channel: str, version: str):
+    """Tell running workers about a new bundle; they also notice it by polling CURRENT."""
+    if redis_client is None:
+        return
+    try:
+        redis_client.publish(channel, version)
+    except redis.RedisError as e:
+        logger.warning(f"Could not announce index bundle {version}: {e}")
+
+
+class BundleWatcher:
+    """Detects newly published bundles and triggers a reload of the served components.
+
+    CURRENT is checked every `poll_seconds`; a Redis notification on `channel` only wakes
+    the watcher up early. `served_version` returns the version in use (None while nothing is
+    loaded yet, the first load reads the current bundle anyway) and `reload` returns whether
+    the switch succeeded. A version that failed to load is not retried until CURRENT changes.
+    """
+
+    def __init__(
+        self,
+        data_dir: str,
+        served_version: Callable[[], Optional[str]],
+        reload: Callable[[], Awaitable[bool]],
+        poll_seconds: float = 5.0,
+        redis_client: Optional[aioredis.Redis] = None,
+        channel: str = "rag:index_published",
+        resubscribe_seconds: float = 60.0,
+    ):
+        self.data_dir = data_dir
+        self.served_version = served_version
+        self.reload = reload
+        self.poll_seconds = poll_seconds
+        self.redis_client = redis_client
+        self.channel = channel
+        self.resubscribe_seconds = resubscribe_seconds
+
+        self._pubsub = None
+        self._subscribe_after = 0.0
+        self._failed_version: Optional[str] = None
+        self.reloads = 0
+
+    async def check(self) -> bool:
+        """Reload when CURRENT names a bundle other than the served one."""
+        served = self.served_version()
+        version = read_current_version(self.data_dir)
+        if served is None or version is None or version in (served, self._failed_version):
+            return False
+
+        logger.info(f"Index bundle {version} published, switching from {served}")
+        if await self.reload():
+            self.reloads += 1
+            self._failed_version = None
+            return True
+        self._failed_version = version
+        return False
+
+    async def _subscribe(self):
+        if self.redis_client is None or self._pubsub is not None or time.monotonic() < self._subscribe_after:
+            return
+        try:
+            pubsub = self.redis_client.pubsub()
+            await pubsub.subscribe(self.channel)
+            self._pubsub = pubsub
+        except redis.RedisError as e:
+            logger.warning(f"Index watcher: Redis subscribe failed, polling only: {e}")
+            self._subscribe_after = time.monotonic() + self.resubscribe_seconds
+
+    async def _wait(self):
+        await self._subscribe()
+        if self._pubsub is None:
+            await asyncio.sleep(self.poll_seconds)
+            return
+        try:
+            await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=self.poll_seconds)
+        except redis.RedisError as e:
+            logger.warning(f"Index watcher: Redis connection lost, polling only: {e}")
+            self._pubsub = None
+            self._subscribe_after = time.monotonic() + self.resubscribe_seconds
+
+    async def run(self):
+        try:
+            while True:
+                await self._wait()
+                try:
+                    await self.check()
+                except Exception as e:
+                    logger.error(f"Index watcher: check failed: {e}", exc_info=True)
+        finally:
+            if self._pubsub is not None:
+                try:
+                    await self._pubsub.close()
+                except redis.RedisError:
+                    pass
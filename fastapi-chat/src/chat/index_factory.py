@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Dict, Optional
+
+import faiss
+import numpy as np
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "sq8", "ivf_sq8")
+
+# FAISS recommends at least this many training points per IVF centroid
+MIN_POINTS_PER_CENTROID = 39
+
+
+@dataclass
+class IndexSpec:
+    """Type and parameters of the FAISS index; recorded next to the index file."""
+
+    index_type: str = "flat"
+    # IVF: number of inverted lists and lists probed per query
+    nlist: int = 100
+    nprobe: int = 8
+    # HNSW: graph degree, construction and search beam width
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    ef_search: int = 64
+
+    def __post_init__(self):
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type '{self.index_type}', expected one of {INDEX_TYPES}")
+
+    @classmethod
+    def from_settings(cls) -> "IndexSpec":
+        return cls(
+            index_type=settings.RAG_INDEX_TYPE,
+            nlist=settings.RAG_INDEX_NLIST,
+            nprobe=settings.RAG_INDEX_NPROBE,
+            hnsw_m=settings.RAG_INDEX_HNSW_M,
+            ef_construction=settings.RAG_INDEX_EF_CONSTRUCTION,
+            ef_search=settings.RAG_INDEX_EF_SEARCH,
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IndexSpec":
+        names = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in names})
+
+    @classmethod
+    def parse(cls, text: str) -> "IndexSpec":
+        """Parse a compact spec such as "ivf:nlist=256,nprobe=16" or "hnsw:hnsw_m=32"."""
+        index_type, _, params = text.partition(":")
+        spec = cls(index_type=index_type.strip())
+        for param in filter(None, params.split(",")):
+            key, _, value = param.partition("=")
+            key = key.strip()
+            if key not in {f.name for f in fields(cls)} or key == "index_type":
+                raise ValueError(f"Unknown index parameter '{key}'")
+            setattr(spec, key, int(value))
+        return spec
+
+    @property
+    def label(self) -> str:
+        if self.index_type in ("ivf", "ivf_sq8"):
+            return f"{self.index_type}(nlist={self.nlist},nprobe={self.nprobe})"
+        if self.index_type == "hnsw":
+            return f"hnsw(M={self.hnsw_m},efC={self.ef_construction},efS={self.ef_search})"
+        return self.index_type
+
+
+def _factory_string(spec: IndexSpec, nlist: int) -> str:
+    return {
+        "flat": "Flat",
+        "ivf": f"IVF{nlist},Flat",
+        "hnsw": f"HNSW{spec.hnsw_m}",
+        "sq8": "SQ8",
+        "ivf_sq8": f"IVF{nlist},SQ8",
+    }[spec.index_type]
+
+
+def build_index(embeddings: np.ndarray, spec: IndexSpec) -> faiss.Index:
+    """Build and fill an inner-product index over L2-normalized embeddings."""
+    n, dimension = embeddings.shape
+    nlist = spec.nlist
+    if spec.index_type in ("ivf", "ivf_sq8"):
+        nlist = max(1, min(spec.nlist, n // MIN_POINTS_PER_CENTROID or 1))
+        if nlist != spec.nlist:
+            logger.warning(f"Reducing IVF nlist from {spec.nlist} to {nlist} for {n} vectors")
+            spec.nlist = nlist
+
+    index = faiss.index_factory(dimension, _factory_string(spec, nlist), faiss.METRIC_INNER_PRODUCT)
+    if spec.index_type == "hnsw":
+        index.hnsw.efConstruction = spec.ef_construction
+
+    start_time = time.perf_counter()
+    if not index.is_trained:
+        index.train(embeddings)
+    index.add(embeddings)
+    logger.info(f"Built {spec.label} index over {n} vectors in {time.perf_counter() - start_time:.2f}s")
+
+    apply_search_params(index, spec)
+    return index
+
+
+def apply_search_params(index: faiss.Index, spec: IndexSpec):
+    """Apply query-time parameters (nprobe, efSearch) to a loaded index."""
+    parameter_space = faiss.ParameterSpace()
+    if spec.index_type in ("ivf", "ivf_sq8"):
+        parameter_space.set_index_parameter(index, "nprobe", spec.nprobe)
+    elif spec.index_type == "hnsw":
+        parameter_space.set_index_parameter(index, "efSearch", spec.ef_search)
+
+
+def save_index_spec(path: str, spec: IndexSpec, index: faiss.Index):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            {**asdict(spec), "dimension": int(index.d), "ntotal": int(index.ntotal), "built_at": time.time()},
+            f,
+            indent=2,
+        )
+
+
+def load_index_spec(path: str) -> Optional[IndexSpec]:
+    """Read the recorded spec; indexes built before specs were recorded are flat."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return IndexSpec.from_dict(json.load(f))
+
+
+def serving_index_spec(path: str) -> IndexSpec:
+    """Recorded spec with query-time parameters overridden by explicitly configured settings."""
+    spec = load_index_spec(path) or IndexSpec()
+    if "RAG_INDEX_NPROBE" in settings.model_fields_set:
+        spec.nprobe = settings.RAG_INDEX_NPROBE
+    if "RAG_INDEX_EF_SEARCH" in settings.model_fields_set:
+        spec.ef_search = settings.RAG_INDEX_EF_SEARCH
+    return spec
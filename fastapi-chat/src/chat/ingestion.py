@@ -0,0 +1,142 @@
+import logging
+import os
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# source columns of every knowledge base field, in priority order: per row the first
+# non-empty one wins (fields in the key order of metadata.json records)
+FIELD_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "question": ("Пример вопроса", "Вопрос клиента", "question", "Вопрос"),
+    "category": ("Основная категория", "Категория", "category"),
+    "subcategory": ("Подкатегория", "subcategory"),
+    "template": ("Шаблонный ответ", "Шаблон ответа", "template", "Ответ", "ответ"),
+    "keywords": ("Ключевые слова", "keywords"),
+}
+# rows without these are skipped
+REQUIRED_FIELDS = ("question", "template")
+
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm")
+SUPPORTED_EXTENSIONS = EXCEL_EXTENSIONS + (".csv", ".parquet")
+
+
+def resolve_columns(columns: Sequence[str]) -> Dict[str, List[str]]:
+    """Map every field to the source columns present in the dataset (resolved once per file)."""
+    present = set(columns)
+    mapping = {
+        field: [column for column in candidates if column in present] for field, candidates in FIELD_COLUMNS.items()
+    }
+    missing = [field for field in REQUIRED_FIELDS if not mapping[field]]
+    if missing:
+        raise ValueError(f"Dataset has no column for {missing}; expected one of {[FIELD_COLUMNS[f] for f in missing]}")
+    return mapping
+
+
+def _clean(values: pd.Series) -> pd.Series:
+    """Stripped strings with missing values (NaN, None, 'nan') as ''."""
+    values = values.where(values.notna(), "").astype(str).str.strip()
+    return values.mask(values == "nan", "")
+
+
+def extract_records(frame: pd.DataFrame, mapping: Dict[str, List[str]], start_row: int = 0) -> Tuple[pd.DataFrame, int]:
+    """Knowledge base records of a chunk with column operations instead of a per-row loop.
+
+    Returns a frame with `index` (row number in the dataset) and the field columns, and the
+    number of rows skipped for a missing question or template.
+    """
+    fields = {"index": np.arange(start_row, start_row + len(frame), dtype=np.int64)}
+    for field, sources in mapping.items():
+        value = pd.Series("", index=frame.index, dtype=object)
+        # lowest priority first, so higher priority columns overwrite it where they are set
+        for column in reversed(sources):
+            candidate = _clean(frame[column])
+            value = candidate.where(candidate != "", value)
+        fields[field] = value.to_numpy()
+    for field in FIELD_COLUMNS:
+        fields.setdefault(field, np.full(len(frame), "", dtype=object))
+
+    records = pd.DataFrame(fields)
+    valid = np.ones(len(records), dtype=bool)
+    for field in REQUIRED_FIELDS:
+        valid &= (records[field] != "").to_numpy()
+    return records[valid].reset_index(drop=True), int(len(records) - valid.sum())
+
+
+def _excel_rows(path: str) -> Iterator[tuple]:
+    # read-only mode streams rows from the sheet XML instead of loading the workbook
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _excel_header(row: tuple) -> List[str]:
+    return [str(value) if value is not None else f"Unnamed: {i}" for i, value in enumerate(row)]
+
+
+def read_columns(path: str) -> List[str]:
+    """Column names of a dataset without reading its rows."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in EXCEL_EXTENSIONS:
+        return _excel_header(next(_excel_rows(path), ()))
+    if extension == ".csv":
+        return list(pd.read_csv(path, nrows=0).columns)
+    if extension == ".parquet":
+        import pyarrow.parquet as pq
+
+        return list(pq.ParquetFile(path).schema_arrow.names)
+    raise ValueError(f"Unsupported dataset format '{extension}', expected one of {SUPPORTED_EXTENSIONS}")
+
+
+def iter_frames(path: str, columns: Sequence[str], chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Read only `columns` of a dataset in chunks of at most `chunk_rows` rows."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in EXCEL_EXTENSIONS:
+        rows = _excel_rows(path)
+        header = _excel_header(next(rows, ()))
+        positions = [header.index(column) for column in columns]
+        chunk = []
+        for row in rows:
+            chunk.append([row[i] if i < len(row) else None for i in positions])
+            if len(chunk) >= chunk_rows:
+                yield pd.DataFrame(chunk, columns=list(columns), dtype=object)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=list(columns), dtype=object)
+    elif extension == ".csv":
+        yield from pd.read_csv(path, usecols=list(columns), dtype=str, chunksize=chunk_rows)
+    elif extension == ".parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=list(columns)):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Unsupported dataset format '{extension}', expected one of {SUPPORTED_EXTENSIONS}")
+
+
+def iter_knowledge_base(path: str, chunk_rows: int = 10_000) -> Iterator[pd.DataFrame]:
+    """Stream knowledge base records (see `extract_records`) from an Excel, CSV or Parquet file.
+
+    Only the mapped columns are read and at most `chunk_rows` source rows are held at a time.
+    """
+    mapping = resolve_columns(read_columns(path))
+    logger.info(f"Dataset columns: {mapping}")
+    source_columns = list(dict.fromkeys(column for sources in mapping.values() for column in sources))
+
+    rows = 0
+    skipped = 0
+    for frame in iter_frames(path, source_columns, chunk_rows):
+        records, chunk_skipped = extract_records(frame, mapping, start_row=rows)
+        rows += len(frame)
+        skipped += chunk_skipped
+        if len(records):
+            yield records
+    if skipped:
+        logger.warning(f"Skipped {skipped} of {rows} dataset rows without question or template")
+    logger.info(f"Read {rows - skipped} knowledge base records from {path}")
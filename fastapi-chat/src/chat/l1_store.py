@@ -0,0 +1,155 @@
+import hashlib
+import logging
+import os
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import numpy as np
+
+from src.chat.metadata_store import MetadataStore
+
+logger = logging.getLogger(__name__)
+
+# one slot of the hash table: 64-bit key of the normalized question and its metadata row
+SLOT_DTYPE = np.dtype([("key", "<u8"), ("row", "<i4")])
+# key of an unused slot, `text_key` never returns it
+EMPTY_KEY = 0
+# at most half of the slots are used, so a lookup probes ~1.5 slots on average
+MAX_LOAD_FACTOR = 0.5
+
+
+def text_key(normalized: str) -> int:
+    """64-bit hash of a normalized question."""
+    key = int.from_bytes(hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest(), "little")
+    return key or 1
+
+
+def build_table(keys: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Open addressing (linear probing) table over a power of two number of slots.
+
+    Keys must be unique. Insertion is vectorized: in each round every pending key claims
+    its current slot, one key per free slot wins and the others move on to the next slot.
+    A key only passes slots that are taken, so lookups find it by probing from its home slot.
+    """
+    capacity = 2
+    while capacity * MAX_LOAD_FACTOR < len(keys):
+        capacity <<= 1
+    mask = capacity - 1
+
+    table = np.zeros(capacity, dtype=SLOT_DTYPE)
+    keys = np.asarray(keys, dtype=np.uint64)
+    rows = np.asarray(rows, dtype=np.int32)
+    positions = (keys & np.uint64(mask)).astype(np.int64)
+    pending = np.arange(len(keys))
+    while len(pending):
+        slots = positions[pending]
+        free = np.flatnonzero(table["key"][slots] == EMPTY_KEY)
+        claimed, first = np.unique(slots[free], return_index=True)
+        placed = pending[free[first]]
+        table["key"][claimed] = keys[placed]
+        table["row"][claimed] = rows[placed]
+
+        waiting = np.ones(len(pending), dtype=bool)
+        waiting[free[first]] = False
+        pending = pending[waiting]
+        positions[pending] = (positions[pending] + 1) & mask
+    return table
+
+
+class L1Store:
+    """L1 exact-match lookup: normalized question hash -> knowledge base row.
+
+    Only the hash table is stored (12 bytes per slot, memory-mapped and shared by all
+    workers); question, template and category of a hit are read from the metadata store,
+    so opening the store reads no entries. A hit is confirmed by comparing the normalized
+    question of the row, a hash collision is a miss.
+    """
+
+    def __init__(self, table: np.ndarray, metadata: MetadataStore, normalize: Callable[[str], str]):
+        if table.dtype != SLOT_DTYPE or len(table) & (len(table) - 1):
+            raise ValueError("Not an L1 hash table")
+        self.table = table
+        self.metadata = metadata
+        self.normalize = normalize
+        # plain ndarray views of the (memory-mapped) table, indexing np.memmap is slower
+        self._keys = np.asarray(table)["key"]
+        self._rows = np.asarray(table)["row"]
+        self._mask = len(table) - 1
+        self._size: Optional[int] = None
+
+    @classmethod
+    def build(cls, metadata: MetadataStore, normalize: Callable[[str], str]) -> "L1Store":
+        """Index the metadata rows with both a question and a template.
+
+        For repeated questions the last row wins, as in the JSON cache this replaces.
+        """
+        keys = []
+        rows = []
+        for row in range(len(metadata)):
+            question = metadata.get_value(row, "question")
+            if question and metadata.get_value(row, "template"):
+                keys.append(text_key(normalize(question)))
+                rows.append(row)
+        keys = np.array(keys, dtype=np.uint64)
+        rows = np.array(rows, dtype=np.int32)
+
+        _, last = np.unique(keys[::-1], return_index=True)
+        last = len(keys) - 1 - last
+        return cls(build_table(keys[last], rows[last]), metadata, normalize)
+
+    @classmethod
+    def load(cls, path: str, metadata: MetadataStore, normalize: Callable[[str], str]) -> "L1Store":
+        return cls(np.load(path, mmap_mode="r"), metadata, normalize)
+
+    def save(self, path: str):
+        # written next to the target and renamed, workers may be opening it concurrently
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.asarray(self.table))
+        os.replace(tmp_path, path)
+
+    def find(self, normalized: str) -> Optional[int]:
+        """Metadata row whose question hashes like `normalized`, None on a miss."""
+        key = text_key(normalized)
+        slot = key & self._mask
+        while True:
+            slot_key = int(self._keys[slot])
+            if slot_key == key:
+                return int(self._rows[slot])
+            if slot_key == EMPTY_KEY:
+                return None
+            slot = (slot + 1) & self._mask
+
+    def _entry(self, row: int, normalized: str) -> Dict[str, Any]:
+        entry = self.metadata[row]
+        entry["normalized_question"] = normalized
+        return entry
+
+    def get(self, normalized: str) -> Optional[Dict[str, Any]]:
+        """Entry (metadata row plus `normalized_question`) of an exact match, None on a miss."""
+        row = self.find(normalized)
+        if row is None or row >= len(self.metadata):
+            return None
+        question = self.metadata.get_value(row, "question")
+        if self.normalize(question) != normalized:
+            return None
+        return self._entry(row, normalized)
+
+    def rows(self) -> np.ndarray:
+        """Metadata rows of all indexed entries, ascending."""
+        return np.sort(self._rows[self._keys != EMPTY_KEY])
+
+    def entries(self) -> Iterator[Dict[str, Any]]:
+        """All indexed entries in metadata order."""
+        for row in self.rows():
+            row = int(row)
+            yield self._entry(row, self.normalize(self.metadata.get_value(row, "question")))
+
+    def __len__(self) -> int:
+        # counted on first use, opening the store does not touch the table
+        if self._size is None:
+            self._size = int(np.count_nonzero(self._keys))
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        return self.table.nbytes
@@ -0,0 +1,172 @@
+import json
+import logging
+import mmap
+import os
+import shutil
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TEXT_COLUMNS = ("question", "template", "category", "subcategory", "keywords")
+MANIFEST_FILE = "manifest.json"
+OFFSETS_FILE = "offsets.npy"
+ROW_INDEX_FILE = "row_index.npy"
+
+
+class MetadataStore(Sequence[Dict[str, Any]]):
+    """Read-only columnar knowledge base metadata backed by memory-mapped files.
+
+    Every text column is stored as one UTF-8 blob plus a shared offsets table, so a row
+    is decoded lazily on access and all worker processes share the OS page cache instead
+    of holding private lists of dicts. Rows behave like the dicts of `metadata.json`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.columns: List[str] = self.manifest["columns"]
+
+        # offsets[column, row] .. offsets[column, row + 1] is the byte range of a value
+        self._offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode="r")
+        self._row_index = np.load(os.path.join(path, ROW_INDEX_FILE), mmap_mode="r")
+        self._blobs = [self._map(os.path.join(path, f"{column}.bin")) for column in self.columns]
+
+    @staticmethod
+    def _map(path: str):
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return len(self._row_index)
+
+    def get_value(self, row: int, column: str) -> str:
+        """Decode a single field without materializing the whole row."""
+        column_id = self.columns.index(column)
+        start, end = self._offsets[column_id, row], self._offsets[column_id, row + 1]
+        return self._blobs[column_id][start:end].decode("utf-8")
+
+    def __getitem__(self, row: int) -> Dict[str, Any]:
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("metadata row out of range")
+
+        item: Dict[str, Any] = {"index": int(self._row_index[row])}
+        for column_id, column in enumerate(self.columns):
+            start, end = self._offsets[column_id, row], self._offsets[column_id, row + 1]
+            item[column] = self._blobs[column_id][start:end].decode("utf-8")
+        return item
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for row in range(len(self)):
+            yield self[row]
+
+    def close(self):
+        for blob in self._blobs:
+            if isinstance(blob, mmap.mmap):
+                blob.close()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(blob) for blob in self._blobs) + self._offsets.nbytes + self._row_index.nbytes
+
+
+class MetadataStoreWriter:
+    """Builds a columnar store record by record, so records can be streamed in.
+
+    `close` moves the finished store to `path` atomically (replacing an existing one);
+    used as a context manager the partial store is discarded on error.
+    """
+
+    def __init__(self, path: str, columns: Sequence[str] = TEXT_COLUMNS):
+        self.path = path
+        self.columns = list(columns)
+        self.tmp_path = f"{path}.tmp"
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        os.makedirs(self.tmp_path)
+
+        self._files = [open(os.path.join(self.tmp_path, f"{column}.bin"), "wb") for column in self.columns]
+        self._offsets = [array("q", [0]) for _ in self.columns]
+        self._row_index = array("q")
+
+    def __len__(self) -> int:
+        return len(self._row_index)
+
+    def append(self, record: Dict[str, Any]):
+        self._row_index.append(int(record.get("index", len(self._row_index))))
+        for column_id, column in enumerate(self.columns):
+            value = str(record.get(column, "") or "").encode("utf-8")
+            self._files[column_id].write(value)
+            self._offsets[column_id].append(self._offsets[column_id][-1] + len(value))
+
+    def _close_files(self):
+        for f in self._files:
+            f.close()
+
+    def close(self):
+        self._close_files()
+        offsets = np.stack([np.frombuffer(column_offsets, dtype=np.int64) for column_offsets in self._offsets])
+        np.save(os.path.join(self.tmp_path, OFFSETS_FILE), offsets)
+        np.save(os.path.join(self.tmp_path, ROW_INDEX_FILE), np.frombuffer(self._row_index, dtype=np.int64))
+        with open(os.path.join(self.tmp_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump({"columns": self.columns, "rows": len(self._row_index)}, f)
+
+        old_path = f"{self.path}.old"
+        if os.path.exists(self.path):
+            shutil.rmtree(old_path, ignore_errors=True)
+            os.replace(self.path, old_path)
+        os.replace(self.tmp_path, self.path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        logger.info(f"Metadata store with {len(self._row_index)} rows written to {self.path}")
+
+    def abort(self):
+        self._close_files()
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+
+    def __enter__(self) -> "MetadataStoreWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_metadata_store(path: str, records: Iterable[Dict[str, Any]], columns: Sequence[str] = TEXT_COLUMNS):
+    """Write metadata records into a columnar store, replacing any existing store at `path` atomically."""
+    with MetadataStoreWriter(path, columns) as writer:
+        for record in records:
+            writer.append(record)
+
+
+class MetadataJsonWriter:
+    """Streams records into `metadata.json` (the same output as `json.dump(records, f, indent=2)`)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8")
+        self._count = 0
+
+    def append(self, record: Dict[str, Any]):
+        text = json.dumps(record, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+        self._file.write(("[\n  " if self._count == 0 else ",\n  ") + text)
+        self._count += 1
+
+    def close(self):
+        self._file.write("\n]" if self._count else "[]")
+        self._file.close()
+
+    def __enter__(self) -> "MetadataJsonWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,64 @@
+import os
+from typing import Dict, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Stage latencies span sub-millisecond lookups to multi-second LLM calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HINT_DURATION = Histogram(
+    "rag_hint_duration_seconds",
+    "End-to-end hint generation time.",
+    ["route"],
+    buckets=LATENCY_BUCKETS,
+)
+STAGE_DURATION = Histogram(
+    "rag_hint_stage_duration_seconds",
+    "Time spent in a hint pipeline stage (normalize, l1, fuzzy, embed, search, prompt, rerank_request, parse, ...).",
+    ["stage", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+HINTS = Counter("rag_hints_total", "Hints generated.", ["route"])
+L3_FAILURES = Counter("rag_l3_failures_total", "L3 LLM rerank requests that failed or returned no usable ranking.")
+L3_DEADLINE_EXCEEDED = Counter(
+    "rag_l3_deadline_exceeded_total", "Hints degraded to the best L2 candidate because L3 missed the latency budget."
+)
+L3_HEDGED = Counter("rag_l3_hedged_requests_total", "Duplicate L3 requests fired after the hedge delay.")
+CIRCUIT_STATE = Gauge(
+    "rag_circuit_state",
+    "Scibox circuit breaker state per endpoint: 0 closed, 1 half-open, 2 open.",
+    ["endpoint"],
+    multiprocess_mode="livemax",
+)
+CIRCUIT_REJECTIONS = Counter("rag_circuit_rejections_total", "Scibox calls rejected by an open circuit.", ["endpoint"])
+RERANK_PARSE_ERRORS = Counter("rag_rerank_parse_errors_total", "L3 rerank answers that were not valid JSON.")
+
+
+def observe_hint(route: str, processing_time_ms: float, stage_timings_ms: Dict[str, float]):
+    """Record a finished hint and its per-stage timings."""
+    HINTS.labels(route=route).inc()
+    HINT_DURATION.labels(route=route).observe(processing_time_ms / 1000)
+    observe_stages(route, stage_timings_ms)
+
+
+def observe_stages(route: str, stage_timings_ms: Dict[str, float]):
+    """Record stage timings, also for stages run once for several hints (route "batch")."""
+    for stage, duration_ms in stage_timings_ms.items():
+        STAGE_DURATION.labels(stage=stage, route=route).observe(duration_ms / 1000)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Prometheus exposition of this process, or of all workers in multiprocess mode."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,231 @@
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from src.chat.bm25 import tokenize
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+OFFLINE_URL_SCHEME = "offline://"
+# base URL given to OpenAI clients; requests never leave the process
+OFFLINE_BASE_URL = "http://scibox.offline/v1"
+
+QUESTION_PATTERN = re.compile(r"Вопрос клиента:\n(.*?)\n\nКандидаты", re.S)
+CANDIDATE_PATTERN = re.compile(r"Кандидат (\d+):\nВопрос из базы: (.*)")
+
+
+def is_offline() -> bool:
+    """Whether Scibox requests are served by the local stand-in."""
+    return settings.SCIBOX_OFFLINE or settings.SCIBOX_BASE_URL.startswith(OFFLINE_URL_SCHEME)
+
+
+def hashing_embedding(text: str, dimension: int = 1024, ngram: int = 4) -> np.ndarray:
+    """Deterministic L2-normalized embedding from hashed word stems and character n-grams.
+
+    Texts sharing words or spellings get a high cosine similarity, so paraphrases and typos
+    behave roughly like they do with a real embedding model.
+    """
+    vector = np.zeros(dimension, dtype=np.float32)
+    normalized = " ".join((text or "").lower().replace("ё", "е").split())
+    padded = f" {normalized} "
+    features = [("w", token, 1.0) for token in tokenize(normalized)]
+    features += [("c", padded[i : i + ngram], 0.5) for i in range(max(1, len(padded) - ngram + 1))]
+    for kind, feature, weight in features:
+        digest = hashlib.blake2b(f"{kind}:{feature}".encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        vector[value % dimension] += weight if value >> 63 else -weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class OfflineScibox:
+    """OpenAI-compatible stand-in for the Scibox API served from an httpx transport.
+
+    Implements `/embeddings` (hashing embeddings) and `/chat/completions` (a deterministic
+    rerank responder scoring candidates by embedding similarity to the client question),
+    with configurable latency and a random failure rate. Build the index in offline mode
+    too: offline vectors are not comparable with real model embeddings.
+    """
+
+    def __init__(
+        self,
+        dimension: int = 1024,
+        embedding_latency_ms: float = 0.0,
+        chat_latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.dimension = dimension
+        self.latency_ms = {"embeddings": embedding_latency_ms, "chat": chat_latency_ms}
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests: Counter = Counter()
+        self.failures: Counter = Counter()
+
+    @classmethod
+    def from_settings(cls) -> "OfflineScibox":
+        return cls(
+            dimension=settings.SCIBOX_OFFLINE_DIMENSION,
+            embedding_latency_ms=settings.SCIBOX_OFFLINE_EMBEDDING_LATENCY_MS,
+            chat_latency_ms=settings.SCIBOX_OFFLINE_CHAT_LATENCY_MS,
+            jitter_ms=settings.SCIBOX_OFFLINE_JITTER_MS,
+            failure_rate=settings.SCIBOX_OFFLINE_FAILURE_RATE,
+            seed=settings.SCIBOX_OFFLINE_SEED,
+        )
+
+    @staticmethod
+    def endpoint(request: httpx.Request) -> str:
+        path = request.url.path
+        if path.endswith("/embeddings"):
+            return "embeddings"
+        if path.endswith("/chat/completions"):
+            return "chat"
+        return "unknown"
+
+    def delay_seconds(self, endpoint: str) -> float:
+        with self._lock:
+            jitter = self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+        return (self.latency_ms.get(endpoint, 0.0) + jitter) / 1000
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        endpoint = self.endpoint(request)
+        with self._lock:
+            self.requests[endpoint] += 1
+            failed = self.failure_rate > 0 and self._random.random() < self.failure_rate
+            if failed:
+                self.failures[endpoint] += 1
+        if failed:
+            return httpx.Response(503, json={"error": {"message": "Injected offline failure", "type": "server_error"}})
+        if endpoint == "unknown":
+            return httpx.Response(
+                404, json={"error": {"message": f"Unknown path {request.url.path}", "type": "invalid_request_error"}}
+            )
+
+        body = json.loads(request.content or b"{}")
+        if endpoint == "embeddings":
+            return httpx.Response(200, json=self._embeddings(body))
+        return httpx.Response(200, json=self._chat_completion(body))
+
+    def _embeddings(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        texts = body.get("input", [])
+        if isinstance(texts, str):
+            texts = [texts]
+        tokens = sum(len(text.split()) for text in texts)
+        return {
+            "object": "list",
+            "model": body.get("model", ""),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": hashing_embedding(text, self.dimension).tolist()}
+                for i, text in enumerate(texts)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    def rerank(self, prompt: str) -> Dict[str, Any]:
+        """Rank the candidates of a rerank prompt by similarity of their question to the client question."""
+        question = QUESTION_PATTERN.search(prompt)
+        candidates = CANDIDATE_PATTERN.findall(prompt)
+        if question is None or not candidates:
+            return {"rankings": []}
+
+        query_vector = hashing_embedding(question.group(1), self.dimension)
+        rankings = []
+        for number, candidate_question in candidates:
+            similarity = float(np.dot(query_vector, hashing_embedding(candidate_question, self.dimension)))
+            rankings.append(
+                {
+                    "candidate": int(number),
+                    "confidence": int(round(max(0.0, similarity) * 100)),
+                    "reasoning": "offline lexical similarity",
+                }
+            )
+        rankings.sort(key=lambda ranking: ranking["confidence"], reverse=True)
+        return {"rankings": rankings}
+
+    def _chat_completion(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        messages: List[Dict[str, Any]] = body.get("messages", [])
+        prompt = messages[-1].get("content", "") if messages else ""
+        content = json.dumps(self.rerank(prompt), ensure_ascii=False)
+        return {
+            "id": f"offline-{self.requests['chat']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", ""),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": len(prompt.split()),
+                "completion_tokens": len(content.split()),
+                "total_tokens": 0,
+            },
+        }
+
+    def transport(self) -> "OfflineTransport":
+        return OfflineTransport(self)
+
+    def async_transport(self) -> "AsyncOfflineTransport":
+        return AsyncOfflineTransport(self)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"requests": dict(self.requests), "failures": dict(self.failures)}
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests.clear()
+            self.failures.clear()
+
+
+def _read_timeout(request: httpx.Request) -> Optional[float]:
+    """Read timeout of the request, honoured like a network transport would."""
+    return (request.extensions.get("timeout") or {}).get("read")
+
+
+class OfflineTransport(httpx.BaseTransport):
+    def __init__(self, scibox: OfflineScibox):
+        self.scibox = scibox
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        delay = self.scibox.delay_seconds(self.scibox.endpoint(request))
+        timeout = _read_timeout(request)
+        if delay:
+            time.sleep(min(delay, timeout) if timeout is not None else delay)
+        if timeout is not None and delay > timeout:
+            raise httpx.ReadTimeout("Offline Scibox response exceeded the read timeout", request=request)
+        return self.scibox.handle(request)
+
+
+class AsyncOfflineTransport(httpx.AsyncBaseTransport):
+    def __init__(self, scibox: OfflineScibox):
+        self.scibox = scibox
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        delay = self.scibox.delay_seconds(self.scibox.endpoint(request))
+        timeout = _read_timeout(request)
+        if delay:
+            await asyncio.sleep(min(delay, timeout) if timeout is not None else delay)
+        if timeout is not None and delay > timeout:
+            raise httpx.ReadTimeout("Offline Scibox response exceeded the read timeout", request=request)
+        return self.scibox.handle(request)
+
+
+@lru_cache(maxsize=None)
+def get_offline_scibox() -> OfflineScibox:
+    """Process-wide stand-in shared by the sync and async clients."""
+    logger.info("Scibox API calls are served by the offline stand-in")
+    return OfflineScibox.from_settings()
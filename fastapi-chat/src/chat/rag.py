@@ -1,25 +1,86 @@
+import asyncio
 import faiss
+import gc
+import httpx
 import json
 import os
+import time
+from collections import Counter
+from dataclasses import dataclass, replace
 import numpy as np
-import pandas as pd
-from openai import OpenAI
+from openai import APIError, APITimeoutError, AsyncOpenAI, OpenAI
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional, Tuple
+from typing import AsyncIterator, Iterable, List, Dict, Any, Optional, Tuple
 import logging
 import hashlib
 import re
+import redis
+import shutil
+import redis.asyncio as aioredis
 
+from src.chat.ambiguity import AmbiguityMap, load_ambiguity_map
+from src.chat.answer_cache import RerankDecision, RerankDecisionCache
+from src.chat.batching import BatchingEmbedder
+from src.chat.bm25 import BM25Index, reciprocal_rank_fusion
+from src.chat.category_filter import CategoryPartitions, category_key
+from src.chat.circuit_breaker import CircuitBreaker, CircuitOpenError
+from src.chat.deadline import LatencyTracker, RerankDeadlineExceeded, hedged
+from src.chat.embedding_cache import QueryEmbeddingCache
+from src.chat.embedding_pipeline import embed_texts_concurrently
+from src.chat.embedding_store import EmbeddingStore, content_id
+from src.chat.fuzzy_match import FuzzyMatcher, load_fuzzy_matcher
+from src.chat.hint_cache import HintCache
+from src.chat.index_bundle import (
+    AMBIGUITY_MAP_FILE, FAISS_INDEX_FILE, INDEX_CONFIG_FILE, L1_INDEX_FILE, METADATA_FILE, METADATA_STORE_DIR,
+    BundleWatcher, IndexBundle, build_lock, create_staging_bundle, current_bundle, notify_published,
+    prune_bundles, publish_bundle
+)
+from src.chat.index_factory import IndexSpec, apply_search_params, build_index, save_index_spec, serving_index_spec
+from src.chat.ingestion import iter_knowledge_base
+from src.chat.l1_store import L1Store
+from src.chat.metadata_store import MetadataJsonWriter, MetadataStore, MetadataStoreWriter, write_metadata_store
+from src.chat.metrics import (
+    L3_DEADLINE_EXCEEDED, L3_FAILURES, L3_HEDGED, RERANK_PARSE_ERRORS, observe_hint, observe_stages
+)
+from src.chat.offline_scibox import OFFLINE_BASE_URL, OfflineScibox, get_offline_scibox, is_offline
+from src.chat.registry import ComponentRegistry, ComponentState
 from src.config import settings
+from src.database import redis_pool
 
 logger = logging.getLogger(__name__)
 
 # --- Configuration and Paths ---
 DATA_DIR = "data"
 DATASET_PATH = os.path.join(DATA_DIR, "smart_support.xlsx")
-FAISS_INDEX_PATH = os.path.join(DATA_DIR, "faiss_index_bge_m3.bin")
-METADATA_PATH = os.path.join(DATA_DIR, "metadata.json")
-L1_CACHE_PATH = os.path.join(DATA_DIR, "l1_cache.json")
+# Index builds are published as versioned bundles under data/bundles/ (see IndexBundle);
+# these paths are the flat layout used until the first bundle is published
+FAISS_INDEX_PATH = os.path.join(DATA_DIR, FAISS_INDEX_FILE)
+METADATA_PATH = os.path.join(DATA_DIR, METADATA_FILE)
+L1_INDEX_PATH = os.path.join(DATA_DIR, L1_INDEX_FILE)
+METADATA_STORE_PATH = os.path.join(DATA_DIR, METADATA_STORE_DIR)
+INDEX_CONFIG_PATH = os.path.join(DATA_DIR, INDEX_CONFIG_FILE)
+# question embeddings keyed by content hash, reused by incremental rebuilds
+EMBEDDING_STORE_PATH = os.path.join(DATA_DIR, "embedding_store.bin")
+# finished embedding batches of an index build in progress
+EMBEDDING_CHECKPOINT_DIR = os.path.join(DATA_DIR, "embedding_checkpoints")
+# nearest different-template neighbour of each KB entry (see AmbiguityMap)
+AMBIGUITY_MAP_PATH = os.path.join(DATA_DIR, AMBIGUITY_MAP_FILE)
+
+# Memory-map flat vector codes so all worker processes share the page cache
+FAISS_MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+# Scibox API requests issued by this process, by endpoint ("embeddings", "chat"); counted by
+# the HTTP clients, so calls rejected by an open circuit breaker are not included
+scibox_calls: Counter = Counter()
+
+
+def _count_scibox_request(request: httpx.Request):
+    scibox_calls[OfflineScibox.endpoint(request)] += 1
+
+
+async def _acount_scibox_request(request: httpx.Request):
+    _count_scibox_request(request)
+
 
 class Candidate(BaseModel):
     """Single candidate result."""
@@ -38,6 +99,25 @@ class Hint(BaseModel):
     processing_time_ms: int = 0
     candidates_found: int = 0
     alternatives: list[Candidate] = []  # Multiple candidates for similar confidence
+    stage_timings_ms: Optional[Dict[str, float]] = None  # normalize, l1, embed, search, rerank_request, ...
+    degraded: bool = False  # L3 missed the latency budget, best L2 candidate returned instead
+    cached: bool = False  # served from the shared hint cache
+
+# Fail fast while Scibox is failing; embeddings and chat completions trip independently
+embeddings_breaker = CircuitBreaker(
+    "embeddings",
+    failure_threshold=settings.RAG_CIRCUIT_FAILURE_THRESHOLD,
+    recovery_seconds=settings.RAG_CIRCUIT_RECOVERY_SECONDS
+)
+chat_breaker = CircuitBreaker(
+    "chat",
+    failure_threshold=settings.RAG_CIRCUIT_FAILURE_THRESHOLD,
+    recovery_seconds=settings.RAG_CIRCUIT_RECOVERY_SECONDS
+)
+
+# Routes of hints served while an upstream endpoint is unavailable
+LEXICAL_ROUTE = "L2 Лексический поиск (эмбеддинги недоступны)"
+LLM_UNAVAILABLE_ROUTE = "L2 Семантический поиск (LLM недоступен)"
 
 # --- Model and Data Loading ---
 
@@ -49,7 +129,8 @@ class SciboxEmbeddings:
     
     def embed_query(self, text: str) -> List[float]:
         """Embed a single query."""
-        response = self.client.embeddings.create(
+        response = embeddings_breaker.call(
+            self.client.embeddings.create,
             model=self.model,
             input=text
         )
@@ -57,163 +138,407 @@ class SciboxEmbeddings:
     
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         """Embed multiple documents."""
-        response = self.client.embeddings.create(
+        response = embeddings_breaker.call(
+            self.client.embeddings.create,
             model=self.model,
             input=texts
         )
         return [item.embedding for item in response.data]
 
 
-def load_rag_components():
-    """Loads all necessary components for the RAG pipeline."""
-    # Initialize OpenAI client for Scibox API
-    client = OpenAI(
+class AsyncSciboxEmbeddings:
+    """Async wrapper for Scibox embeddings API."""
+    def __init__(self, client: AsyncOpenAI, model: str):
+        self.client = client
+        self.model = model
+
+    async def embed_query(self, text: str) -> List[float]:
+        """Embed a single query."""
+        response = await embeddings_breaker.acall(
+            self.client.embeddings.create,
+            model=self.model,
+            input=text
+        )
+        return response.data[0].embedding
+
+    async def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed multiple documents."""
+        response = await embeddings_breaker.acall(
+            self.client.embeddings.create,
+            model=self.model,
+            input=texts
+        )
+        return [item.embedding for item in response.data]
+
+
+def create_client() -> OpenAI:
+    """Create sync Scibox client (served by the offline stand-in when enabled)."""
+    if is_offline():
+        return OpenAI(
+            api_key=settings.SCIBOX_API_KEY,
+            base_url=OFFLINE_BASE_URL,
+            http_client=httpx.Client(
+                transport=get_offline_scibox().transport(),
+                timeout=settings.SCIBOX_TIMEOUT_SECONDS,
+                event_hooks={"request": [_count_scibox_request]}
+            )
+        )
+    
+    http_client = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=settings.SCIBOX_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SCIBOX_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+        timeout=settings.SCIBOX_TIMEOUT_SECONDS,
+        event_hooks={"request": [_count_scibox_request]},
+    )
+    return OpenAI(
         api_key=settings.SCIBOX_API_KEY,
-        base_url=settings.SCIBOX_BASE_URL
+        base_url=settings.SCIBOX_BASE_URL,
+        http_client=http_client
+    )
+
+
+def create_async_client() -> AsyncOpenAI:
+    """Create async Scibox client backed by a shared keep-alive connection pool."""
+    if is_offline():
+        return AsyncOpenAI(
+            api_key=settings.SCIBOX_API_KEY,
+            base_url=OFFLINE_BASE_URL,
+            http_client=httpx.AsyncClient(
+                transport=get_offline_scibox().async_transport(),
+                timeout=settings.SCIBOX_TIMEOUT_SECONDS,
+                event_hooks={"request": [_acount_scibox_request]}
+            )
+        )
+    
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.SCIBOX_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SCIBOX_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+        timeout=settings.SCIBOX_TIMEOUT_SECONDS,
+        event_hooks={"request": [_acount_scibox_request]},
     )
+    return AsyncOpenAI(
+        api_key=settings.SCIBOX_API_KEY,
+        base_url=settings.SCIBOX_BASE_URL,
+        http_client=http_client
+    )
+
+
+def embedding_model_key() -> str:
+    """Model name used to key stored and cached embeddings; offline vectors never mix with real ones."""
+    if is_offline():
+        return f"{settings.SCIBOX_EMBEDDING_MODEL}@offline"
+    return settings.SCIBOX_EMBEDDING_MODEL
+
+
+def _create_redis_clients() -> Tuple[redis.Redis, aioredis.Redis]:
+    """Sync client with short timeouts (threadpool pipeline) and async client on the shared pool."""
+    redis_client = redis.Redis(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        password=settings.REDIS_PASSWORD,
+        db=settings.REDIS_DB,
+        socket_timeout=0.5,
+        socket_connect_timeout=0.5
+    )
+    return redis_client, aioredis.Redis(connection_pool=redis_pool)
+
+
+def create_embedding_cache() -> Optional[QueryEmbeddingCache]:
+    """Create the two-tier query embedding cache according to settings."""
+    if not settings.RAG_EMBEDDING_CACHE_ENABLED:
+        return None
+    
+    redis_client, async_redis_client = None, None
+    if settings.RAG_EMBEDDING_CACHE_REDIS_ENABLED and settings.REDIS_CACHE_ENABLED:
+        redis_client, async_redis_client = _create_redis_clients()
+    
+    return QueryEmbeddingCache(
+        model=embedding_model_key(),
+        max_entries=settings.RAG_EMBEDDING_CACHE_MAX_ENTRIES,
+        max_bytes=settings.RAG_EMBEDDING_CACHE_MAX_BYTES,
+        ttl_seconds=settings.RAG_EMBEDDING_CACHE_TTL_SECONDS,
+        redis_client=redis_client,
+        async_redis_client=async_redis_client
+    )
+
+
+def create_hint_cache() -> Optional[HintCache]:
+    """Create the Redis-backed cache of final hints shared by all workers."""
+    if not (settings.RAG_HINT_CACHE_ENABLED and settings.REDIS_CACHE_ENABLED):
+        return None
+    
+    redis_client, async_redis_client = _create_redis_clients()
+    return HintCache(
+        Hint,
+        ttl_seconds=settings.RAG_HINT_CACHE_TTL_SECONDS,
+        lock_timeout_seconds=settings.RAG_HINT_CACHE_LOCK_TIMEOUT_SECONDS,
+        wait_seconds=settings.RAG_HINT_CACHE_WAIT_MS / 1000,
+        redis_client=redis_client,
+        async_redis_client=async_redis_client
+    )
+
+
+def current_index_bundle() -> IndexBundle:
+    """Bundle of the published KB build (the flat DATA_DIR layout before the first publish)."""
+    return current_bundle(DATA_DIR)
+
+
+def compute_index_version(bundle: Optional[IndexBundle] = None) -> Optional[str]:
+    """Content hash of the FAISS index and metadata files identifying a KB build."""
+    bundle = bundle or current_index_bundle()
+    if bundle.version is not None:
+        return bundle.version
+    if not bundle.exists():
+        return None
+    
+    digest = hashlib.md5()
+    for path in (bundle.faiss_index_path, bundle.metadata_path):
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_faiss_index(bundle: Optional[IndexBundle] = None):
+    """Read FAISS index, memory-mapped when RAG_INDEX_MMAP is enabled and the index type supports it."""
+    bundle = bundle or current_index_bundle()
+    path = bundle.faiss_index_path
+    index = None
+    if settings.RAG_INDEX_MMAP:
+        try:
+            index = faiss.read_index(path, FAISS_MMAP_FLAGS)
+        except RuntimeError as e:
+            logger.warning(f"Memory-mapped FAISS read failed, loading index into memory: {e}")
+    if index is None:
+        index = faiss.read_index(path)
+    
+    spec = serving_index_spec(bundle.index_config_path)
+    apply_search_params(index, spec)
+    logger.info(f"Loaded {spec.label} FAISS index with {index.ntotal} vectors")
+    return index
+
+
+def load_metadata(bundle: Optional[IndexBundle] = None) -> MetadataStore:
+    """Open the columnar metadata store, (re)building it from metadata.json when missing or stale."""
+    bundle = bundle or current_index_bundle()
+    manifest_path = os.path.join(bundle.metadata_store_path, "manifest.json")
+    
+    def is_stale() -> bool:
+        if not os.path.exists(manifest_path):
+            return True
+        return os.path.getmtime(manifest_path) < os.path.getmtime(bundle.metadata_path)
+    
+    if is_stale():
+        with build_lock(DATA_DIR):
+            if is_stale():
+                logger.info("Metadata store is missing or outdated, converting metadata.json...")
+                with open(bundle.metadata_path, 'r', encoding='utf-8') as f:
+                    write_metadata_store(bundle.metadata_store_path, json.load(f))
+    return MetadataStore(bundle.metadata_store_path)
+
+
+def load_rag_components(client: Optional[OpenAI] = None, embedding_model: Optional[SciboxEmbeddings] = None):
+    """Loads all necessary components for the RAG pipeline (reusing the given clients on reload)."""
+    # Initialize OpenAI client for Scibox API
+    client = client or create_client()
     
     # Initialize embedding model
-    embedding_model = SciboxEmbeddings(
+    embedding_model = embedding_model or SciboxEmbeddings(
         client=client,
         model=settings.SCIBOX_EMBEDDING_MODEL
     )
     
     # Load or create FAISS index
-    if os.path.exists(FAISS_INDEX_PATH) and os.path.exists(METADATA_PATH):
-        logger.info("Loading existing FAISS index...")
-        index = faiss.read_index(FAISS_INDEX_PATH)
-        with open(METADATA_PATH, 'r', encoding='utf-8') as f:
-            metadata = json.load(f)
-    else:
-        logger.info("Creating new FAISS index...")
-        index, metadata = create_faiss_index(embedding_model)
+    bundle = ensure_index_bundle(embedding_model)
+    logger.info(f"Loading FAISS index from {bundle.root}...")
+    # Reopen from disk so vectors and metadata are memory-mapped rather than private copies
+    index = read_faiss_index(bundle)
+    metadata = load_metadata(bundle)
     
-    # Load or create L1 cache
-    l1_cache = load_l1_cache()
+    # Open (or build from the metadata) the L1 exact-match table
+    l1_cache = load_l1_cache(metadata, bundle)
     
-    return client, embedding_model, index, metadata, l1_cache
+    return client, embedding_model, index, metadata, l1_cache, bundle
 
 
-def create_faiss_index(embedding_model: SciboxEmbeddings):
-    """Creates a FAISS index from the dataset."""
-    if not os.path.exists(DATASET_PATH):
+def embed_texts(embedding_model: SciboxEmbeddings, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+    """Embed texts in concurrent batches, checkpointed so an interrupted build resumes."""
+    return embed_texts_concurrently(
+        embedding_model.embed_documents,
+        texts,
+        model=embedding_model.model,
+        batch_size=batch_size or settings.RAG_EMBED_BATCH_SIZE,
+        concurrency=settings.RAG_EMBED_CONCURRENCY,
+        max_retries=settings.RAG_EMBED_MAX_RETRIES,
+        backoff_seconds=settings.RAG_EMBED_RETRY_BACKOFF_SECONDS,
+        checkpoint_root=EMBEDDING_CHECKPOINT_DIR
+    )
+
+
+def ensure_index_bundle(
+    embedding_model: SciboxEmbeddings,
+    index_spec: Optional[IndexSpec] = None,
+    incremental: bool = True,
+    dataset_path: Optional[str] = None
+) -> IndexBundle:
+    """Current index bundle, built first when there is none.
+    
+    When several workers start on an empty data directory one of them builds the index
+    while the others wait on the build lock and then load its bundle.
+    """
+    bundle = current_index_bundle()
+    if bundle.exists():
+        return bundle
+    
+    with build_lock(DATA_DIR):
+        bundle = current_index_bundle()
+        if not bundle.exists():
+            logger.info("Creating new FAISS index...")
+            _build_faiss_index(embedding_model, index_spec, incremental, dataset_path)
+            bundle = current_index_bundle()
+    return bundle
+
+
+def create_faiss_index(
+    embedding_model: SciboxEmbeddings,
+    index_spec: Optional[IndexSpec] = None,
+    incremental: bool = True,
+    dataset_path: Optional[str] = None
+):
+    """Creates a FAISS index from the dataset (Excel, CSV or Parquet, default DATASET_PATH).
+    
+    The dataset is read in chunks of RAG_INGEST_CHUNK_ROWS rows (see `ingestion`) and its
+    records are streamed into the bundle's metadata files, so only the questions still to be
+    embedded and the vectors are held in memory.
+    With `incremental`, embeddings of questions whose text is unchanged are reused from the
+    embedding store; only new or edited questions are sent to the embedding API.
+    The build is written to a staging bundle and published atomically when complete, so
+    running workers never see a half-written index; they switch over on their own.
+    Builds of concurrent processes are serialized by the build lock.
+    """
+    with build_lock(DATA_DIR):
+        return _build_faiss_index(embedding_model, index_spec, incremental, dataset_path)
+
+
+def _build_faiss_index(
+    embedding_model: SciboxEmbeddings,
+    index_spec: Optional[IndexSpec] = None,
+    incremental: bool = True,
+    dataset_path: Optional[str] = None
+):
+    dataset_path = dataset_path or DATASET_PATH
+    if not os.path.exists(dataset_path):
         raise FileNotFoundError(
-            f"Dataset not found at '{DATASET_PATH}'. "
+            f"Dataset not found at '{dataset_path}'. "
             f"Please place smart_support.xlsx in the '{DATA_DIR}' directory."
         )
     
-    # Load dataset
-    df = pd.read_excel(DATASET_PATH)
-    logger.info(f"Loaded dataset with {len(df)} rows")
-    logger.info(f"Columns: {list(df.columns)}")
-    
-    # Drop unnecessary columns as preprocessing
-    columns_to_drop = ['Приоритет', 'Целевая аудитория']
-    for col in columns_to_drop:
-        if col in df.columns:
-            df = df.drop(columns=[col])
-            logger.info(f"Dropped column: {col}")
-    
-    # Prepare texts and metadata
-    texts = []
-    metadata = []
-    
-    for idx, row in df.iterrows():
-        # Get question - try different possible column names
-        question = ''
-        for col_name in ['Пример вопроса', 'Вопрос клиента', 'question', 'Вопрос']:
-            if col_name in df.columns:
-                question = str(row.get(col_name, '')).strip()
-                if question and question != 'nan':
-                    break
-        
-        # Get template - try different possible column names
-        template = ''
-        for col_name in ['Шаблонный ответ', 'Шаблон ответа', 'template', 'Ответ', 'ответ']:
-            if col_name in df.columns:
-                template = str(row.get(col_name, '')).strip()
-                if template and template != 'nan':
-                    break
-        
-        # Skip rows without question or template
-        if not question or not template or question == 'nan' or template == 'nan':
-            logger.warning(f"Skipping row {idx}: missing question or template")
-            continue
-        
-        # Get category
-        category = ''
-        for col_name in ['Основная категория', 'Категория', 'category']:
-            if col_name in df.columns:
-                category = str(row.get(col_name, '')).strip()
-                if category and category != 'nan':
-                    break
-        
-        # Get subcategory
-        subcategory = ''
-        for col_name in ['Подкатегория', 'subcategory']:
-            if col_name in df.columns:
-                subcategory = str(row.get(col_name, '')).strip()
-                if subcategory and subcategory != 'nan':
-                    break
-        
-        # Get keywords
-        keywords = ''
-        for col_name in ['Ключевые слова', 'keywords']:
-            if col_name in df.columns:
-                keywords = str(row.get(col_name, '')).strip()
-                if keywords and keywords != 'nan':
-                    break
-        
-        metadata.append({
-            'index': int(idx),
-            'question': question,
-            'category': category,
-            'subcategory': subcategory,
-            'template': template,
-            'keywords': keywords
-        })
-        texts.append(question)
-    
-    # Generate embeddings in batches
-    batch_size = 32
-    all_embeddings = []
-    
-    logger.info(f"Generating embeddings for {len(texts)} questions...")
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i+batch_size]
-        try:
-            embeddings = embedding_model.embed_documents(batch)
-            all_embeddings.extend(embeddings)
-            if (i // batch_size + 1) % 5 == 0 or i + batch_size >= len(texts):
-                logger.info(f"Processed {min(i+batch_size, len(texts))}/{len(texts)} texts")
-        except Exception as e:
-            logger.error(f"Error generating embeddings for batch {i//batch_size}: {e}")
-            raise
+    # Reuse stored embeddings of unchanged questions, embed only new or edited ones
+    if incremental:
+        store = EmbeddingStore.open(EMBEDDING_STORE_PATH, embedding_model_key())
+    else:
+        store = EmbeddingStore(EMBEDDING_STORE_PATH, embedding_model_key())
     
-    # Create FAISS index
-    embeddings_array = np.array(all_embeddings).astype('float32')
-    dimension = embeddings_array.shape[1]
+    # Stream the dataset in chunks straight into the staging bundle's metadata files
+    os.makedirs(DATA_DIR, exist_ok=True)
+    staging = create_staging_bundle(DATA_DIR)
+    try:
+        return _build_bundle(embedding_model, store, staging, index_spec, dataset_path)
+    except BaseException:
+        shutil.rmtree(staging.root, ignore_errors=True)
+        raise
+
+
+def _build_bundle(
+    embedding_model: SciboxEmbeddings,
+    store: EmbeddingStore,
+    staging: IndexBundle,
+    index_spec: Optional[IndexSpec],
+    dataset_path: str
+):
+    text_ids = []
+    missing = {}
+    with (
+        MetadataStoreWriter(staging.metadata_store_path) as metadata_writer,
+        MetadataJsonWriter(staging.metadata_path) as json_writer,
+    ):
+        for records in iter_knowledge_base(dataset_path, chunk_rows=settings.RAG_INGEST_CHUNK_ROWS):
+            questions = records['question'].tolist()
+            chunk_ids = [content_id(text) for text in questions]
+            for text_id, text in zip(chunk_ids, questions):
+                if text_id not in store:
+                    missing.setdefault(text_id, text)
+            text_ids.extend(chunk_ids)
+            for record in records.to_dict('records'):
+                record['index'] = int(record['index'])
+                json_writer.append(record)
+                metadata_writer.append(record)
+    if not text_ids:
+        raise ValueError(f"Dataset '{dataset_path}' has no rows with both a question and a template")
+    metadata = MetadataStore(staging.metadata_store_path)
     
-    logger.info(f"Creating FAISS index with dimension {dimension}...")
-    index = faiss.IndexFlatIP(dimension)  # Inner product for cosine similarity
-    faiss.normalize_L2(embeddings_array)  # Normalize for cosine similarity
-    index.add(embeddings_array)
+    removed = store.remove(set(store.ids) - set(text_ids))
+    reused = sum(1 for text_id in text_ids if text_id not in missing)
+    logger.info(f"Embeddings: {reused} reused, {len(missing)} new or changed, {removed} removed")
     
-    # Save index and metadata
-    os.makedirs(DATA_DIR, exist_ok=True)
-    faiss.write_index(index, FAISS_INDEX_PATH)
-    with open(METADATA_PATH, 'w', encoding='utf-8') as f:
-        json.dump(metadata, f, ensure_ascii=False, indent=2)
+    if missing:
+        store.add(list(missing), embed_texts(embedding_model, list(missing.values())))
     
-    logger.info(f"FAISS index created with {index.ntotal} vectors")
-    logger.info(f"Saved to: {FAISS_INDEX_PATH}")
-    logger.info(f"Metadata saved to: {METADATA_PATH}")
+    # Create FAISS index (stored vectors are L2-normalized for cosine similarity)
+    embeddings_array = store.get(text_ids)
+    dimension = embeddings_array.shape[1]
+    
+    index_spec = index_spec or IndexSpec.from_settings()
+    logger.info(f"Creating {index_spec.label} FAISS index with dimension {dimension}...")
+    index = build_index(embeddings_array, index_spec)
+    
+    # Save index next to the metadata in the staging bundle
+    store.save()
+    faiss.write_index(index, staging.faiss_index_path)
+    save_index_spec(staging.index_config_path, index_spec, index)
+    AmbiguityMap.build(
+        embeddings_array,
+        [metadata.get_value(row, 'template') for row in range(len(metadata))],
+        neighbors=settings.RAG_AMBIGUITY_NEIGHBORS,
+        index=index
+    ).save(staging.ambiguity_map_path)
     
     # Build L1 cache immediately after creating index
     logger.info("Building L1 cache...")
-    l1_cache = build_l1_cache_from_dataset(metadata)
+    l1_cache = build_l1_cache_from_dataset(metadata, staging)
+    FuzzyMatcher.build(
+        metadata,
+        l1_cache.rows(),
+        normalize_text,
+        num_perm=settings.RAG_FUZZY_NUM_PERM,
+        bands=settings.RAG_FUZZY_BANDS
+    ).save(staging.fuzzy_index_path)
     
-    return index, metadata
+    bundle = publish_bundle(DATA_DIR, staging, compute_index_version(staging))
+    prune_bundles(DATA_DIR, keep=settings.RAG_INDEX_BUNDLES_KEEP)
+    notify_index_published(bundle.version)
+    
+    logger.info(f"FAISS index created with {index.ntotal} vectors")
+    logger.info(f"Saved to: {bundle.faiss_index_path}")
+    logger.info(f"Metadata saved to: {bundle.metadata_path}")
+    
+    metadata.close()
+    return index, MetadataStore(bundle.metadata_store_path)
+
+
+def notify_index_published(version: str):
+    """Announce a new bundle to running workers over Redis (they also poll for it)."""
+    if not settings.REDIS_CACHE_ENABLED:
+        return
+    redis_client, _ = _create_redis_clients()
+    try:
+        notify_published(redis_client, settings.RAG_INDEX_RELOAD_CHANNEL, version)
+    finally:
+        redis_client.close()
 
 
 # --- L1 Cache Management ---
@@ -231,122 +556,479 @@ def normalize_text(text: str) -> str:
     text = text.strip()
     return text
 
-def get_text_hash(text: str) -> str:
-    """Generate hash for text."""
-    normalized = normalize_text(text)
-    return hashlib.md5(normalized.encode('utf-8')).hexdigest()
+def load_l1_cache(metadata: MetadataStore, bundle: Optional[IndexBundle] = None) -> L1Store:
+    """Open the L1 exact-match table, building it from the metadata when missing or stale."""
+    bundle = bundle or current_index_bundle()
+    manifest_path = os.path.join(bundle.metadata_store_path, "manifest.json")
+    
+    def is_stale() -> bool:
+        if not os.path.exists(bundle.l1_index_path):
+            return True
+        return os.path.getmtime(bundle.l1_index_path) < os.path.getmtime(manifest_path)
+    
+    if is_stale():
+        with build_lock(DATA_DIR):
+            if is_stale():
+                logger.info("L1 index is missing or outdated, building it from the metadata store...")
+                return build_l1_cache_from_dataset(metadata, bundle)
+    return L1Store.load(bundle.l1_index_path, metadata, normalize_text)
 
-def load_l1_cache() -> Dict[str, Dict[str, Any]]:
-    """Load L1 exact match cache."""
-    if os.path.exists(L1_CACHE_PATH):
-        with open(L1_CACHE_PATH, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+def build_l1_cache_from_dataset(metadata: MetadataStore, bundle: Optional[IndexBundle] = None) -> L1Store:
+    """Build the L1 exact-match table over the dataset questions and save it to the bundle."""
+    bundle = bundle or current_index_bundle()
+    l1_cache = L1Store.build(metadata, normalize_text)
+    l1_cache.save(bundle.l1_index_path)
+    logger.info(
+        f"Built L1 cache with {len(l1_cache)} entries ({len(metadata) - len(l1_cache)} rows skipped or repeated), "
+        f"{l1_cache.nbytes / 1024:.0f}KB"
+    )
+    return l1_cache
+
+# --- Component Registry ---
+
+@dataclass
+class RAGComponents:
+    """Everything the hint pipeline needs, loaded together by `rag_registry`."""
+    client: OpenAI
+    embedding_model: SciboxEmbeddings
+    async_client: AsyncOpenAI
+    async_embedding_model: Any
+    faiss_index: Any
+    dataset_metadata: MetadataStore
+    l1_cache: L1Store
+    index_version: Optional[str]
+    bm25_index: Optional[BM25Index] = None
+    fuzzy_matcher: Optional[FuzzyMatcher] = None
+    category_partitions: Optional[CategoryPartitions] = None
+    ambiguity_map: Optional[AmbiguityMap] = None
+
+
+def _create_async_embedding_model(async_client: AsyncOpenAI):
+    async_embedding_model = AsyncSciboxEmbeddings(client=async_client, model=settings.SCIBOX_EMBEDDING_MODEL)
+    if settings.RAG_EMBEDDING_BATCH_ENABLED:
+        async_embedding_model = BatchingEmbedder(
+            async_embedding_model,
+            max_batch_size=settings.RAG_EMBEDDING_BATCH_MAX_SIZE,
+            max_wait_ms=settings.RAG_EMBEDDING_BATCH_MAX_WAIT_MS
+        )
+    return async_embedding_model
+
+
+def _load_components(previous: Optional[RAGComponents] = None) -> RAGComponents:
+    """Load the current KB bundle; on reload the Scibox clients of `previous` are reused."""
+    client, embedding_model, faiss_index, dataset_metadata, l1_cache, bundle = load_rag_components(
+        previous.client if previous else None,
+        previous.embedding_model if previous else None
+    )
+    if previous is not None:
+        async_client = previous.async_client
+        async_embedding_model = previous.async_embedding_model
+    else:
+        async_client = create_async_client()
+        async_embedding_model = _create_async_embedding_model(async_client)
+    
+    bm25_index = None
+    if settings.RAG_HYBRID_ENABLED:
+        bm25_index = BM25Index.from_metadata(dataset_metadata, k1=settings.RAG_BM25_K1, b=settings.RAG_BM25_B)
+    
+    fuzzy_matcher = None
+    if settings.RAG_FUZZY_ENABLED:
+        fuzzy_matcher = load_fuzzy_matcher(
+            bundle.fuzzy_index_path,
+            dataset_metadata,
+            l1_cache.rows(),
+            normalize_text,
+            threshold=settings.RAG_FUZZY_THRESHOLD,
+            num_perm=settings.RAG_FUZZY_NUM_PERM,
+            bands=settings.RAG_FUZZY_BANDS
+        )
+    
+    category_partitions = None
+    if settings.RAG_CATEGORY_FILTER_ENABLED:
+        category_partitions = CategoryPartitions.from_metadata(dataset_metadata)
+    
+    ambiguity_map = None
+    if settings.RAG_AMBIGUITY_ENABLED:
+        ambiguity_map = load_ambiguity_map(
+            bundle.ambiguity_map_path,
+            faiss_index,
+            [dataset_metadata.get_value(row, 'template') for row in range(len(dataset_metadata))],
+            neighbors=settings.RAG_AMBIGUITY_NEIGHBORS
+        )
+    
+    index_version = compute_index_version(bundle)
+    logger.info(
+        f"RAG components loaded successfully. L1 cache: {len(l1_cache)} entries, index version: {index_version}"
+    )
+    return RAGComponents(
+        client=client,
+        embedding_model=embedding_model,
+        async_client=async_client,
+        async_embedding_model=async_embedding_model,
+        faiss_index=faiss_index,
+        dataset_metadata=dataset_metadata,
+        l1_cache=l1_cache,
+        index_version=index_version,
+        bm25_index=bm25_index,
+        fuzzy_matcher=fuzzy_matcher,
+        category_partitions=category_partitions,
+        ambiguity_map=ambiguity_map
+    )
+
+
+def _describe_components(components: RAGComponents) -> Dict[str, Any]:
+    return {
+        "index_size": int(components.faiss_index.ntotal),
+        "dimension": int(components.faiss_index.d),
+        "metadata_entries": len(components.dataset_metadata),
+        "l1_entries": len(components.l1_cache),
+        "index_version": components.index_version,
+        "bm25_terms": len(components.bm25_index.postings) if components.bm25_index is not None else None,
+        "fuzzy_match": components.fuzzy_matcher.stats() if components.fuzzy_matcher is not None else None,
+        "categories": components.category_partitions.stats() if components.category_partitions is not None else None,
+        "ambiguity": components.ambiguity_map.stats() if components.ambiguity_map is not None else None,
+        "circuits": {"embeddings": embeddings_breaker.stats(), "chat": chat_breaker.stats()},
+        "hint_cache": hint_cache.stats() if hint_cache is not None else None,
+    }
+
+
+# Components are loaded lazily (on first use) or by a background task started on app startup;
+# a newly published index bundle is loaded next to the served components and swapped in
+rag_registry: ComponentRegistry[RAGComponents] = ComponentRegistry(
+    "RAG", _load_components, describe=_describe_components, reloader=_load_components
+)
+
+_LEGACY_COMPONENT_NAMES = {
+    "client", "embedding_model", "async_client", "async_embedding_model",
+    "faiss_index", "dataset_metadata", "l1_cache", "index_version",
+}
+
+
+def __getattr__(name: str):
+    # Backwards compatible module attributes (e.g. `from src.chat.rag import l1_cache`), loaded on access
+    if name in _LEGACY_COMPONENT_NAMES:
+        components = rag_registry.load()
+        if components is None:
+            return {} if name == "l1_cache" else None
+        return getattr(components, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _get_components(components: Optional[RAGComponents] = None) -> RAGComponents:
+    components = components or rag_registry.get()
+    if components is None:
+        raise RuntimeError("RAG components not initialized")
+    return components
+
+
+embedding_cache = create_embedding_cache()
+hint_cache = create_hint_cache()
+rerank_cache = RerankDecisionCache(
+    threshold=settings.RAG_RERANK_CACHE_SIMILARITY_THRESHOLD,
+    max_entries=settings.RAG_RERANK_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.RAG_RERANK_CACHE_TTL_SECONDS
+) if settings.RAG_RERANK_CACHE_ENABLED else None
+
+# Bounds the number of hints computed concurrently by the async pipeline
+hint_semaphore = asyncio.Semaphore(settings.RAG_MAX_CONCURRENT_HINTS)
+
+# Recent L3 request latencies; the hedge delay is a percentile of them
+rerank_latency = LatencyTracker(window=settings.RAG_HEDGE_WINDOW)
+
+
+def prepare_for_fork() -> Optional[RAGComponents]:
+    """Load the RAG components in a pre-fork server master (gunicorn `preload_app`).
+    
+    Forked workers inherit them copy-on-write instead of each loading its own copy. FAISS
+    vectors and metadata are memory-mapped anyway; the remaining structures are moved to the
+    permanent GC generation so collections in the workers do not touch (and copy) their pages.
+    """
+    components = rag_registry.load()
+    gc.collect()
+    gc.freeze()
+    return components
+
+
+def reinit_after_fork():
+    """Give a forked worker its own Scibox clients: HTTP connections must not be shared across processes."""
+    components = rag_registry.get()
+    if components is None:
+        return
+    
+    client = create_client()
+    async_client = create_async_client()
+    rag_registry.components = replace(
+        components,
+        client=client,
+        embedding_model=SciboxEmbeddings(client=client, model=settings.SCIBOX_EMBEDDING_MODEL),
+        async_client=async_client,
+        async_embedding_model=_create_async_embedding_model(async_client)
+    )
 
-def save_l1_cache(cache: Dict[str, Dict[str, Any]]):
-    """Save L1 cache to disk."""
-    os.makedirs(DATA_DIR, exist_ok=True)
-    with open(L1_CACHE_PATH, 'w', encoding='utf-8') as f:
-        json.dump(cache, f, ensure_ascii=False, indent=2)
-
-def build_l1_cache_from_dataset(metadata: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
-    """Build L1 cache from dataset metadata."""
-    cache = {}
-    skipped = 0
-    for item in metadata:
-        question = item.get('question', '')
-        template = item.get('template', '')
-        
-        if question and template:
-            text_hash = get_text_hash(question)
-            normalized = normalize_text(question)
-            cache[text_hash] = {
-                'question': question,
-                'normalized_question': normalized,
-                'template': template,
-                'category': item.get('category', ''),
-                'subcategory': item.get('subcategory', ''),
-                'keywords': item.get('keywords', '')
-            }
-        else:
-            skipped += 1
-    
-    save_l1_cache(cache)
-    logger.info(f"Built L1 cache with {len(cache)} entries (skipped {skipped} invalid entries)")
-    if len(cache) > 0:
-        # Log first few entries for debugging
-        sample_keys = list(cache.keys())[:3]
-        for key in sample_keys:
-            logger.debug(f"L1 cache sample - Hash: {key[:8]}... Question: {cache[key]['normalized_question'][:50]}...")
-    return cache
-
-# Initialize components
-try:
-    client, embedding_model, faiss_index, dataset_metadata, l1_cache = load_rag_components()
-    # Build L1 cache if empty
-    if not l1_cache and dataset_metadata:
-        l1_cache = build_l1_cache_from_dataset(dataset_metadata)
-    logger.info(f"RAG components loaded successfully. L1 cache: {len(l1_cache)} entries")
-except Exception as e:
-    logger.error(f"Failed to load RAG components: {e}")
-    client, embedding_model, faiss_index, dataset_metadata, l1_cache = None, None, None, None, {}
+
+_index_watcher_task: Optional[asyncio.Task] = None
+
+
+def _served_index_version() -> Optional[str]:
+    components = rag_registry.get()
+    return components.index_version if components is not None else None
+
+
+async def _reload_components() -> bool:
+    return await rag_registry.start_background_reload()
+
+
+def start_index_watcher() -> asyncio.Task:
+    """Watch for newly published index bundles and hot-swap the RAG components."""
+    global _index_watcher_task
+    if _index_watcher_task is None or _index_watcher_task.done():
+        redis_client = aioredis.Redis(connection_pool=redis_pool) if settings.REDIS_CACHE_ENABLED else None
+        watcher = BundleWatcher(
+            DATA_DIR,
+            _served_index_version,
+            _reload_components,
+            poll_seconds=settings.RAG_INDEX_RELOAD_POLL_SECONDS,
+            redis_client=redis_client,
+            channel=settings.RAG_INDEX_RELOAD_CHANNEL
+        )
+        _index_watcher_task = asyncio.get_running_loop().create_task(watcher.run())
+    return _index_watcher_task
+
+
+async def close_rag_clients():
+    """Stop the index watcher, close the async Scibox client and its connection pool."""
+    if _index_watcher_task is not None:
+        _index_watcher_task.cancel()
+    components = rag_registry.get()
+    if components is not None:
+        await components.async_client.close()
 
 # --- Hint Generation ---
 
-def l1_exact_match(question: str) -> Optional[Dict[str, Any]]:
-    """L1: Exact match lookup in cache."""
+def _resolve_category(components: RAGComponents, category: Optional[str]) -> Optional[str]:
+    """Category filter to apply, or None when no filter was given or the category is unknown."""
+    if not category or not category.strip():
+        return None
+    if components.category_partitions is None:
+        logger.warning(f"Category filter '{category}' ignored: category partitions are disabled")
+        return None
+    if category not in components.category_partitions:
+        logger.warning(f"Unknown category '{category}', searching all categories")
+        return None
+    return category
+
+
+def _in_category(entry: Dict[str, Any], category: Optional[str]) -> bool:
+    return category is None or category_key(entry.get('category')) == category_key(category)
+
+
+def l1_exact_match(
+    question: str,
+    components: Optional[RAGComponents] = None,
+    normalized: Optional[str] = None,
+    category: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """L1: Exact match lookup in cache (restricted to `category` when given)."""
+    l1_cache = _get_components(components).l1_cache
     if not l1_cache:
         logger.debug("L1 cache is empty")
         return None
     
-    text_hash = get_text_hash(question)
-    normalized = normalize_text(question)
-    result = l1_cache.get(text_hash)
+    normalized = normalized if normalized is not None else normalize_text(question)
+    result = l1_cache.get(normalized)
+    if result and not _in_category(result, category):
+        logger.info(f"L1 HIT outside category '{category}' ignored")
+        return None
     
     if result:
         logger.info(f"L1 HIT - Normalized query: '{normalized[:50]}...'")
     else:
-        logger.debug(f"L1 MISS - Hash: {text_hash[:8]}... Normalized: '{normalized[:50]}...'")
+        logger.debug(f"L1 MISS - Normalized: '{normalized[:50]}...'")
     
     return result
 
-def l2_semantic_search(question: str, top_k: int = 5) -> List[Dict[str, Any]]:
-    """L2: Semantic search using FAISS index."""
-    if faiss_index is None or embedding_model is None or dataset_metadata is None:
-        raise RuntimeError("RAG components not initialized")
+
+def l15_fuzzy_match(
+    question: str,
+    components: Optional[RAGComponents] = None,
+    normalized: Optional[str] = None,
+    category: Optional[str] = None
+) -> Optional[Tuple[Dict[str, Any], float]]:
+    """L1.5: Near-duplicate lookup (typos, an extra word) over L1 cache questions."""
+    fuzzy_matcher = _get_components(components).fuzzy_matcher
+    if fuzzy_matcher is None:
+        return None
     
-    # Generate query embedding
-    query_embedding = np.array([embedding_model.embed_query(question)]).astype('float32')
-    faiss.normalize_L2(query_embedding)
+    result = fuzzy_matcher.match(normalized if normalized is not None else normalize_text(question))
+    if result and not _in_category(result[0], category):
+        return None
+    if result:
+        logger.info(f"L1.5 HIT - similarity {result[1]:.3f} with '{result[0]['normalized_question'][:50]}...'")
+    return result
+
+
+def embed_question(question: str, components: Optional[RAGComponents] = None) -> np.ndarray:
+    """Embed a query, reusing a cached embedding of the same normalized text."""
+    components = _get_components(components)
+    normalized = normalize_text(question)
+    if embedding_cache is not None:
+        cached = embedding_cache.get(normalized)
+        if cached is not None:
+            return cached
+    
+    query_vector = np.asarray(components.embedding_model.embed_query(question), dtype='float32')
+    if embedding_cache is not None:
+        embedding_cache.set(normalized, query_vector)
+    return query_vector
+
+
+async def embed_question_async(question: str, components: Optional[RAGComponents] = None) -> np.ndarray:
+    """Async variant of `embed_question`."""
+    components = _get_components(components)
+    normalized = normalize_text(question)
+    if embedding_cache is not None:
+        cached = await embedding_cache.aget(normalized)
+        if cached is not None:
+            return cached
+    
+    query_vector = np.asarray(await components.async_embedding_model.embed_query(question), dtype='float32')
+    if embedding_cache is not None:
+        await embedding_cache.aset(normalized, query_vector)
+    return query_vector
+
+
+def _search_index(
+    components: RAGComponents,
+    query_vector: np.ndarray,
+    top_k: int,
+    question: Optional[str] = None,
+    category: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Search FAISS index with a query embedding and attach metadata.
+    
+    When the BM25 index is loaded and the question text is given, dense and keyword
+    results are fused by reciprocal rank fusion (hybrid L2). With `category`, only rows
+    of that category are searched (see `CategoryPartitions`).
+    """
+    return _search_index_batch(components, np.array([query_vector]), top_k, [question], category)[0]
+
+
+def _search_index_batch(
+    components: RAGComponents,
+    query_vectors: np.ndarray,
+    top_k: int,
+    questions: Optional[List[Optional[str]]] = None,
+    category: Optional[str] = None,
+) -> List[List[Dict[str, Any]]]:
+    """Search FAISS index with several query embeddings in one call; one result list per query."""
+    query_embeddings = np.array(query_vectors).astype('float32')
+    faiss.normalize_L2(query_embeddings)
+    questions = questions or [None] * len(query_embeddings)
+    
+    hybrid = components.bm25_index is not None and any(question is not None for question in questions)
+    depth = max(top_k, settings.RAG_HYBRID_CANDIDATES) if hybrid else top_k
     
     # Search in FAISS index
-    distances, indices = faiss_index.search(query_embedding, top_k)
+    if category is not None:
+        distances, indices = components.category_partitions.search(
+            components.faiss_index, query_embeddings, depth, category
+        )
+    else:
+        distances, indices = components.faiss_index.search(query_embeddings, depth)
+    dataset_metadata = components.dataset_metadata
     
-    # Retrieve metadata for top results
-    results = []
-    for idx, distance in zip(indices[0], distances[0]):
-        if idx < len(dataset_metadata):
+    all_results = []
+    for row, question in enumerate(questions):
+        dense_results = [
+            (int(idx), float(distance))
+            for idx, distance in zip(indices[row], distances[row])
+            if 0 <= idx < len(dataset_metadata)
+        ]
+        if hybrid and question is not None:
+            all_results.append(
+                _hybrid_results(components, query_embeddings[row], question, dense_results, depth, top_k, category)
+            )
+            continue
+        
+        # Retrieve metadata for top results
+        results = []
+        for idx, distance in dense_results[:top_k]:
             result = dataset_metadata[idx].copy()
-            result['similarity'] = float(distance)
+            result['row'] = idx
+            result['similarity'] = distance
             results.append(result)
+        all_results.append(results)
     
-    return results
+    return all_results
 
 
-def l3_llm_rerank(question: str, candidates: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], float, List[Tuple[Dict[str, Any], float]]]:
-    """L3: LLM-based reranking to rank all candidates with confidence scores.
+def _hybrid_results(
+    components: RAGComponents,
+    query_embedding: np.ndarray,
+    question: str,
+    dense_results: List[Tuple[int, float]],
+    depth: int,
+    top_k: int,
+    category: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Fuse dense and BM25 rankings; candidates carry `similarity`, `bm25_score`, `rrf_score` and both ranks."""
+    allowed = components.category_partitions.allowed(category) if category is not None else None
+    keyword_results = components.bm25_index.search(question, depth, allowed=allowed)
+    similarities = dict(dense_results)
+    bm25_scores = dict(keyword_results)
+    dense_ranks = {idx: rank for rank, (idx, _) in enumerate(dense_results, 1)}
+    bm25_ranks = {idx: rank for rank, (idx, _) in enumerate(keyword_results, 1)}
     
-    Returns:
-        Tuple of (best_candidate, best_confidence, ranked_alternatives)
-        where ranked_alternatives is a list of (candidate, confidence) tuples
-    """
-    if not candidates:
-        raise ValueError("No candidates provided for reranking")
+    fused = reciprocal_rank_fusion(
+        [[idx for idx, _ in dense_results], [idx for idx, _ in keyword_results]],
+        k=settings.RAG_RRF_K
+    )
     
-    if client is None:
-        raise RuntimeError("LLM client not initialized")
+    results = []
+    for idx, rrf_score in fused[:top_k]:
+        result = components.dataset_metadata[idx].copy()
+        result['row'] = idx
+        if idx in similarities:
+            result['similarity'] = similarities[idx]
+        else:
+            result['similarity'] = _exact_similarity(components, query_embedding, idx)
+        result['bm25_score'] = round(bm25_scores.get(idx, 0.0), 4)
+        result['rrf_score'] = round(rrf_score, 6)
+        result['dense_rank'] = dense_ranks.get(idx)
+        result['bm25_rank'] = bm25_ranks.get(idx)
+        results.append(result)
     
-    # Build prompt for reranking
+    return results
+
+
+def _exact_similarity(components: RAGComponents, query_embedding: np.ndarray, idx: int) -> float:
+    """Cosine similarity to a stored vector found only by BM25 (0 if the index cannot reconstruct)."""
+    try:
+        return float(np.dot(components.faiss_index.reconstruct(idx), query_embedding))
+    except RuntimeError:
+        return 0.0
+
+
+def l2_semantic_search(
+    question: str, top_k: int = 5, components: Optional[RAGComponents] = None, category: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """L2: Semantic (or hybrid semantic + BM25) search."""
+    components = _get_components(components)
+    query_vector = embed_question(question, components)
+    return _search_index(components, query_vector, top_k, question, _resolve_category(components, category))
+
+
+async def l2_semantic_search_async(
+    question: str, top_k: int = 5, components: Optional[RAGComponents] = None, category: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """L2: Semantic (or hybrid semantic + BM25) search (async embedding)."""
+    components = _get_components(components)
+    query_vector = await embed_question_async(question, components)
+    return _search_index(components, query_vector, top_k, question, _resolve_category(components, category))
+
+
+def _build_rerank_messages(question: str, candidates: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Build chat messages for the L3 rerank request."""
     candidates_text = ""
     for i, candidate in enumerate(candidates):
         candidates_text += f"\n\nКандидат {i+1}:\n"
@@ -384,204 +1066,986 @@ def l3_llm_rerank(question: str, candidates: List[Dict[str, Any]]) -> Tuple[Dict
 
 Верни ТОЛЬКО JSON, без дополнительного текста. Отсортируй rankings по убыванию confidence."""
     
+    return [
+        {"role": "system", "content": "Ты — эксперт по анализу релевантности. Отвечай только в формате JSON."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _parse_rerank_response(
+    response_text: str, candidates: List[Dict[str, Any]]
+) -> Tuple[Dict[str, Any], float, List[Tuple[Dict[str, Any], float]]]:
+    """Parse the L3 rerank JSON answer into (best_candidate, best_confidence, alternatives)."""
+    response_text = response_text.strip()
+    
+    # Parse JSON response
+    if '```json' in response_text:
+        response_text = response_text.split('```json')[1].split('```')[0].strip()
+    elif '```' in response_text:
+        response_text = response_text.split('```')[1].split('```')[0].strip()
+    
+    try:
+        result = json.loads(response_text)
+    except json.JSONDecodeError:
+        RERANK_PARSE_ERRORS.inc()
+        raise
+    rankings = result.get('rankings', [])
+    
+    if not rankings:
+        logger.warning("No rankings returned from LLM, returning None")
+        return None, 0.0, []
+    
+    # Extract ranked candidates with confidence
+    ranked_results = []
+    for rank in rankings:
+        idx = rank['candidate'] - 1  # Convert to 0-based
+        conf = rank['confidence'] / 100.0  # Convert to 0-1 range
+        if 0 <= idx < len(candidates):
+            ranked_results.append((candidates[idx], conf))
+    
+    if not ranked_results:
+        logger.warning("No valid rankings extracted, returning None")
+        return None, 0.0, []
+    
+    # Check if best candidate has extremely low confidence (< 30%)
+    best_confidence = ranked_results[0][1]
+    if best_confidence < 0.30:
+        logger.warning(f"Best candidate has very low confidence ({best_confidence:.2f}), returning None")
+        return None, 0.0, []
+    
+    # Best candidate is first in ranked results
+    best_candidate, best_confidence = ranked_results[0]
+    alternatives = ranked_results[1:]  # Rest are alternatives
+    
+    logger.info(f"LLM rerank: best candidate with confidence {best_confidence:.2f}, {len(alternatives)} alternatives")
+    return best_candidate, best_confidence, alternatives
+
+
+def l3_llm_rerank(
+    question: str,
+    candidates: List[Dict[str, Any]],
+    components: Optional[RAGComponents] = None,
+    timings: Optional[Dict[str, float]] = None,
+    timeout: Optional[float] = None,
+) -> Tuple[Dict[str, Any], float, List[Tuple[Dict[str, Any], float]]]:
+    """L3: LLM-based reranking to rank all candidates with confidence scores.
+    
+    Returns:
+        Tuple of (best_candidate, best_confidence, ranked_alternatives)
+        where ranked_alternatives is a list of (candidate, confidence) tuples
+    
+    Durations of the prompt, rerank_request and parse stages are recorded into `timings`.
+    With `timeout` (seconds), raises RerankDeadlineExceeded when the request takes longer.
+    Raises CircuitOpenError while the chat completions circuit is open.
+    """
+    if not candidates:
+        raise ValueError("No candidates provided for reranking")
+    
+    client = _get_components(components).client
+    if timeout is not None:
+        # a retry after a timeout cannot fit into the same budget
+        client = client.with_options(timeout=timeout, max_retries=0)
+    timings = timings if timings is not None else {}
+    
+    stage_start = time.perf_counter()
+    messages = _build_rerank_messages(question, candidates)
+    timings["prompt"] = _stage_ms(stage_start)
+    
+    def create(**kwargs):
+        try:
+            return client.chat.completions.create(**kwargs)
+        except APITimeoutError as e:
+            if timeout is None:
+                raise
+            # raised inside the breaker call: our own budget is not an upstream failure
+            raise RerankDeadlineExceeded(f"L3 rerank exceeded {timeout:.2f}s") from e
+    
     try:
-        response = client.chat.completions.create(
+        stage_start = time.perf_counter()
+        response = chat_breaker.call(
+            create,
             model=settings.SCIBOX_LLM_MODEL,
-            messages=[
-                {"role": "system", "content": "Ты — эксперт по анализу релевантности. Отвечай только в формате JSON."},
-                {"role": "user", "content": prompt}
-            ],
+            messages=messages,
             temperature=0.1,
             max_tokens=500
         )
+        timings["rerank_request"] = _stage_ms(stage_start)
+        rerank_latency.observe(timings["rerank_request"])
         
-        response_text = response.choices[0].message.content.strip()
-        
-        # Parse JSON response
-        if '```json' in response_text:
-            response_text = response_text.split('```json')[1].split('```')[0].strip()
-        elif '```' in response_text:
-            response_text = response_text.split('```')[1].split('```')[0].strip()
-        
-        result = json.loads(response_text)
-        rankings = result.get('rankings', [])
-        
-        if not rankings:
-            logger.warning("No rankings returned from LLM, returning None")
-            return None, 0.0, []
-        
-        # Extract ranked candidates with confidence
-        ranked_results = []
-        for rank in rankings:
-            idx = rank['candidate'] - 1  # Convert to 0-based
-            conf = rank['confidence'] / 100.0  # Convert to 0-1 range
-            if 0 <= idx < len(candidates):
-                ranked_results.append((candidates[idx], conf))
-        
-        if not ranked_results:
-            logger.warning("No valid rankings extracted, returning None")
-            return None, 0.0, []
-        
-        # Check if best candidate has extremely low confidence (< 30%)
-        best_confidence = ranked_results[0][1]
-        if best_confidence < 0.30:
-            logger.warning(f"Best candidate has very low confidence ({best_confidence:.2f}), returning None")
-            return None, 0.0, []
-        
-        # Best candidate is first in ranked results
-        best_candidate, best_confidence = ranked_results[0]
-        alternatives = ranked_results[1:]  # Rest are alternatives
+        stage_start = time.perf_counter()
+        result = _parse_rerank_response(response.choices[0].message.content, candidates)
+        timings["parse"] = _stage_ms(stage_start)
+        return result
+    
+    except (CircuitOpenError, RerankDeadlineExceeded):
+        raise
+    except Exception as e:
+        logger.error(f"Error in LLM reranking: {e}", exc_info=True)
+        # Return None to indicate failure
+        return None, 0.0, []
+
+
+async def l3_llm_rerank_async(
+    question: str,
+    candidates: List[Dict[str, Any]],
+    components: Optional[RAGComponents] = None,
+    timings: Optional[Dict[str, float]] = None,
+) -> Tuple[Dict[str, Any], float, List[Tuple[Dict[str, Any], float]]]:
+    """L3: LLM-based reranking (async client). Same contract as `l3_llm_rerank`."""
+    if not candidates:
+        raise ValueError("No candidates provided for reranking")
+    
+    async_client = _get_components(components).async_client
+    timings = timings if timings is not None else {}
+    
+    stage_start = time.perf_counter()
+    messages = _build_rerank_messages(question, candidates)
+    timings["prompt"] = _stage_ms(stage_start)
+    
+    try:
+        stage_start = time.perf_counter()
+        response = await chat_breaker.acall(
+            async_client.chat.completions.create,
+            model=settings.SCIBOX_LLM_MODEL,
+            messages=messages,
+            temperature=0.1,
+            max_tokens=500
+        )
+        timings["rerank_request"] = _stage_ms(stage_start)
+        rerank_latency.observe(timings["rerank_request"])
         
-        logger.info(f"LLM rerank: best candidate with confidence {best_confidence:.2f}, {len(alternatives)} alternatives")
-        return best_candidate, best_confidence, alternatives
+        stage_start = time.perf_counter()
+        result = _parse_rerank_response(response.choices[0].message.content, candidates)
+        timings["parse"] = _stage_ms(stage_start)
+        return result
     
+    except CircuitOpenError:
+        raise
     except Exception as e:
         logger.error(f"Error in LLM reranking: {e}", exc_info=True)
         # Return None to indicate failure
         return None, 0.0, []
 
 
-def generate_hint(question: str) -> Hint:
-    """Generates a hint based on the user's question using multi-level RAG pipeline."""
-    import time
+def _hedge_delay() -> Optional[float]:
+    """Seconds to wait before a duplicate L3 request, None while hedging is off or not calibrated."""
+    if not settings.RAG_HEDGE_ENABLED or len(rerank_latency) < settings.RAG_HEDGE_MIN_SAMPLES:
+        return None
+    delay_ms = max(rerank_latency.percentile(settings.RAG_HEDGE_PERCENTILE), settings.RAG_HEDGE_MIN_DELAY_MS)
+    return delay_ms / 1000
+
+
+async def _l3_rerank_within(
+    question: str,
+    candidates: List[Dict[str, Any]],
+    components: RAGComponents,
+    timings: Dict[str, float],
+    deadline: Optional[float],
+) -> Tuple[Dict[str, Any], float, List[Tuple[Dict[str, Any], float]]]:
+    """Async L3 rerank, hedged after a percentile of recent latencies and bounded by `deadline`.
+    
+    Raises RerankDeadlineExceeded when no request answered before the deadline.
+    """
+    async def call():
+        call_timings: Dict[str, float] = {}
+        result = await l3_llm_rerank_async(question, candidates, components, call_timings)
+        return result, call_timings
+    
+    remaining = _remaining_s(deadline)
+    if remaining is not None and remaining <= 0:
+        raise RerankDeadlineExceeded("Latency budget spent before L3")
+    try:
+        result, call_timings = await asyncio.wait_for(hedged(call, _hedge_delay(), on_hedge=L3_HEDGED.inc), remaining)
+    except asyncio.TimeoutError:
+        raise RerankDeadlineExceeded(f"L3 rerank exceeded {remaining:.2f}s")
+    timings.update(call_timings)
+    return result
+
+
+def _resolve_deadline(start: float, budget_ms: Optional[int]) -> Optional[float]:
+    """perf_counter() deadline of a hint; RAG_HINT_BUDGET_MS when no budget is given, 0 disables."""
+    budget_ms = settings.RAG_HINT_BUDGET_MS if budget_ms is None else budget_ms
+    return start + budget_ms / 1000 if budget_ms > 0 else None
+
+
+def _remaining_s(deadline: Optional[float]) -> Optional[float]:
+    return deadline - time.perf_counter() if deadline is not None else None
+
+
+def _cached_rerank(
+    components: RAGComponents, query_vector: np.ndarray, candidates: List[Dict[str, Any]]
+) -> Optional[Tuple[Dict[str, Any], float, List[Tuple[Dict[str, Any], float]]]]:
+    """Reuse a prior L3 decision for a near-identical query with the same candidate set."""
+    if rerank_cache is None:
+        return None
+    
+    by_id = {candidate['index']: candidate for candidate in candidates}
+    decision = rerank_cache.lookup(query_vector, list(by_id), components.index_version)
+    if decision is None:
+        return None
+    
+    logger.info(f"L3 rerank cache hit (confidence: {decision.confidence:.2f})")
+    alternatives = [(by_id[kb_id], conf) for kb_id, conf in decision.alternatives]
+    return by_id[decision.selected_id], decision.confidence, alternatives
+
+
+def _store_rerank(
+    components: RAGComponents,
+    query_vector: np.ndarray,
+    candidates: List[Dict[str, Any]],
+    result: Tuple[Optional[Dict[str, Any]], float, List[Tuple[Dict[str, Any], float]]],
+):
+    """Remember a successful L3 decision in the semantic rerank cache."""
+    selected_candidate, llm_confidence, llm_alternatives = result
+    if rerank_cache is None or selected_candidate is None:
+        return
+    
+    decision = RerankDecision(
+        candidate_ids=tuple(candidate['index'] for candidate in candidates),
+        selected_id=selected_candidate['index'],
+        confidence=llm_confidence,
+        alternatives=[(alt['index'], conf) for alt, conf in llm_alternatives]
+    )
+    rerank_cache.store(query_vector, decision, components.index_version)
+
+
+def _elapsed_ms(start_time: float) -> int:
+    return int((time.time() - start_time) * 1000)
+
+
+def _stage_ms(stage_start: float) -> float:
+    return round((time.perf_counter() - stage_start) * 1000, 2)
+
+
+def _error_hint(response: str, processing_time: int = 0) -> Hint:
+    return Hint(
+        response=response,
+        confidence=0,
+        category="Ошибка",
+        subcategory="Системная ошибка",
+        template="",
+        route="Error",
+        processing_time_ms=processing_time,
+        candidates_found=0
+    )
+
+
+def _unavailable_hint() -> Hint:
+    """Answer given while RAG components are still loading or failed to load."""
+    if rag_registry.state == ComponentState.FAILED:
+        return _error_hint("Произошла ошибка при обработке запроса. Пожалуйста, попробуйте позже.")
+    return Hint(
+        response="Система подсказок запускается. Пожалуйста, повторите запрос через несколько секунд.",
+        confidence=0,
+        category="Ошибка",
+        subcategory="Загрузка",
+        route="Warming up",
+        processing_time_ms=0,
+        candidates_found=0
+    )
+
+
+def _not_found_hint(route: str, processing_time: int, candidates_found: int) -> Hint:
+    return Hint(
+        response="К сожалению, не удалось найти подходящий ответ. Пожалуйста, уточните ваш вопрос.",
+        confidence=0,
+        category="Неизвестно",
+        subcategory="Неизвестно",
+        route=route,
+        processing_time_ms=processing_time,
+        candidates_found=candidates_found
+    )
+
+
+def _l1_hint(l1_result: Dict[str, Any], processing_time: int) -> Hint:
+    return Hint(
+        response=l1_result['template'],
+        confidence=100,  # Exact match = 100% confidence
+        category=l1_result.get('category', ''),
+        subcategory=l1_result.get('subcategory', ''),
+        template=l1_result['template'],
+        route="L1 Точное совпадение",
+        processing_time_ms=processing_time,
+        candidates_found=1
+    )
+
+
+def _fuzzy_hint(fuzzy_result: Tuple[Dict[str, Any], float], processing_time: int) -> Hint:
+    item, similarity = fuzzy_result
+    return Hint(
+        response=item['template'],
+        confidence=FuzzyMatcher.confidence(similarity),
+        category=item.get('category', ''),
+        subcategory=item.get('subcategory', ''),
+        template=item['template'],
+        route="L1.5 Нечеткое совпадение",
+        processing_time_ms=processing_time,
+        candidates_found=1
+    )
+
+
+def _unambiguous_margin(candidates: List[Dict[str, Any]], ambiguity_map: Optional[AmbiguityMap]) -> Optional[float]:
+    """Safety margin of the top candidate against its confusable KB neighbours, None if too ambiguous."""
+    top = candidates[0]
+    top_similarity = top.get('similarity', 0)
+    if ambiguity_map is None or top.get('row') is None or top_similarity < settings.RAG_AMBIGUITY_MIN_SIMILARITY:
+        return None
+    
+    margin = ambiguity_map.margin(top['row'], top_similarity)
+    if margin < settings.RAG_AMBIGUITY_MIN_MARGIN:
+        return None
+    # approximate search may surface a different-template candidate the map did not predict
+    groups = ambiguity_map.template_groups
+    for cand in candidates[1:]:
+        if (
+            cand.get('row') is not None
+            and groups[cand['row']] != groups[top['row']]
+            and cand.get('similarity', 0) >= top_similarity
+        ):
+            return None
+    return margin
+
+
+def _l2_hint(
+    candidates: List[Dict[str, Any]], processing_time: int, ambiguity_map: Optional[AmbiguityMap] = None
+) -> Optional[Hint]:
+    """Return an L2 hint if the top candidate is confident enough to skip L3."""
+    # Check if top candidate has very high similarity (threshold for L2)
+    top_similarity = candidates[0].get('similarity', 0)
+    route = "L2 Семантический поиск"
+    confidence_score = int(top_similarity * 100)  # Convert to 0-100
+    if top_similarity < 0.95:  # Very high confidence threshold
+        # dense and keyword retrieval agreeing on the top candidate is enough with a lower similarity
+        hybrid_agreement = candidates[0].get('dense_rank') == 1 and candidates[0].get('bm25_rank') == 1
+        margin = _unambiguous_margin(candidates, ambiguity_map)
+        if hybrid_agreement and top_similarity >= settings.RAG_HYBRID_L2_THRESHOLD:
+            route = "L2 Гибридный поиск"
+        elif margin is not None:
+            # no KB entry with another template is close enough to compete with the top one;
+            # confidence is capped by how much of the safe radius is left
+            route = "L2 Однозначное совпадение"
+            confidence_score = int(100 * min(top_similarity, 0.5 + 0.5 * margin))
+        else:
+            return None
+    
+    logger.info(f"L2 high confidence match (similarity: {top_similarity:.3f}, confidence: {confidence_score}%)")
+    return _candidate_hint(candidates, route, confidence_score, processing_time)
+
+
+def _deadline_hint(candidates: List[Dict[str, Any]], processing_time: int) -> Hint:
+    """Best L2 candidate when L3 did not answer within the latency budget."""
+    L3_DEADLINE_EXCEEDED.inc()
+    logger.warning(f"L3 rerank missed the latency budget, returning best L2 candidate ({processing_time}ms)")
+    return _degraded_hint(candidates, processing_time, "L2 Семантический поиск (L3 timeout)")
+
+
+def _degraded_hint(candidates: List[Dict[str, Any]], processing_time: int, route: str = LLM_UNAVAILABLE_ROUTE) -> Hint:
+    """Best L2 candidate returned without L3 (budget spent or LLM unavailable)."""
+    top_similarity = candidates[0].get('similarity', 0)
+    hint = _candidate_hint(candidates, route, int(top_similarity * 100), processing_time)
+    hint.degraded = True
+    return hint
+
+
+def _lexical_hint(components: RAGComponents, question: str, category: Optional[str], processing_time: int) -> Hint:
+    """Keyword-only (BM25) hint while the embeddings endpoint is unavailable."""
+    logger.warning("Embeddings unavailable, answering with keyword search only")
+    if components.bm25_index is None:
+        return _error_hint("Сервис эмбеддингов временно недоступен", processing_time)
+    
+    allowed = components.category_partitions.allowed(category) if category is not None else None
+    results = components.bm25_index.search(question, 5, allowed=allowed)
+    if not results:
+        return _not_found_hint(LEXICAL_ROUTE, processing_time, 0)
+    
+    candidates = []
+    for idx, score in results:
+        candidate = components.dataset_metadata[idx].copy()
+        candidate['row'] = idx
+        candidate['bm25_score'] = round(score, 4)
+        candidates.append(candidate)
+    
+    # BM25 scores are not calibrated: confidence is the top result's share of the top-2
+    # score mass, kept below the high-confidence band
+    runner_up = results[1][1] if len(results) > 1 else 0.0
+    confidence_score = min(79, int(100 * results[0][1] / (results[0][1] + runner_up)))
+    hint = _candidate_hint(candidates, LEXICAL_ROUTE, confidence_score, processing_time)
+    hint.degraded = True
+    return hint
+
+
+def _candidate_hint(candidates: List[Dict[str, Any]], route: str, confidence_score: int, processing_time: int) -> Hint:
+    # Check for similar confidence candidates (within 5% of top)
+    alternatives = []
+    for i, cand in enumerate(candidates[1:4], 1):  # Check next 3 candidates
+        cand_similarity = cand.get('similarity', 0)
+        cand_confidence = int(cand_similarity * 100)
+        # Include if within 5% of top confidence and above 80%
+        if cand_confidence >= 80 and abs(confidence_score - cand_confidence) <= 5:
+            alternatives.append(Candidate(
+                response=cand['template'],
+                confidence=cand_confidence,
+                category=cand.get('category', ''),
+                subcategory=cand.get('subcategory', '')
+            ))
+    
+    return Hint(
+        response=candidates[0]['template'],
+        confidence=confidence_score,
+        category=candidates[0].get('category', ''),
+        subcategory=candidates[0].get('subcategory', ''),
+        template=candidates[0]['template'],
+        route=route,
+        processing_time_ms=processing_time,
+        candidates_found=len(candidates),
+        alternatives=alternatives
+    )
+
+
+def _l3_hint(
+    candidates: List[Dict[str, Any]],
+    selected_candidate: Optional[Dict[str, Any]],
+    llm_confidence: float,
+    llm_alternatives: List[Tuple[Dict[str, Any], float]],
+    processing_time: int,
+    route: str = "L3 LLM rerank",
+) -> Hint:
+    # Check if LLM reranking failed
+    if selected_candidate is None:
+        logger.warning("L3 LLM rerank failed, returning low confidence result")
+        L3_FAILURES.inc()
+        return _not_found_hint("L3 LLM rerank (failed)", processing_time, len(candidates))
+    
+    # Convert LLM confidence to 0-100 scale
+    confidence_score = int(llm_confidence * 100)
+    
+    logger.info(f"L3 LLM rerank completed (confidence: {confidence_score}%, time: {processing_time}ms)")
+    
+    # Use LLM-ranked alternatives with their confidence scores
+    alternatives = []
+    if confidence_score >= 50:  # Only show alternatives if not extremely low
+        for alt_cand, alt_conf in llm_alternatives[:2]:  # Max 2 alternatives
+            alt_confidence = int(alt_conf * 100)
+            if alt_confidence >= 50:  # Only include decent candidates
+                alternatives.append(Candidate(
+                    response=alt_cand['template'],
+                    confidence=alt_confidence,
+                    category=alt_cand.get('category', ''),
+                    subcategory=alt_cand.get('subcategory', '')
+                ))
+    
+    return Hint(
+        response=selected_candidate['template'],
+        confidence=confidence_score,
+        category=selected_candidate.get('category', ''),
+        subcategory=selected_candidate.get('subcategory', ''),
+        template=selected_candidate['template'],
+        route=route,
+        processing_time_ms=processing_time,
+        candidates_found=len(candidates),
+        alternatives=alternatives
+    )
+
+
+def _finish_hint(hint: Hint, timings: Dict[str, float], start: float, shared_stages: Iterable[str] = ()) -> Hint:
+    """Attach per-stage timings to a hint and export them as metrics.
+    
+    `shared_stages` ran once for several hints (a batch chunk) and are observed by the caller.
+    """
+    hint.stage_timings_ms = dict(timings)
+    own_timings = {stage: duration for stage, duration in timings.items() if stage not in shared_stages}
+    # cache hits are reported separately so they do not skew the latency of the original route
+    observe_hint("hint cache" if hint.cached else hint.route, (time.perf_counter() - start) * 1000, own_timings)
+    return hint
+
+
+def _cached_hint(hint: Hint, processing_time: int) -> Hint:
+    hint.cached = True
+    hint.processing_time_ms = processing_time
+    return hint
+
+
+def generate_hint(question: str, category: Optional[str] = None, budget_ms: Optional[int] = None) -> Hint:
+    """Generates a hint based on the user's question using multi-level RAG pipeline.
+    
+    `category` (e.g. known from the ticket's product area) restricts all levels to KB
+    entries of that category; unknown categories are ignored. When L3 cannot answer within
+    `budget_ms` (default RAG_HINT_BUDGET_MS), the best L2 candidate is returned as degraded.
+    """
+    start = time.perf_counter()
+    timings: Dict[str, float] = {}
+    deadline = _resolve_deadline(start, budget_ms)
+    return _finish_hint(_generate_hint(question, timings, category, deadline), timings, start)
+
+
+def _generate_hint(
+    question: str, timings: Dict[str, float], category: Optional[str] = None, deadline: Optional[float] = None
+) -> Hint:
     start_time = time.time()
     
     try:
-        if client is None:
-            return Hint(
-                response="Произошла ошибка при обработке запроса. Пожалуйста, попробуйте позже.",
-                confidence=0,
-                category="Ошибка",
-                subcategory="Системная ошибка",
-                route="Error",
-                processing_time_ms=0,
-                candidates_found=0
-            )
+        components = rag_registry.get()
+        if components is None and (rag_registry.state == ComponentState.IDLE or rag_registry.can_retry):
+            # lazy initialization on first use (scripts, threadpool mode)
+            components = rag_registry.load()
+        if components is None:
+            return _unavailable_hint()
+        category = _resolve_category(components, category)
+        
+        stage_start = time.perf_counter()
+        normalized = normalize_text(question)
+        timings["normalize"] = _stage_ms(stage_start)
         
         # --- L1: Exact Match ---
-        l1_result = l1_exact_match(question)
+        stage_start = time.perf_counter()
+        l1_result = l1_exact_match(question, components, normalized, category)
+        timings["l1"] = _stage_ms(stage_start)
         if l1_result:
-            processing_time = int((time.time() - start_time) * 1000)
             logger.info(f"L1 exact match found for question: {question[:50]}...")
-            return Hint(
-                response=l1_result['template'],
-                confidence=100,  # Exact match = 100% confidence
-                category=l1_result.get('category', ''),
-                subcategory=l1_result.get('subcategory', ''),
-                template=l1_result['template'],
-                route="L1 Точное совпадение",
-                processing_time_ms=processing_time,
-                candidates_found=1
-            )
+            return _l1_hint(l1_result, _elapsed_ms(start_time))
         
-        # --- L2: Semantic Search ---
-        candidates = l2_semantic_search(question, top_k=5)
+        # --- L1.5: Fuzzy Match ---
+        stage_start = time.perf_counter()
+        fuzzy_result = l15_fuzzy_match(question, components, normalized, category)
+        timings["fuzzy"] = _stage_ms(stage_start)
+        if fuzzy_result:
+            return _fuzzy_hint(fuzzy_result, _elapsed_ms(start_time))
         
-        if not candidates:
-            processing_time = int((time.time() - start_time) * 1000)
-            return Hint(
-                response="К сожалению, не удалось найти подходящий ответ. Пожалуйста, уточните ваш вопрос.",
-                confidence=0,
-                category="Неизвестно",
-                subcategory="Неизвестно",
-                route="L2 Семантический поиск",
-                processing_time_ms=processing_time,
-                candidates_found=0
-            )
+        # --- Shared hint cache (L2/L3 results of all workers) ---
+        if hint_cache is None:
+            return _semantic_hint(components, question, category, timings, deadline, start_time)
+        
+        cache_key = hint_cache.key(components.index_version, normalized, category)
+        stage_start = time.perf_counter()
+        with hint_cache.coalesce(cache_key, max_wait=_remaining_s(deadline)) as cached_hint:
+            timings["hint_cache"] = _stage_ms(stage_start)
+            if cached_hint is not None:
+                return _cached_hint(cached_hint, _elapsed_ms(start_time))
+            hint = _semantic_hint(components, question, category, timings, deadline, start_time)
+            hint_cache.set(cache_key, hint)
+            return hint
+    
+    except Exception as e:
+        logger.error(f"Error generating hint: {e}", exc_info=True)
+        return _error_hint(f"Произошла ошибка при обработке запроса: {str(e)}", _elapsed_ms(start_time))
+
+
+def _semantic_hint(
+    components: RAGComponents,
+    question: str,
+    category: Optional[str],
+    timings: Dict[str, float],
+    deadline: Optional[float],
+    start_time: float,
+) -> Hint:
+    """L2 semantic search and, when L2 is not confident enough, L3 rerank."""
+    # --- L2: Semantic Search ---
+    stage_start = time.perf_counter()
+    try:
+        query_vector = embed_question(question, components)
+    except (CircuitOpenError, APIError):
+        return _lexical_hint(components, question, category, _elapsed_ms(start_time))
+    timings["embed"] = _stage_ms(stage_start)
+    
+    stage_start = time.perf_counter()
+    candidates = _search_index(components, query_vector, top_k=5, question=question, category=category)
+    timings["search"] = _stage_ms(stage_start)
+    
+    if not candidates:
+        return _not_found_hint("L2 Семантический поиск", _elapsed_ms(start_time), 0)
+    
+    l2_hint = _l2_hint(candidates, _elapsed_ms(start_time), components.ambiguity_map)
+    if l2_hint:
+        return l2_hint
+    
+    # --- L3: LLM Rerank ---
+    # Use top 3 candidates for reranking
+    top_candidates = candidates[:3]
+    stage_start = time.perf_counter()
+    cached = _cached_rerank(components, query_vector, top_candidates)
+    timings["rerank_cache"] = _stage_ms(stage_start)
+    if cached:
+        return _l3_hint(candidates, *cached, _elapsed_ms(start_time), route="L3 LLM rerank (кэш)")
+    
+    remaining = _remaining_s(deadline)
+    if remaining is not None and remaining <= 0:
+        return _deadline_hint(candidates, _elapsed_ms(start_time))
+    try:
+        result = l3_llm_rerank(question, top_candidates, components, timings, timeout=remaining)
+    except RerankDeadlineExceeded:
+        return _deadline_hint(candidates, _elapsed_ms(start_time))
+    except CircuitOpenError:
+        return _degraded_hint(candidates, _elapsed_ms(start_time))
+    _store_rerank(components, query_vector, top_candidates, result)
+    
+    return _l3_hint(candidates, *result, _elapsed_ms(start_time))
+
+
+async def _hint_pipeline_async(
+    question: str,
+    timings: Dict[str, float],
+    category: Optional[str] = None,
+    budget_ms: Optional[int] = None,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """Async multi-level pipeline yielding progressive results.
+    
+    Yields ("candidates", candidates) with the L2 top candidates as soon as the FAISS search
+    finishes and L3 is still needed, then ("hint", Hint). Per-stage timings in milliseconds
+    are recorded into `timings` and attached to the hint.
+    """
+    start = time.perf_counter()
+    deadline = _resolve_deadline(start, budget_ms)
+    async for event, payload in _hint_stages_async(question, timings, category, deadline):
+        if event == "hint":
+            payload = _finish_hint(payload, timings, start)
+        yield event, payload
+
+
+async def _hint_stages_async(
+    question: str,
+    timings: Dict[str, float],
+    category: Optional[str] = None,
+    deadline: Optional[float] = None,
+) -> AsyncIterator[Tuple[str, Any]]:
+    async with hint_semaphore:
+        start_time = time.time()
         
-        # Check if top candidate has very high similarity (threshold for L2)
-        top_similarity = candidates[0].get('similarity', 0)
-        if top_similarity >= 0.95:  # Very high confidence threshold
-            processing_time = int((time.time() - start_time) * 1000)
-            confidence_score = int(top_similarity * 100)  # Convert to 0-100
-            logger.info(f"L2 high confidence match (similarity: {top_similarity:.3f}, confidence: {confidence_score}%)")
+        try:
+            components = rag_registry.get()
+            if components is None:
+                if rag_registry.state == ComponentState.IDLE or rag_registry.can_retry:
+                    rag_registry.start_background_load()
+                yield "hint", _unavailable_hint()
+                return
+            category = _resolve_category(components, category)
             
-            # Check for similar confidence candidates (within 5% of top)
-            alternatives = []
-            for i, cand in enumerate(candidates[1:4], 1):  # Check next 3 candidates
-                cand_similarity = cand.get('similarity', 0)
-                cand_confidence = int(cand_similarity * 100)
-                # Include if within 5% of top confidence and above 80%
-                if cand_confidence >= 80 and abs(confidence_score - cand_confidence) <= 5:
-                    alternatives.append(Candidate(
+            stage_start = time.perf_counter()
+            normalized = normalize_text(question)
+            timings["normalize"] = _stage_ms(stage_start)
+            
+            # --- L1: Exact Match ---
+            stage_start = time.perf_counter()
+            l1_result = l1_exact_match(question, components, normalized, category)
+            timings["l1"] = _stage_ms(stage_start)
+            if l1_result:
+                logger.info(f"L1 exact match found for question: {question[:50]}...")
+                yield "hint", _l1_hint(l1_result, _elapsed_ms(start_time))
+                return
+            
+            # --- L1.5: Fuzzy Match ---
+            stage_start = time.perf_counter()
+            fuzzy_result = l15_fuzzy_match(question, components, normalized, category)
+            timings["fuzzy"] = _stage_ms(stage_start)
+            if fuzzy_result:
+                yield "hint", _fuzzy_hint(fuzzy_result, _elapsed_ms(start_time))
+                return
+            
+            # --- Shared hint cache (L2/L3 results of all workers) ---
+            if hint_cache is None:
+                stages = _semantic_stages_async(components, question, category, timings, deadline, start_time)
+                async for event, payload in stages:
+                    yield event, payload
+                return
+            
+            cache_key = hint_cache.key(components.index_version, normalized, category)
+            stage_start = time.perf_counter()
+            async with hint_cache.acoalesce(cache_key, max_wait=_remaining_s(deadline)) as cached_hint:
+                timings["hint_cache"] = _stage_ms(stage_start)
+                if cached_hint is not None:
+                    yield "hint", _cached_hint(cached_hint, _elapsed_ms(start_time))
+                    return
+                stages = _semantic_stages_async(components, question, category, timings, deadline, start_time)
+                async for event, payload in stages:
+                    if event == "hint":
+                        await hint_cache.aset(cache_key, payload)
+                    yield event, payload
+        
+        except Exception as e:
+            logger.error(f"Error generating hint: {e}", exc_info=True)
+            yield "hint", _error_hint(f"Произошла ошибка при обработке запроса: {str(e)}", _elapsed_ms(start_time))
+
+
+async def _semantic_stages_async(
+    components: RAGComponents,
+    question: str,
+    category: Optional[str],
+    timings: Dict[str, float],
+    deadline: Optional[float],
+    start_time: float,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """Async L2/L3 stages of `_hint_stages_async`."""
+    # --- L2: Semantic Search ---
+    stage_start = time.perf_counter()
+    try:
+        query_vector = await embed_question_async(question, components)
+    except (CircuitOpenError, APIError):
+        yield "hint", _lexical_hint(components, question, category, _elapsed_ms(start_time))
+        return
+    timings["embed"] = _stage_ms(stage_start)
+    
+    stage_start = time.perf_counter()
+    candidates = _search_index(components, query_vector, top_k=5, question=question, category=category)
+    timings["search"] = _stage_ms(stage_start)
+    
+    if not candidates:
+        yield "hint", _not_found_hint("L2 Семантический поиск", _elapsed_ms(start_time), 0)
+        return
+    
+    l2_hint = _l2_hint(candidates, _elapsed_ms(start_time), components.ambiguity_map)
+    if l2_hint:
+        yield "hint", l2_hint
+        return
+    
+    yield "candidates", candidates
+    
+    # --- L3: LLM Rerank ---
+    # Use top 3 candidates for reranking
+    top_candidates = candidates[:3]
+    stage_start = time.perf_counter()
+    cached = _cached_rerank(components, query_vector, top_candidates)
+    timings["rerank_cache"] = _stage_ms(stage_start)
+    if cached:
+        yield "hint", _l3_hint(candidates, *cached, _elapsed_ms(start_time), route="L3 LLM rerank (кэш)")
+        return
+    
+    try:
+        result = await _l3_rerank_within(question, top_candidates, components, timings, deadline)
+    except RerankDeadlineExceeded:
+        yield "hint", _deadline_hint(candidates, _elapsed_ms(start_time))
+        return
+    except CircuitOpenError:
+        yield "hint", _degraded_hint(candidates, _elapsed_ms(start_time))
+        return
+    _store_rerank(components, query_vector, top_candidates, result)
+    
+    yield "hint", _l3_hint(candidates, *result, _elapsed_ms(start_time))
+
+
+async def generate_hint_async(question: str, category: Optional[str] = None, budget_ms: Optional[int] = None) -> Hint:
+    """Async variant of `generate_hint`; concurrency is bounded by RAG_MAX_CONCURRENT_HINTS."""
+    hint = None
+    # consume the pipeline to the end so the concurrency slot is released right away
+    async for event, payload in _hint_pipeline_async(question, timings={}, category=category, budget_ms=budget_ms):
+        if event == "hint":
+            hint = payload
+    return hint
+
+
+async def hint_events(
+    question: str, category: Optional[str] = None, budget_ms: Optional[int] = None
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """Progressive hint results as (event, payload) pairs for streaming to operators.
+    
+    "candidates" carries the L2 top candidates, "hint" the final `Hint`;
+    both include the route and per-stage timings.
+    """
+    timings: Dict[str, float] = {}
+    async for event, payload in _hint_pipeline_async(question, timings, category, budget_ms):
+        if event == "candidates":
+            yield event, {
+                "route": "L2 Семантический поиск",
+                "candidates": [
+                    Candidate(
                         response=cand['template'],
-                        confidence=cand_confidence,
+                        confidence=int(cand.get('similarity', 0) * 100),
                         category=cand.get('category', ''),
                         subcategory=cand.get('subcategory', '')
-                    ))
+                    ).model_dump()
+                    for cand in payload
+                ],
+                "timings_ms": dict(timings),
+            }
+        else:
+            yield event, {**payload.model_dump(), "timings_ms": dict(timings)}
+
+
+# --- Batch Hint Generation ---
+
+async def _embed_questions_batch(components: RAGComponents, questions: List[str]) -> np.ndarray:
+    """Embed many questions with batched `embed_documents` calls, reusing cached embeddings."""
+    normalized = [normalize_text(question) for question in questions]
+    vectors: Dict[str, np.ndarray] = {}
+    if embedding_cache is not None:
+        for key in set(normalized):
+            cached = await embedding_cache.aget(key)
+            if cached is not None:
+                vectors[key] = cached
+    
+    # identical normalized questions are embedded once
+    missing: Dict[str, str] = {}
+    for question, key in zip(questions, normalized):
+        if key not in vectors:
+            missing.setdefault(key, question)
+    keys = list(missing)
+    batch_size = settings.RAG_EMBED_BATCH_SIZE
+    semaphore = asyncio.Semaphore(settings.RAG_BATCH_CONCURRENCY)
+    
+    async def embed_chunk(chunk: List[str]):
+        async with semaphore:
+            embeddings = await components.async_embedding_model.embed_documents([missing[key] for key in chunk])
+        for key, embedding in zip(chunk, embeddings):
+            vectors[key] = np.asarray(embedding, dtype='float32')
+            if embedding_cache is not None:
+                await embedding_cache.aset(key, vectors[key])
+    
+    await asyncio.gather(*[embed_chunk(keys[i:i+batch_size]) for i in range(0, len(keys), batch_size)])
+    return np.vstack([vectors[key] for key in normalized])
+
+
+async def _rerank_for_batch(
+    components: RAGComponents,
+    question: str,
+    query_vector: np.ndarray,
+    candidates: List[Dict[str, Any]],
+    semaphore: asyncio.Semaphore,
+    start_time: float,
+) -> Tuple[Hint, Dict[str, float]]:
+    timings: Dict[str, float] = {}
+    top_candidates = candidates[:3]
+    cached = _cached_rerank(components, query_vector, top_candidates)
+    if cached:
+        return _l3_hint(candidates, *cached, _elapsed_ms(start_time), route="L3 LLM rerank (кэш)"), timings
+    
+    try:
+        async with semaphore:
+            result = await l3_llm_rerank_async(question, top_candidates, components, timings)
+    except CircuitOpenError:
+        return _degraded_hint(candidates, _elapsed_ms(start_time)), timings
+    except Exception as e:
+        logger.error(f"Error reranking batch query: {e}", exc_info=True)
+        return _error_hint(f"Произошла ошибка при обработке запроса: {str(e)}", _elapsed_ms(start_time)), timings
+    _store_rerank(components, query_vector, top_candidates, result)
+    return _l3_hint(candidates, *result, _elapsed_ms(start_time)), timings
+
+
+async def _hints_for_chunk(
+    components: RAGComponents, questions: List[str], category: Optional[str] = None
+) -> AsyncIterator[Hint]:
+    """Run one chunk of a batch through L1/L1.5, batched L2 and concurrent L3; yield hints in input order."""
+    start = time.perf_counter()
+    start_time = time.time()
+    # durations of the stages run once for the whole chunk, and the stages each query went through
+    timings: Dict[str, float] = {}
+    stages: List[List[str]] = [["l1"] for _ in questions]
+    hints: List[Optional[Hint]] = [None] * len(questions)
+    
+    # --- L1 / L1.5 for all queries in one pass ---
+    stage_start = time.perf_counter()
+    pending = []
+    for i, question in enumerate(questions):
+        normalized = normalize_text(question)
+        l1_result = l1_exact_match(question, components, normalized, category)
+        if l1_result:
+            hints[i] = _l1_hint(l1_result, _elapsed_ms(start_time))
+            continue
+        fuzzy_result = l15_fuzzy_match(question, components, normalized, category)
+        if fuzzy_result:
+            hints[i] = _fuzzy_hint(fuzzy_result, _elapsed_ms(start_time))
+            continue
+        pending.append(i)
+    timings["l1"] = _stage_ms(stage_start)
+    
+    # --- Shared hint cache: one MGET for the whole chunk ---
+    cache_keys: Dict[int, str] = {}
+    if hint_cache is not None and pending:
+        stage_start = time.perf_counter()
+        cache_keys = {
+            i: hint_cache.key(components.index_version, normalize_text(questions[i]), category) for i in pending
+        }
+        cached_hints = await hint_cache.aget_many([cache_keys[i] for i in pending])
+        timings["hint_cache"] = _stage_ms(stage_start)
+        for i, cached_hint in zip(list(pending), cached_hints):
+            stages[i].append("hint_cache")
+            if cached_hint is not None:
+                hints[i] = _cached_hint(cached_hint, _elapsed_ms(start_time))
+        pending = [i for i in pending if hints[i] is None]
+    
+    # --- L2: batched embeddings and one multi-query search ---
+    rerank_tasks: Dict[int, asyncio.Task] = {}
+    query_vectors, candidate_lists = [], []
+    l2_pending = list(pending)
+    if pending:
+        try:
+            stage_start = time.perf_counter()
+            query_vectors = await _embed_questions_batch(components, [questions[i] for i in pending])
+            timings["embed"] = _stage_ms(stage_start)
             
-            return Hint(
-                response=candidates[0]['template'],
-                confidence=confidence_score,
-                category=candidates[0].get('category', ''),
-                subcategory=candidates[0].get('subcategory', ''),
-                template=candidates[0]['template'],
-                route="L2 Семантический поиск",
-                processing_time_ms=processing_time,
-                candidates_found=len(candidates),
-                alternatives=alternatives
+            stage_start = time.perf_counter()
+            candidate_lists = _search_index_batch(
+                components, query_vectors, top_k=5, questions=[questions[i] for i in pending], category=category
             )
-        
-        # --- L3: LLM Rerank ---
-        # Use top 3 candidates for reranking
-        top_candidates = candidates[:3]
-        selected_candidate, llm_confidence, llm_alternatives = l3_llm_rerank(question, top_candidates)
-        
-        processing_time = int((time.time() - start_time) * 1000)
-        
-        # Check if LLM reranking failed
-        if selected_candidate is None:
-            logger.warning("L3 LLM rerank failed, returning low confidence result")
-            return Hint(
-                response="К сожалению, не удалось найти подходящий ответ. Пожалуйста, уточните ваш вопрос.",
-                confidence=0,
-                category="Неизвестно",
-                subcategory="Неизвестно",
-                route="L3 LLM rerank (failed)",
-                processing_time_ms=processing_time,
-                candidates_found=len(candidates)
-            )
-        
-        # Convert LLM confidence to 0-100 scale
-        confidence_score = int(llm_confidence * 100)
-        
-        logger.info(f"L3 LLM rerank completed (confidence: {confidence_score}%, time: {processing_time}ms)")
-        
-        # Use LLM-ranked alternatives with their confidence scores
-        alternatives = []
-        if confidence_score >= 50:  # Only show alternatives if not extremely low
-            for alt_cand, alt_conf in llm_alternatives[:2]:  # Max 2 alternatives
-                alt_confidence = int(alt_conf * 100)
-                if alt_confidence >= 50:  # Only include decent candidates
-                    alternatives.append(Candidate(
-                        response=alt_cand['template'],
-                        confidence=alt_confidence,
-                        category=alt_cand.get('category', ''),
-                        subcategory=alt_cand.get('subcategory', '')
-                    ))
-        
-        return Hint(
-            response=selected_candidate['template'],
-            confidence=confidence_score,
-            category=selected_candidate.get('category', ''),
-            subcategory=selected_candidate.get('subcategory', ''),
-            template=selected_candidate['template'],
-            route="L3 LLM rerank",
-            processing_time_ms=processing_time,
-            candidates_found=len(candidates),
-            alternatives=alternatives
-        )
+            timings["search"] = _stage_ms(stage_start)
+        except (CircuitOpenError, APIError):
+            for i in pending:
+                hints[i] = _lexical_hint(components, questions[i], category, _elapsed_ms(start_time))
+            pending = []
+        except Exception as e:
+            logger.error(f"Error generating batch hints: {e}", exc_info=True)
+            for i in pending:
+                hints[i] = _error_hint(f"Произошла ошибка при обработке запроса: {str(e)}", _elapsed_ms(start_time))
+            pending = []
+    for i in l2_pending:
+        stages[i].extend(stage for stage in ("embed", "search") if stage in timings)
+    # observed once per chunk rather than once per hint that shared them
+    observe_stages("batch", timings)
     
-    except Exception as e:
-        processing_time = int((time.time() - start_time) * 1000)
-        logger.error(f"Error generating hint: {e}", exc_info=True)
-        return Hint(
-            response=f"Произошла ошибка при обработке запроса: {str(e)}",
-            confidence=0,
-            category="Ошибка",
-            subcategory="Системная ошибка",
-            template="",
-            route="Error",
-            processing_time_ms=processing_time,
-            candidates_found=0
+    # --- L3: reranks fanned out with bounded concurrency ---
+    semaphore = asyncio.Semaphore(settings.RAG_BATCH_CONCURRENCY)
+    for i, query_vector, candidates in zip(pending, query_vectors, candidate_lists):
+        if not candidates:
+            hints[i] = _not_found_hint("L2 Семантический поиск", _elapsed_ms(start_time), 0)
+            continue
+        l2_hint = _l2_hint(candidates, _elapsed_ms(start_time), components.ambiguity_map)
+        if l2_hint:
+            hints[i] = l2_hint
+            continue
+        rerank_tasks[i] = asyncio.create_task(
+            _rerank_for_batch(components, questions[i], query_vector, candidates, semaphore, start_time)
         )
+    
+    try:
+        computed: Dict[str, Hint] = {}
+        for i in range(len(questions)):
+            hint_timings = {stage: timings[stage] for stage in stages[i]}
+            if i in rerank_tasks:
+                hint, rerank_timings = await rerank_tasks[i]
+                hint_timings.update(rerank_timings)
+            else:
+                hint = hints[i]
+            if i in cache_keys and not hint.cached:
+                computed[cache_keys[i]] = hint
+            yield _finish_hint(hint, hint_timings, start, shared_stages=timings)
+        if hint_cache is not None:
+            await hint_cache.aset_many(computed)
+    finally:
+        for task in rerank_tasks.values():
+            task.cancel()
+
+
+async def iter_hints_batch(questions: List[str], category: Optional[str] = None) -> AsyncIterator[Hint]:
+    """Hints for many queries, yielded in input order.
+    
+    Queries are processed in chunks of RAG_BATCH_CHUNK_SIZE: L1 for the whole chunk in one
+    pass, misses embedded with batched `embed_documents` calls and searched with a single
+    multi-query FAISS search, L3 reranks run concurrently. Results of a chunk are yielded as
+    soon as they are ready in order, so large batches stream.
+    """
+    components = rag_registry.get()
+    if components is None and (rag_registry.state != ComponentState.FAILED or rag_registry.can_retry):
+        # bulk jobs wait for the components instead of getting "warming up" answers
+        components = await asyncio.to_thread(rag_registry.load)
+    if components is None:
+        for _ in questions:
+            yield _unavailable_hint()
+        return
+    
+    category = _resolve_category(components, category)
+    chunk_size = settings.RAG_BATCH_CHUNK_SIZE
+    for offset in range(0, len(questions), chunk_size):
+        async for hint in _hints_for_chunk(components, questions[offset:offset+chunk_size], category):
+            yield hint
+
+
+async def generate_hints_batch(questions: List[str], category: Optional[str] = None) -> List[Hint]:
+    """Hints for a list of queries, in input order (see `iter_hints_batch`)."""
+    return [hint async for hint in iter_hints_batch(questions, category)]
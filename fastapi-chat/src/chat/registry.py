@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import threading
+import time
+from enum import Enum
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ComponentState(str, Enum):
+    IDLE = "idle"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+
+
+class ComponentRegistry(Generic[T]):
+    """Holds lazily loaded components and reports their readiness.
+
+    Components are built by `loader` either on first use (`load`) or in a background
+    task (`start_background_load`), so importing the module never blocks on IO.
+    `get` never blocks and returns None until the components are ready.
+    `reload` builds a new set next to the served one and swaps it in; callers that already
+    got the old components keep using them until they are done.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        loader: Callable[[], T],
+        describe: Optional[Callable[[T], Dict[str, Any]]] = None,
+        retry_after_seconds: float = 30.0,
+        reloader: Optional[Callable[[T], T]] = None,
+    ):
+        self.name = name
+        self.loader = loader
+        self.reloader = reloader
+        self.describe = describe
+        self.retry_after_seconds = retry_after_seconds
+
+        self.state = ComponentState.IDLE
+        self.components: Optional[T] = None
+        self.error: Optional[str] = None
+        self.load_time_ms: Optional[int] = None
+        self.loaded_at: Optional[float] = None
+        self.failed_at: Optional[float] = None
+        self.reloads = 0
+        self.reload_error: Optional[str] = None
+
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._reload_task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == ComponentState.READY
+
+    def get(self) -> Optional[T]:
+        """Return loaded components without blocking, None if they are not ready yet."""
+        return self.components if self.ready else None
+
+    def load(self) -> Optional[T]:
+        """Load components in the calling thread; concurrent callers wait for the same load."""
+        with self._lock:
+            if self.ready:
+                return self.components
+
+            self.state = ComponentState.LOADING
+            start_time = time.perf_counter()
+            try:
+                components = self.loader()
+            except Exception as e:
+                logger.error(f"Failed to load {self.name} components: {e}", exc_info=True)
+                self.state = ComponentState.FAILED
+                self.error = str(e)
+                self.failed_at = time.monotonic()
+                return None
+            finally:
+                self.load_time_ms = int((time.perf_counter() - start_time) * 1000)
+
+            self.components = components
+            self.error = None
+            self.loaded_at = time.time()
+            self.state = ComponentState.READY
+            logger.info(f"{self.name} components loaded in {self.load_time_ms}ms")
+            return components
+
+    @property
+    def can_retry(self) -> bool:
+        """Whether a failed load may be retried (throttled by `retry_after_seconds`)."""
+        return self.state == ComponentState.FAILED and time.monotonic() - self.failed_at >= self.retry_after_seconds
+
+    def reload(self) -> bool:
+        """Build fresh components (via `reloader(current)` when given) and swap them in.
+
+        The served components stay in place while loading and are kept when it fails.
+        """
+        if not self.ready:
+            return self.load() is not None
+
+        with self._reload_lock:
+            previous = self.components
+            start_time = time.perf_counter()
+            try:
+                components = self.reloader(previous) if self.reloader is not None else self.loader()
+            except Exception as e:
+                logger.error(f"Failed to reload {self.name} components, keeping the current ones: {e}", exc_info=True)
+                self.reload_error = str(e)
+                return False
+
+            with self._lock:
+                self.components = components
+                self.load_time_ms = int((time.perf_counter() - start_time) * 1000)
+                self.loaded_at = time.time()
+                self.reloads += 1
+                self.reload_error = None
+            logger.info(f"{self.name} components reloaded in {self.load_time_ms}ms")
+            return True
+
+    def start_background_reload(self) -> asyncio.Task:
+        """Schedule `reload` in a worker thread unless one is already running."""
+        if self._reload_task is None or self._reload_task.done():
+            self._reload_task = asyncio.get_running_loop().create_task(asyncio.to_thread(self.reload))
+        return self._reload_task
+
+    def start_background_load(self) -> asyncio.Task:
+        """Schedule `load` in a worker thread unless it is already running, done or recently failed."""
+        if self._task is None or (self._task.done() and self.can_retry):
+            if not self.ready:
+                # already ready when loaded before the worker was forked
+                self.state = ComponentState.LOADING
+            self._task = asyncio.get_running_loop().create_task(asyncio.to_thread(self.load))
+        return self._task
+
+    def status(self) -> Dict[str, Any]:
+        status = {
+            "name": self.name,
+            "state": self.state.value,
+            "load_time_ms": self.load_time_ms,
+            "loaded_at": self.loaded_at,
+            "error": self.error,
+            "reloads": self.reloads,
+            "reload_error": self.reload_error,
+        }
+        if self.ready and self.describe is not None:
+            status.update(self.describe(self.components))
+        return status
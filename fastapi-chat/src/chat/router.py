@@ -4,8 +4,9 @@ from typing import Annotated
 from uuid import UUID
 
 import redis.asyncio as aioredis
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.chat.schemas import (
@@ -15,6 +16,8 @@ from src.chat.schemas import (
     GetDirectChatsSchema,
     GetMessagesSchema,
     GetOldMessagesSchema,
+    HintBatchRequestSchema,
+    HintReadinessSchema,
     HintRequestSchema,
 )
 from src.chat.services import (
@@ -33,7 +36,15 @@ from src.config import settings
 from src.database import get_async_session
 from src.dependencies import get_cache, get_cache_setting, get_current_user
 from src.models import Chat, Message, User
-from src.chat.rag import generate_hint, Hint
+from src.chat.rag import (
+    Hint,
+    generate_hint,
+    generate_hint_async,
+    generate_hints_batch,
+    hint_events,
+    iter_hints_batch,
+    rag_registry,
+)
 from src.utils import clear_cache_for_get_direct_chats
 
 chat_router = APIRouter(tags=["Chat Management"])
@@ -206,5 +217,60 @@ async def get_older_messages(
 
 
 @chat_router.post("/chat/hint/", summary="Get a hint for a chat", response_model=Hint)
-async def get_hint_view(query: str = Query(..., description="The customer query to get a hint for")):
-    return await run_in_threadpool(generate_hint, query)
+async def get_hint_view(
+    query: str = Query(..., description="The customer query to get a hint for"),
+    category: str | None = Query(None, description="Restrict the hint to a knowledge base category"),
+    budget_ms: int | None = Query(
+        None, gt=0, description="Latency budget; L3 is skipped when it cannot answer in time"
+    ),
+):
+    if settings.RAG_ASYNC_ENABLED:
+        return await generate_hint_async(query, category, budget_ms)
+    return await run_in_threadpool(generate_hint, query, category, budget_ms)
+
+
+@chat_router.get("/chat/hint/stream/", summary="Stream progressive hint results for a chat")
+async def stream_hint_view(
+    query: str = Query(..., description="The customer query to get a hint for"),
+    category: str | None = Query(None, description="Restrict the hint to a knowledge base category"),
+    budget_ms: int | None = Query(
+        None, gt=0, description="Latency budget; L3 is skipped when it cannot answer in time"
+    ),
+):
+    async def event_stream():
+        async for event, payload in hint_events(query, category, budget_ms):
+            yield f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@chat_router.post("/chat/hint/batch/", summary="Get hints for a batch of customer queries")
+async def batch_hint_view(batch_schema: HintBatchRequestSchema):
+    queries = batch_schema.queries
+    if len(queries) > settings.RAG_BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.RAG_BATCH_MAX_QUERIES} queries per batch are allowed",
+        )
+
+    if not batch_schema.stream and len(queries) <= settings.RAG_BATCH_STREAM_THRESHOLD:
+        return await generate_hints_batch(queries, batch_schema.category)
+
+    async def ndjson_stream():
+        index = 0
+        async for hint in iter_hints_batch(queries, batch_schema.category):
+            yield json.dumps({"index": index, **hint.model_dump()}, ensure_ascii=False) + "\n"
+            index += 1
+
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+
+
+@chat_router.get("/chat/hint/ready/", summary="Hint pipeline readiness", response_model=HintReadinessSchema)
+async def hint_readiness_view(response: Response):
+    if not rag_registry.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return rag_registry.status()
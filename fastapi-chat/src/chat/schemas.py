@@ -97,3 +97,32 @@ class GetOldMessagesSchema(BaseModel):
 
 class HintRequestSchema(BaseModel):
     query: str
+
+
+class HintBatchRequestSchema(BaseModel):
+    queries: list[str]
+    # restrict all queries to one KB category
+    category: str | None = None
+    # stream hints as NDJSON lines even for small batches
+    stream: bool = False
+
+
+class HintReadinessSchema(BaseModel):
+    name: str
+    state: str
+    load_time_ms: int | None = None
+    loaded_at: float | None = None
+    error: str | None = None
+    reloads: int = 0
+    reload_error: str | None = None
+    index_size: int | None = None
+    dimension: int | None = None
+    metadata_entries: int | None = None
+    l1_entries: int | None = None
+    index_version: str | None = None
+    bm25_terms: int | None = None
+    fuzzy_match: dict | None = None
+    categories: dict | None = None
+    ambiguity: dict | None = None
+    circuits: dict | None = None
+    hint_cache: dict | None = None
@@ -62,10 +62,119 @@ class GlobalSettings(BaseSettings):
     SCIBOX_BASE_URL: str = "https://llm.t1v.scibox.tech/v1"
     SCIBOX_LLM_MODEL: str = "Qwen2.5-72B-Instruct-AWQ"
     SCIBOX_EMBEDDING_MODEL: str = "bge-m3"
+    SCIBOX_TIMEOUT_SECONDS: float = 30.0
+    SCIBOX_MAX_CONNECTIONS: int = 100
+    SCIBOX_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    # offline OpenAI-compatible stand-in (also selected by SCIBOX_BASE_URL=offline://)
+    SCIBOX_OFFLINE: bool = False
+    SCIBOX_OFFLINE_DIMENSION: int = 1024
+    SCIBOX_OFFLINE_EMBEDDING_LATENCY_MS: float = 0.0
+    SCIBOX_OFFLINE_CHAT_LATENCY_MS: float = 0.0
+    SCIBOX_OFFLINE_JITTER_MS: float = 0.0
+    SCIBOX_OFFLINE_FAILURE_RATE: float = 0.0
+    SCIBOX_OFFLINE_SEED: int = 0
+
+    # RAG hint pipeline
+    # load the FAISS index and caches in a background task on application startup
+    RAG_PRELOAD_ON_STARTUP: bool = True
+    # gunicorn (gunicorn.conf.py): load the RAG components once in the master before forking,
+    # workers share them copy-on-write
+    RAG_PRELOAD_BEFORE_FORK: bool = True
+    # memory-map FAISS vectors so workers share the page cache instead of private copies
+    RAG_INDEX_MMAP: bool = True
+    # hot reload: workers check data/CURRENT for a newly published index bundle every
+    # RAG_INDEX_RELOAD_POLL_SECONDS (woken up early by a Redis notification) and swap it in
+    RAG_INDEX_RELOAD_ENABLED: bool = True
+    RAG_INDEX_RELOAD_POLL_SECONDS: float = 10.0
+    RAG_INDEX_RELOAD_CHANNEL: str = "rag:index_published"
+    # published bundles kept on disk, including the current one
+    RAG_INDEX_BUNDLES_KEEP: int = 3
+    # FAISS index type used when building: flat, ivf, hnsw, sq8, ivf_sq8
+    RAG_INDEX_TYPE: str = "flat"
+    RAG_INDEX_NLIST: int = 100
+    RAG_INDEX_NPROBE: int = 8
+    RAG_INDEX_HNSW_M: int = 32
+    RAG_INDEX_EF_CONSTRUCTION: int = 200
+    RAG_INDEX_EF_SEARCH: int = 64
+    # knowledge base datasets (Excel, CSV, Parquet) are read in chunks of this many rows
+    RAG_INGEST_CHUNK_ROWS: int = 10_000
+    # embedding of the knowledge base during index builds
+    RAG_EMBED_BATCH_SIZE: int = 32
+    RAG_EMBED_CONCURRENCY: int = 4
+    RAG_EMBED_MAX_RETRIES: int = 5
+    RAG_EMBED_RETRY_BACKOFF_SECONDS: float = 1.0
+    # L1.5 near-duplicate matching of L1 cache questions (MinHash/LSH over character 3-grams)
+    RAG_FUZZY_ENABLED: bool = True
+    RAG_FUZZY_THRESHOLD: float = 0.85
+    RAG_FUZZY_NUM_PERM: int = 64
+    RAG_FUZZY_BANDS: int = 16
+    # hybrid L2: BM25 over question + keywords fused with FAISS results (reciprocal rank fusion)
+    RAG_HYBRID_ENABLED: bool = True
+    RAG_HYBRID_CANDIDATES: int = 20
+    RAG_RRF_K: int = 60
+    RAG_BM25_K1: float = 1.5
+    RAG_BM25_B: float = 0.75
+    # L2 similarity threshold when dense and BM25 retrieval agree on the top candidate
+    RAG_HYBRID_L2_THRESHOLD: float = 0.90
+    # skip L3 when the top L2 candidate has no confusable KB neighbour (precomputed ambiguity map):
+    # the query must be within the safe radius around it with at least this margin (0..1)
+    RAG_AMBIGUITY_ENABLED: bool = True
+    RAG_AMBIGUITY_MIN_SIMILARITY: float = 0.80
+    RAG_AMBIGUITY_MIN_MARGIN: float = 0.25
+    RAG_AMBIGUITY_NEIGHBORS: int = 10
+    # latency budget of a hint (overridable per request); when L3 has not answered in time the
+    # best L2 candidate is returned flagged as degraded. 0 disables the budget
+    RAG_HINT_BUDGET_MS: int = 5000
+    # hedged L3: fire a duplicate request once the first one is slower than this percentile
+    # of the last RAG_HEDGE_WINDOW requests (needs RAG_HEDGE_MIN_SAMPLES samples first)
+    RAG_HEDGE_ENABLED: bool = False
+    RAG_HEDGE_PERCENTILE: float = 95.0
+    RAG_HEDGE_MIN_DELAY_MS: int = 200
+    RAG_HEDGE_MIN_SAMPLES: int = 20
+    RAG_HEDGE_WINDOW: int = 200
+    # Scibox circuit breakers (embeddings and chat separately): open after this many consecutive
+    # upstream failures, probe again after the recovery time
+    RAG_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    RAG_CIRCUIT_RECOVERY_SECONDS: float = 30.0
+    # use the native asyncio pipeline instead of running the sync one in the threadpool
+    RAG_ASYNC_ENABLED: bool = True
+    # maximum number of hints computed concurrently by the async pipeline
+    RAG_MAX_CONCURRENT_HINTS: int = 64
+    # category pre-filter: L2 searches the main index restricted to the category's rows
+    RAG_CATEGORY_FILTER_ENABLED: bool = True
+    # batch hint API: queries per processing chunk, concurrent embedding/rerank requests
+    RAG_BATCH_CHUNK_SIZE: int = 256
+    RAG_BATCH_CONCURRENCY: int = 8
+    RAG_BATCH_MAX_QUERIES: int = 10_000
+    # batches larger than this are streamed back as NDJSON
+    RAG_BATCH_STREAM_THRESHOLD: int = 100
+    # query embedding cache (in-process LRU in front of Redis)
+    RAG_EMBEDDING_CACHE_ENABLED: bool = True
+    RAG_EMBEDDING_CACHE_REDIS_ENABLED: bool = True
+    RAG_EMBEDDING_CACHE_MAX_ENTRIES: int = 10_000
+    RAG_EMBEDDING_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    RAG_EMBEDDING_CACHE_TTL_SECONDS: int = 60 * 60 * 24
+    # micro-batching of concurrent query embeddings (async pipeline)
+    RAG_EMBEDDING_BATCH_ENABLED: bool = True
+    RAG_EMBEDDING_BATCH_MAX_SIZE: int = 32
+    RAG_EMBEDDING_BATCH_MAX_WAIT_MS: float = 5.0
+    # final hints shared by all workers in Redis, keyed by index version and normalized query;
+    # concurrent identical queries wait up to RAG_HINT_CACHE_WAIT_MS for one computation
+    RAG_HINT_CACHE_ENABLED: bool = True
+    RAG_HINT_CACHE_TTL_SECONDS: int = 60 * 60 * 6
+    RAG_HINT_CACHE_LOCK_TIMEOUT_SECONDS: float = 10.0
+    RAG_HINT_CACHE_WAIT_MS: int = 5000
+    # semantic cache of L3 rerank decisions
+    RAG_RERANK_CACHE_ENABLED: bool = True
+    RAG_RERANK_CACHE_SIMILARITY_THRESHOLD: float = 0.97
+    RAG_RERANK_CACHE_MAX_ENTRIES: int = 5_000
+    RAG_RERANK_CACHE_TTL_SECONDS: int = 60 * 60 * 6
 
 
 class TestSettings(GlobalSettings):
     DB_SCHEMA: str = f"test_{randint(1, 100)}"
+    RAG_PRELOAD_ON_STARTUP: bool = False
+    RAG_INDEX_RELOAD_ENABLED: bool = False
 
 
 class DevelopmentSettings(GlobalSettings):
@@ -2,7 +2,7 @@ import logging
 
 import redis.asyncio as aioredis
 import sentry_sdk
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi_limiter import FastAPILimiter
@@ -11,6 +11,8 @@ from sqladmin import Admin
 
 from src.admin.admin import admin_models
 from src.admin.authentication_backend import authentication_backend
+from src.chat.metrics import render_metrics
+from src.chat.rag import close_rag_clients, rag_registry, start_index_watcher
 from src.config import LOGGING_CONFIG, settings
 from src.database import engine, redis_pool
 from src.routers import routers
@@ -61,16 +63,29 @@ app.add_middleware(
 add_pagination(app)
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
+
 @app.on_event("startup")
 async def startup():
     logger.info("Application is started")
     redis = aioredis.Redis(connection_pool=redis_pool)
     await FastAPILimiter.init(redis)
+    if settings.RAG_PRELOAD_ON_STARTUP:
+        # load RAG components in the background, hints answer "warming up" until ready
+        rag_registry.start_background_load()
+    if settings.RAG_INDEX_RELOAD_ENABLED:
+        # pick up newly published index bundles without restarting the worker
+        start_index_watcher()
 
 
 # Error displayed on shutdown (will be fixed in later versions): https://github.com/python/cpython/issues/109538
 @app.on_event("shutdown")
 async def shutdown_event():
+    await close_rag_clients()
     logger.info("Application is closed")
 
 
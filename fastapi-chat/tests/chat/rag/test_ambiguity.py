@@ -0,0 +1,71 @@
+import math
+
+import faiss
+import numpy as np
+import pytest
+
+from src.chat.ambiguity import AmbiguityMap, load_ambiguity_map
+
+
+def unit(*angles_deg):
+    """Unit vectors in the plane at the given angles."""
+    return np.array([[math.cos(math.radians(a)), math.sin(math.radians(a))] for a in angles_deg], dtype="float32")
+
+
+def test_neighbor_similarity_skips_same_template_entries():
+    # entries 0 and 1 share a template; the nearest other template to 0 is entry 2 at 40 degrees
+    vectors = unit(0, 5, 40, 120)
+    ambiguity_map = AmbiguityMap.build(vectors, ["Ответ A", " ответ  a", "Ответ B", "Ответ C"], neighbors=1)
+
+    assert ambiguity_map.template_groups[0] == ambiguity_map.template_groups[1]
+    assert ambiguity_map.neighbor_similarity[0] == pytest.approx(math.cos(math.radians(40)), abs=1e-5)
+    assert ambiguity_map.neighbor_similarity[3] == pytest.approx(math.cos(math.radians(80)), abs=1e-5)
+
+
+def test_build_searches_given_ann_index_in_chunks():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(300, 16)).astype("float32")
+    faiss.normalize_L2(vectors)
+    templates = [f"Ответ {n % 50}" for n in range(300)]
+    index = faiss.IndexHNSWFlat(16, 16, faiss.METRIC_INNER_PRODUCT)
+    index.add(vectors)
+    index.hnsw.efSearch = 64
+
+    exact = AmbiguityMap.build(vectors, templates, neighbors=4)
+    approximate = AmbiguityMap.build(vectors, templates, neighbors=4, index=index, chunk_size=64)
+
+    assert np.mean(np.isclose(approximate.neighbor_similarity, exact.neighbor_similarity, atol=1e-5)) > 0.95
+
+
+def test_neighbor_search_is_bounded_by_max_neighbors():
+    # all three nearest entries share the template: the farthest of them bounds the neighbour
+    vectors = unit(0, 5, 10, 60)
+    ambiguity_map = AmbiguityMap.build(vectors, ["A", "A", "A", "B"], neighbors=1, max_neighbors=3)
+
+    assert ambiguity_map.neighbor_similarity[0] == pytest.approx(math.cos(math.radians(10)), abs=1e-5)
+    assert ambiguity_map.neighbor_similarity[3] == pytest.approx(math.cos(math.radians(50)), abs=1e-5)
+
+
+def test_margin_is_share_of_half_angle_to_neighbor():
+    ambiguity_map = AmbiguityMap.build(unit(0, 40), ["A", "B"])
+
+    assert ambiguity_map.margin(0, 1.0) == pytest.approx(1.0, abs=1e-3)
+    assert ambiguity_map.margin(0, math.cos(math.radians(10))) == pytest.approx(0.5, abs=1e-3)
+    assert ambiguity_map.margin(0, math.cos(math.radians(30))) < 0
+
+
+def test_save_load_and_rebuild_from_index(tmp_path):
+    vectors = unit(0, 40, 90)
+    path = str(tmp_path / "ambiguity_map.npz")
+    AmbiguityMap.build(vectors, ["A", "B", "C"]).save(path)
+
+    index = faiss.IndexFlatIP(2)
+    index.add(vectors)
+    loaded = load_ambiguity_map(path, index, ["A", "B", "C"])
+    assert np.allclose(loaded.neighbor_similarity, AmbiguityMap.build(vectors, ["A", "B", "C"]).neighbor_similarity)
+
+    # stale map (index grew): rebuilt from the index vectors
+    index.add(unit(10))
+    rebuilt = load_ambiguity_map(path, index, ["A", "B", "C", "D"])
+    assert len(rebuilt) == 4
+    assert rebuilt.neighbor_similarity[0] == pytest.approx(math.cos(math.radians(10)), abs=1e-5)
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from src.chat.answer_cache import RerankDecision, RerankDecisionCache
+
+
+@pytest.fixture
+def cache() -> RerankDecisionCache:
+    return RerankDecisionCache(threshold=0.97, max_entries=100, ttl_seconds=60)
+
+
+def make_decision(candidate_ids=(1, 2, 3)) -> RerankDecision:
+    return RerankDecision(candidate_ids=candidate_ids, selected_id=2, confidence=0.8, alternatives=[(1, 0.6)])
+
+
+def test_rerank_cache_reuses_decision_for_near_identical_query_with_same_candidates(cache):
+    cache.store(np.array([1.0, 0.0, 0.0]), make_decision(), index_version="v1")
+
+    decision = cache.lookup(np.array([1.0, 0.01, 0.0]), [3, 1, 2], index_version="v1")
+
+    assert decision is not None
+    assert decision.selected_id == 2
+    assert cache.stats()["hits"] == 1
+
+
+def test_rerank_cache_misses_for_different_candidate_set(cache):
+    cache.store(np.array([1.0, 0.0, 0.0]), make_decision(), index_version="v1")
+
+    assert cache.lookup(np.array([1.0, 0.0, 0.0]), [1, 2, 4], index_version="v1") is None
+
+
+def test_rerank_cache_misses_below_similarity_threshold(cache):
+    cache.store(np.array([1.0, 0.0, 0.0]), make_decision(), index_version="v1")
+
+    assert cache.lookup(np.array([1.0, 1.0, 0.0]), [1, 2, 3], index_version="v1") is None
+
+
+def test_rerank_cache_keys_decisions_by_index_version(cache):
+    cache.store(np.array([1.0, 0.0, 0.0]), make_decision(), index_version="v1")
+
+    assert cache.lookup(np.array([1.0, 0.0, 0.0]), [1, 2, 3], index_version="v2") is None
+    # requests still on the old snapshot during a hot swap keep their decisions
+    assert cache.lookup(np.array([1.0, 0.0, 0.0]), [1, 2, 3], index_version="v1") is not None
+
+    cache.store(np.array([1.0, 0.0, 0.0]), make_decision(), index_version="v2")
+    assert cache.lookup(np.array([1.0, 0.0, 0.0]), [1, 2, 3], index_version="v2") is not None
+    assert cache.stats()["entries"] == 2
+
+
+def test_rerank_cache_drops_decisions_of_versions_no_longer_served(cache):
+    cache.store(np.array([1.0, 0.0, 0.0]), make_decision(), index_version="v1")
+    cache.store(np.array([0.0, 1.0, 0.0]), make_decision((4, 5, 6)), index_version="v2")
+
+    assert cache.lookup(np.array([0.0, 1.0, 0.0]), [4, 5, 6], index_version="v3") is None
+
+    assert cache.stats()["entries"] == 1
+    assert cache.index_versions == ["v2", "v3"]
+
+
+def test_rerank_cache_evicts_oldest_decisions():
+    cache = RerankDecisionCache(threshold=0.97, max_entries=1, ttl_seconds=60)
+    cache.store(np.array([1.0, 0.0, 0.0]), make_decision((1, 2, 3)), index_version="v1")
+    cache.store(np.array([0.0, 1.0, 0.0]), make_decision((4, 5, 6)), index_version="v1")
+
+    assert cache.lookup(np.array([1.0, 0.0, 0.0]), [1, 2, 3], index_version="v1") is None
+    assert cache.lookup(np.array([0.0, 1.0, 0.0]), [4, 5, 6], index_version="v1") is not None
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from src.chat.batching import BatchingEmbedder
+
+
+class FakeAsyncEmbedder:
+    model = "bge-m3"
+
+    def __init__(self, fail: bool = False):
+        self.calls: list[list[str]] = []
+        self.fail = fail
+
+    async def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls.append(texts)
+        if self.fail:
+            raise RuntimeError("embedding API is down")
+        return [[float(len(text))] for text in texts]
+
+
+async def test_batching_embedder_sends_concurrent_queries_in_one_request():
+    embedder = FakeAsyncEmbedder()
+    batching = BatchingEmbedder(embedder, max_batch_size=32, max_wait_ms=5)
+
+    vectors = await asyncio.gather(*(batching.embed_query("x" * n) for n in range(1, 11)))
+
+    assert len(embedder.calls) == 1
+    assert vectors == [[float(n)] for n in range(1, 11)]
+
+
+async def test_batching_embedder_flushes_when_batch_is_full():
+    embedder = FakeAsyncEmbedder()
+    batching = BatchingEmbedder(embedder, max_batch_size=4, max_wait_ms=1000)
+
+    await asyncio.wait_for(asyncio.gather(*(batching.embed_query(str(n)) for n in range(8))), timeout=1)
+
+    assert [len(call) for call in embedder.calls] == [4, 4]
+
+
+async def test_batching_embedder_deduplicates_identical_texts():
+    embedder = FakeAsyncEmbedder()
+    batching = BatchingEmbedder(embedder, max_batch_size=32, max_wait_ms=5)
+
+    first, second = await asyncio.gather(batching.embed_query("same"), batching.embed_query("same"))
+
+    assert embedder.calls == [["same"]]
+    assert first == second
+
+
+async def test_batching_embedder_propagates_errors_to_every_caller():
+    batching = BatchingEmbedder(FakeAsyncEmbedder(fail=True), max_batch_size=32, max_wait_ms=5)
+
+    results = await asyncio.gather(batching.embed_query("a"), batching.embed_query("b"), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+async def test_batching_embedder_reports_stats():
+    batching = BatchingEmbedder(FakeAsyncEmbedder(), max_batch_size=32, max_wait_ms=5)
+
+    await asyncio.gather(batching.embed_query("a"), batching.embed_query("b"))
+
+    assert batching.stats() == pytest.approx({"requests": 1, "items": 2, "average_batch_size": 2.0})
@@ -0,0 +1,53 @@
+from src.chat.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+
+DOCUMENTS = [
+    "Как оформить кредитную карту онлайн",
+    "Забыл пароль от мобильного приложения",
+    "Какие есть вклады для пенсионеров",
+    "Как закрыть вклад досрочно",
+]
+
+
+def test_tokenize_folds_case_yo_stopwords_and_word_forms():
+    assert tokenize("Как оформить КРЕДИТНУЮ карту?") == tokenize("оформить кредитной карты")
+    assert tokenize("Ёлка") == tokenize("елка")
+    assert tokenize("и в на") == []
+
+
+def test_bm25_ranks_matching_document_first():
+    index = BM25Index(DOCUMENTS)
+
+    results = index.search("не помню пароль в приложении")
+
+    assert results[0][0] == 1
+    assert all(score > 0 for _, score in results)
+
+
+def test_bm25_prefers_rare_terms_and_limits_top_k():
+    index = BM25Index(DOCUMENTS)
+
+    results = index.search("досрочно закрыть вклады", top_k=1)
+
+    assert results == [(3, results[0][1])]
+
+
+def test_bm25_from_metadata_uses_question_and_keywords():
+    metadata = [
+        {"question": "Перевод по номеру телефона", "keywords": "СБП, перевод"},
+        {"question": "Лимиты по карте", "keywords": "лимит, снятие наличных"},
+    ]
+    index = BM25Index.from_metadata(metadata)
+
+    assert index.search("снятие наличных")[0][0] == 1
+    assert index.search("сбп")[0][0] == 0
+
+
+def test_bm25_returns_nothing_for_unknown_terms():
+    assert BM25Index(DOCUMENTS).search("погода в москве") == []
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [2, 4]], k=60)
+
+    assert [doc_id for doc_id, _ in fused] == [2, 1, 4, 3]
+    assert fused[0][1] == 1 / 62 + 1 / 61
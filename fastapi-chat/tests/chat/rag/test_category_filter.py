@@ -0,0 +1,58 @@
+import faiss
+import numpy as np
+import pytest
+
+from src.chat.bm25 import BM25Index
+from src.chat.category_filter import CategoryPartitions, category_key
+from src.chat.index_factory import IndexSpec, build_index
+
+CATEGORIES = ["Карты", "Вклады", "карты ", "Кредиты", "Вклады", "Карты"] * 20
+
+
+def make_index(spec: IndexSpec = IndexSpec()):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((len(CATEGORIES), 16)).astype("float32")
+    faiss.normalize_L2(vectors)
+    return build_index(vectors, spec), vectors
+
+
+def test_category_key_ignores_case_yo_and_spaces():
+    assert category_key(" Счёт  и  карты ") == category_key("счет и карты")
+    assert category_key(None) == ""
+
+
+def test_filtered_search_returns_only_category_rows():
+    index, vectors = make_index()
+    partitions = CategoryPartitions(CATEGORIES)
+    allowed = set(partitions.allowed("КАРТЫ").tolist())
+
+    distances, rows = partitions.search(index, vectors[:2], 5, "карты")
+
+    assert rows.shape == (2, 5)
+    assert set(rows.ravel().tolist()) <= allowed
+    # the first query vector belongs to the category, so it finds itself
+    assert rows[0][0] == 0
+    assert distances[0][0] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_selector_search_keeps_ivf_nprobe():
+    index, vectors = make_index(IndexSpec(index_type="ivf", nlist=2, nprobe=2))
+    partitions = CategoryPartitions(CATEGORIES)
+
+    _, rows = partitions.search(index, vectors[1:2], 3, "Вклады")
+
+    assert set(rows.ravel().tolist()) <= set(partitions.allowed("Вклады").tolist())
+    assert partitions.stats() == {"categories": 3, "largest": 60}
+
+
+def test_unknown_category():
+    partitions = CategoryPartitions(CATEGORIES)
+
+    assert "Ипотека" not in partitions
+    assert partitions.allowed("Ипотека") is None
+
+
+def test_bm25_search_restricted_to_allowed_ids():
+    index = BM25Index(["открыть вклад", "закрыть вклад", "оформить карту"])
+
+    assert [doc_id for doc_id, _ in index.search("вклад", allowed=np.array([1, 2]))] == [1]
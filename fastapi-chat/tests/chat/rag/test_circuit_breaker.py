@@ -0,0 +1,121 @@
+import asyncio
+
+import httpx
+import pytest
+from openai import APIStatusError, APITimeoutError
+
+from src.chat.circuit_breaker import BudgetTimeout, CircuitBreaker, CircuitOpenError, CircuitState, is_upstream_failure
+
+
+def server_error(status_code: int = 503) -> APIStatusError:
+    request = httpx.Request("POST", "http://scibox.test/v1/embeddings")
+    return APIStatusError("error", response=httpx.Response(status_code, request=request), body=None)
+
+
+def failing():
+    raise server_error()
+
+
+def test_opens_after_consecutive_failures_and_fails_fast():
+    breaker = CircuitBreaker("test-open", failure_threshold=2, recovery_seconds=60)
+
+    for _ in range(2):
+        with pytest.raises(APIStatusError):
+            breaker.call(failing)
+
+    assert breaker.state == CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "not called")
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker("test-reset", failure_threshold=2)
+
+    with pytest.raises(APIStatusError):
+        breaker.call(failing)
+    assert breaker.call(lambda: "ok") == "ok"
+    with pytest.raises(APIStatusError):
+        breaker.call(failing)
+
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_half_open_probe_closes_or_reopens():
+    breaker = CircuitBreaker("test-half-open", failure_threshold=1, recovery_seconds=0)
+    with pytest.raises(APIStatusError):
+        breaker.call(failing)
+    assert breaker.state == CircuitState.HALF_OPEN
+
+    # a failed probe opens the circuit again
+    with pytest.raises(APIStatusError):
+        breaker.call(failing)
+    breaker.recovery_seconds = 60
+    assert breaker.state == CircuitState.OPEN
+
+    breaker.recovery_seconds = 0
+    assert breaker.call(lambda: "probe") == "probe"
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_half_open_allows_limited_probes():
+    breaker = CircuitBreaker("test-probes", failure_threshold=1, recovery_seconds=0, half_open_max_calls=1)
+    breaker.record_failure()
+
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.release()
+    assert breaker.allow_request()
+
+
+def test_client_errors_do_not_trip_the_circuit():
+    breaker = CircuitBreaker("test-client-errors", failure_threshold=1)
+
+    with pytest.raises(ValueError):
+        breaker.call(lambda: (_ for _ in ()).throw(ValueError("bad input")))
+    with pytest.raises(APIStatusError):
+        breaker.call(lambda: (_ for _ in ()).throw(server_error(400)))
+
+    assert breaker.state == CircuitState.CLOSED
+    assert is_upstream_failure(server_error(429))
+    assert is_upstream_failure(httpx.ConnectError("refused"))
+
+
+async def test_async_calls_and_cancellation_release_probe():
+    breaker = CircuitBreaker("test-async", failure_threshold=1, recovery_seconds=0)
+    breaker.record_failure()
+
+    task = asyncio.ensure_future(breaker.acall(asyncio.sleep, 1))
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert await breaker.acall(asyncio.sleep, 0, result="ok") == "ok"
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_budget_timeouts_do_not_trip_the_circuit():
+    breaker = CircuitBreaker("test-budget", failure_threshold=2, recovery_seconds=0)
+    request = httpx.Request("POST", "http://scibox.test/v1/chat/completions")
+
+    def budget_spent():
+        try:
+            raise APITimeoutError(request)
+        except APITimeoutError as e:
+            raise BudgetTimeout("budget spent") from e
+
+    for _ in range(5):
+        with pytest.raises(BudgetTimeout):
+            breaker.call(budget_spent)
+
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.stats()["consecutive_failures"] == 0
+    assert is_upstream_failure(APITimeoutError(request))
+
+    # a half-open probe stopped by its budget is given back for the next call
+    breaker.record_failure()
+    breaker.record_failure()
+    with pytest.raises(BudgetTimeout):
+        breaker.call(budget_spent)
+    assert breaker.call(lambda: "probe") == "probe"
+    assert breaker.state == CircuitState.CLOSED
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from src.chat.deadline import LatencyTracker, hedged
+
+
+def test_latency_tracker_percentile_over_window():
+    tracker = LatencyTracker(window=3)
+    assert tracker.percentile(95) is None
+
+    for latency_ms in (1000, 10, 20, 30):
+        tracker.observe(latency_ms)
+
+    assert len(tracker) == 3
+    assert tracker.percentile(50) == 20
+
+
+async def test_hedged_returns_fast_call_without_duplicate():
+    calls = []
+
+    async def call():
+        calls.append(1)
+        return "ok"
+
+    assert await hedged(call, hedge_delay_s=0.05) == "ok"
+    assert len(calls) == 1
+
+
+async def test_hedged_duplicate_wins_over_slow_request():
+    delays = [1.0, 0.01]
+    hedges = []
+    cancelled = []
+
+    async def call():
+        delay = delays.pop(0)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(delay)
+            raise
+        return delay
+
+    assert await hedged(call, hedge_delay_s=0.02, on_hedge=lambda: hedges.append(1)) == 0.01
+    await asyncio.sleep(0)
+    assert hedges == [1]
+    assert cancelled == [1.0]
+
+
+async def test_hedged_failure_does_not_win_while_other_request_runs():
+    outcomes = [0.05, "fail"]
+
+    async def call():
+        outcome = outcomes.pop(0)
+        if outcome == "fail":
+            raise RuntimeError("boom")
+        await asyncio.sleep(outcome)
+        return "primary"
+
+    assert await hedged(call, hedge_delay_s=0.01) == "primary"
+
+
+async def test_deadline_cancels_hedged_requests():
+    cancelled = []
+
+    async def call():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(hedged(call, hedge_delay_s=0.01), 0.05)
+    assert cancelled == [1, 1]
@@ -0,0 +1,63 @@
+import time
+
+import numpy as np
+
+from src.chat.embedding_cache import QueryEmbeddingCache
+
+
+def test_embedding_cache_returns_stored_vector():
+    cache = QueryEmbeddingCache(model="bge-m3", max_entries=100, max_bytes=1024 * 1024, ttl_seconds=60)
+    cache.set("как сбросить пароль", np.arange(4, dtype=np.float32))
+
+    cached = cache.get("как сбросить пароль")
+
+    assert cached is not None
+    assert cached.dtype == np.float32
+    assert np.array_equal(cached, np.arange(4, dtype=np.float32))
+    assert cache.stats()["local_hits"] == 1
+
+
+def test_embedding_cache_counts_misses():
+    cache = QueryEmbeddingCache(model="bge-m3", max_entries=100, max_bytes=1024 * 1024, ttl_seconds=60)
+
+    assert cache.get("неизвестный вопрос") is None
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hit_rate"] == 0.0
+
+
+def test_embedding_cache_evicts_least_recently_used_entry_by_count():
+    cache = QueryEmbeddingCache(model="bge-m3", max_entries=2, max_bytes=1024 * 1024, ttl_seconds=60)
+    cache.set("a", np.zeros(4, dtype=np.float32))
+    cache.set("b", np.zeros(4, dtype=np.float32))
+    cache.get("a")
+    cache.set("c", np.zeros(4, dtype=np.float32))
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_embedding_cache_evicts_by_bytes():
+    cache = QueryEmbeddingCache(model="bge-m3", max_entries=100, max_bytes=32, ttl_seconds=60)
+    cache.set("a", np.zeros(4, dtype=np.float32))
+    cache.set("b", np.zeros(4, dtype=np.float32))
+    cache.set("c", np.zeros(4, dtype=np.float32))
+
+    assert cache.stats()["bytes"] <= 32
+    assert cache.get("a") is None
+
+
+def test_embedding_cache_expires_entries_after_ttl():
+    cache = QueryEmbeddingCache(model="bge-m3", max_entries=100, max_bytes=1024 * 1024, ttl_seconds=0.01)
+    cache.set("a", np.zeros(4, dtype=np.float32))
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_embedding_cache_keys_are_namespaced_by_model():
+    cache = QueryEmbeddingCache(model="bge-m3", max_entries=100, max_bytes=1024 * 1024, ttl_seconds=60)
+    other = QueryEmbeddingCache(model="other", max_entries=100, max_bytes=1024 * 1024, ttl_seconds=60)
+
+    assert cache.redis_key("a") != other.redis_key("a")
@@ -0,0 +1,69 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from src.chat.embedding_pipeline import embed_texts_concurrently
+
+TEXTS = [f"вопрос {i}" for i in range(10)]
+
+
+class FakeEmbedder:
+    def __init__(self, fail_batches=(), failures_per_batch=1):
+        self.calls = []
+        self.fail_batches = set(fail_batches)
+        self.failures_per_batch = failures_per_batch
+        self._failures = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, batch):
+        with self._lock:
+            self.calls.append(list(batch))
+            key = batch[0]
+            if key in self.fail_batches and self._failures.get(key, 0) < self.failures_per_batch:
+                self._failures[key] = self._failures.get(key, 0) + 1
+                raise ConnectionError("flaky API")
+        return [[float(text.split()[1]), 1.0] for text in batch]
+
+
+def embed(embedder, **kwargs):
+    params = {"model": "bge-m3", "batch_size": 3, "concurrency": 4, "max_retries": 2, "backoff_seconds": 0}
+    params.update(kwargs)
+    return embed_texts_concurrently(embedder, TEXTS, **params)
+
+
+def test_concurrent_embedding_keeps_text_order():
+    embedder = FakeEmbedder()
+
+    vectors = embed(embedder)
+
+    assert vectors.dtype == np.float32
+    assert vectors[:, 0].tolist() == list(range(10))
+    assert len(embedder.calls) == 4
+
+
+def test_failed_batch_is_retried():
+    embedder = FakeEmbedder(fail_batches={"вопрос 3"})
+
+    vectors = embed(embedder)
+
+    assert vectors[:, 0].tolist() == list(range(10))
+    assert len(embedder.calls) == 5
+
+
+def test_interrupted_build_resumes_from_checkpoint(tmp_path):
+    failing = FakeEmbedder(fail_batches={"вопрос 9"}, failures_per_batch=10)
+    with pytest.raises(ConnectionError):
+        embed(failing, checkpoint_root=str(tmp_path), max_retries=1)
+
+    resumed = FakeEmbedder()
+    vectors = embed(resumed, checkpoint_root=str(tmp_path))
+
+    assert vectors[:, 0].tolist() == list(range(10))
+    assert resumed.calls == [["вопрос 9"]]
+    assert os.listdir(tmp_path) == []
+
+
+def test_empty_input():
+    assert embed_texts_concurrently(FakeEmbedder(), [], model="bge-m3").shape == (0, 0)
@@ -0,0 +1,44 @@
+import numpy as np
+
+from src.chat.embedding_store import EmbeddingStore, content_id
+
+
+def test_content_id_is_stable_and_non_negative():
+    assert content_id("Как открыть вклад") == content_id("Как открыть вклад")
+    assert content_id("Как открыть вклад") != content_id("Как закрыть вклад")
+    assert content_id("Как открыть вклад") >= 0
+
+
+def test_embedding_store_add_get_remove():
+    store = EmbeddingStore("unused.bin", model="bge-m3")
+    ids = [content_id("a"), content_id("b")]
+    store.add(ids, np.array([[3.0, 4.0], [0.0, 2.0]]))
+
+    vectors = store.get([ids[1], ids[0], ids[1]])
+
+    np.testing.assert_allclose(vectors, [[0.0, 1.0], [0.6, 0.8], [0.0, 1.0]], atol=1e-6)
+    assert store.remove([ids[0], content_id("missing")]) == 1
+    assert ids[0] not in store
+    assert len(store) == 1
+
+
+def test_embedding_store_round_trip(tmp_path):
+    path = str(tmp_path / "embedding_store.bin")
+    store = EmbeddingStore(path, model="bge-m3")
+    store.add([content_id("a")], np.array([[1.0, 0.0]]))
+    store.save()
+
+    reopened = EmbeddingStore.open(path, model="bge-m3")
+
+    assert content_id("a") in reopened
+    np.testing.assert_allclose(reopened.get([content_id("a")]), [[1.0, 0.0]])
+
+
+def test_embedding_store_from_other_model_starts_empty(tmp_path):
+    path = str(tmp_path / "embedding_store.bin")
+    store = EmbeddingStore(path, model="bge-m3")
+    store.add([content_id("a")], np.array([[1.0, 0.0]]))
+    store.save()
+
+    assert len(EmbeddingStore.open(path, model="other-model")) == 0
+    assert len(EmbeddingStore.open(str(tmp_path / "missing.bin"), model="bge-m3")) == 0
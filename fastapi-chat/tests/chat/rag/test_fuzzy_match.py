@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from src.chat.fuzzy_match import FuzzyMatcher, char_ngrams, load_fuzzy_matcher
+from src.chat.metadata_store import MetadataStore, write_metadata_store
+
+RECORDS = [
+    {"index": 0, "question": "Забыл пароль от мобильного приложения", "template": "Восстановите пароль"},
+    {"index": 1, "question": "Как закрыть кредитную карту досрочно?", "template": "Закрытие карты"},
+    {"index": 2, "question": "Как открыть вклад", "template": "Открытие вклада"},
+]
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split()).rstrip("?")
+
+
+@pytest.fixture
+def metadata(tmp_path):
+    path = str(tmp_path / "metadata_store")
+    write_metadata_store(path, RECORDS)
+    return MetadataStore(path)
+
+
+@pytest.fixture
+def matcher(metadata):
+    return FuzzyMatcher.build(metadata, np.arange(len(RECORDS)), normalize)
+
+
+def test_char_ngrams_are_padded():
+    assert char_ngrams("ab") == frozenset({" ab", "ab "})
+
+
+def test_fuzzy_matcher_finds_question_with_typo(matcher):
+    result = matcher.match("забыл пороль от мобильного приложения")
+
+    assert result is not None
+    item, similarity = result
+    assert item["template"] == "Восстановите пароль"
+    assert item["normalized_question"] == "забыл пароль от мобильного приложения"
+    assert 0.85 <= similarity < 1.0
+
+
+def test_fuzzy_matcher_rejects_different_question(matcher):
+    assert matcher.match("как закрыть вклад") is None
+    assert matcher.match("какая завтра погода") is None
+    assert matcher.match("") is None
+
+
+def test_fuzzy_confidence_stays_below_exact_match():
+    assert FuzzyMatcher.confidence(1.0) == 99
+    assert FuzzyMatcher.confidence(0.873) == 87
+
+
+def test_fuzzy_matcher_tracks_hit_rate(matcher):
+    matcher.match("как закрыть кредитную карту досрочна")
+    matcher.match("курс доллара")
+
+    stats = matcher.stats()
+
+    assert stats["entries"] == 3
+    assert stats["lookups"] == 2
+    assert stats["hits"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_saved_tables_are_loaded_or_rebuilt_when_stale(tmp_path, metadata, matcher):
+    path = str(tmp_path / "fuzzy_lsh.npz")
+    matcher.save(path)
+
+    loaded = load_fuzzy_matcher(path, metadata, np.arange(3), normalize)
+    assert np.array_equal(loaded.band_keys, matcher.band_keys)
+    assert loaded.match("как открыть вклад досрочно") is None
+    assert loaded.match("как открыть вкад")[0]["template"] == "Открытие вклада"
+
+    # the L1 table no longer has row 2, or the settings changed: built again from the metadata
+    assert len(load_fuzzy_matcher(path, metadata, np.arange(2), normalize)) == 2
+    assert load_fuzzy_matcher(path, metadata, np.arange(3), normalize, bands=8).bands == 8
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+
+from pydantic import BaseModel
+
+from src.chat.hint_cache import HintCache
+
+
+class FakeHint(BaseModel):
+    response: str
+    confidence: int
+    degraded: bool = False
+
+
+def test_key_depends_on_index_version_query_and_category():
+    key = HintCache.key("v1", "как открыть вклад")
+
+    assert key.startswith("hint:v1:")
+    assert key != HintCache.key("v2", "как открыть вклад")
+    assert key != HintCache.key("v1", "как открыть вклад", "Вклады")
+    assert key == HintCache.key("v1", "как открыть вклад", None)
+
+
+def test_only_confident_non_degraded_hints_are_cacheable():
+    assert HintCache.cacheable(FakeHint(response="a", confidence=80))
+    assert not HintCache.cacheable(FakeHint(response="a", confidence=80, degraded=True))
+    assert not HintCache.cacheable(FakeHint(response="", confidence=0))
+
+
+def test_concurrent_identical_queries_compute_once():
+    cache = HintCache(FakeHint, ttl_seconds=60, lock_timeout_seconds=1, wait_seconds=1)
+    computations = []
+    results = []
+
+    def worker():
+        with cache.coalesce("hint:v1:q") as cached:
+            if cached is not None:
+                results.append(cached)
+                return
+            computations.append(1)
+            time.sleep(0.05)
+            hint = FakeHint(response="ответ", confidence=90)
+            cache.set("hint:v1:q", hint)
+            results.append(hint)
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert computations == [1]
+    assert [hint.response for hint in results] == ["ответ"] * 5
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_follower_computes_itself_when_result_is_not_cacheable():
+    cache = HintCache(FakeHint, ttl_seconds=60, lock_timeout_seconds=1, wait_seconds=1)
+    follower_result = []
+
+    def follower():
+        with cache.coalesce("hint:v1:q") as cached:
+            follower_result.append(cached)
+
+    with cache.coalesce("hint:v1:q") as cached:
+        assert cached is None
+        thread = threading.Thread(target=follower)
+        thread.start()
+        time.sleep(0.02)
+        cache.set("hint:v1:q", FakeHint(response="", confidence=0))
+    thread.join()
+
+    assert follower_result == [None]
+
+
+async def test_async_coalescing_and_follower_timeout():
+    cache = HintCache(FakeHint, ttl_seconds=60, lock_timeout_seconds=1, wait_seconds=0.05)
+    computations = []
+
+    async def request(delay: float):
+        async with cache.acoalesce("hint:v1:q") as cached:
+            if cached is not None:
+                return cached.response
+            computations.append(1)
+            response = f"ответ {len(computations)}"
+            await asyncio.sleep(delay)
+            await cache.aset("hint:v1:q", FakeHint(response=response, confidence=90))
+            return response
+
+    assert await asyncio.gather(request(0.01), request(0.01), request(0.01)) == ["ответ 1"] * 3
+    assert computations == [1]
+
+    # a follower stops waiting after wait_seconds and computes the hint itself
+    results = await asyncio.gather(request(0.2), request(0.01))
+    assert results == ["ответ 2", "ответ 3"]
+    assert cache.stats()["in_flight"] == 0
@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+
+from src.chat.index_bundle import (
+    BundleWatcher,
+    IndexBundle,
+    build_lock,
+    create_staging_bundle,
+    current_bundle,
+    prune_bundles,
+    publish_bundle,
+    read_current_version,
+)
+
+
+def build(data_dir, version: str) -> IndexBundle:
+    staging = create_staging_bundle(str(data_dir))
+    for path in (staging.faiss_index_path, staging.metadata_path):
+        with open(path, "w") as f:
+            f.write(version)
+    return publish_bundle(str(data_dir), staging, version)
+
+
+def test_flat_layout_is_used_until_a_bundle_is_published(tmp_path):
+    bundle = current_bundle(str(tmp_path))
+
+    assert bundle == IndexBundle(str(tmp_path))
+    assert bundle.version is None
+    assert not bundle.exists()
+
+
+def test_publish_moves_staging_bundle_and_switches_current(tmp_path):
+    first = build(tmp_path, "v1")
+    second = build(tmp_path, "v2")
+
+    assert read_current_version(str(tmp_path)) == "v2"
+    assert current_bundle(str(tmp_path)) == second
+    # the previous bundle is left untouched for workers still serving it
+    assert first.exists()
+    assert not [name for name in os.listdir(tmp_path / "bundles") if name.startswith(".staging")]
+
+
+def test_republishing_an_existing_version_drops_the_staging_copy(tmp_path):
+    build(tmp_path, "v1")
+    build(tmp_path, "v2")
+    build(tmp_path, "v1")
+
+    assert read_current_version(str(tmp_path)) == "v1"
+    assert sorted(os.listdir(tmp_path / "bundles")) == ["v1", "v2"]
+
+
+def test_build_lock_lets_one_process_build(tmp_path):
+    builds = []
+
+    def start_worker():
+        with build_lock(str(tmp_path)):
+            if not current_bundle(str(tmp_path)).exists():
+                time.sleep(0.05)
+                builds.append(build(tmp_path, "v1"))
+
+    threads = [threading.Thread(target=start_worker) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+
+
+def test_prune_keeps_recent_and_current_bundles(tmp_path):
+    for version in ("v1", "v2", "v3"):
+        build(tmp_path, version)
+        os.utime(tmp_path / "bundles" / version, (1000 + int(version[1]), 1000 + int(version[1])))
+
+    assert prune_bundles(str(tmp_path), keep=2) == ["v1"]
+    assert sorted(os.listdir(tmp_path / "bundles")) == ["v2", "v3"]
+
+
+async def test_watcher_reloads_once_per_new_version(tmp_path):
+    served = {"version": None}
+    reloads = []
+
+    async def reload():
+        reloads.append(read_current_version(str(tmp_path)))
+        served["version"] = reloads[-1]
+        return True
+
+    watcher = BundleWatcher(str(tmp_path), lambda: served["version"], reload, poll_seconds=0.01)
+    build(tmp_path, "v1")
+    # nothing is served yet: the first load picks up the current bundle by itself
+    assert not await watcher.check()
+
+    served["version"] = "v1"
+    build(tmp_path, "v2")
+    assert await watcher.check()
+    assert not await watcher.check()
+    assert reloads == ["v2"]
+
+
+async def test_watcher_does_not_retry_a_version_that_failed_to_load(tmp_path):
+    attempts = []
+
+    async def reload():
+        attempts.append(1)
+        return False
+
+    watcher = BundleWatcher(str(tmp_path), lambda: "v1", reload)
+    build(tmp_path, "v2")
+
+    assert not await watcher.check()
+    assert not await watcher.check()
+    assert attempts == [1]
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from src.chat.index_factory import IndexSpec, build_index, load_index_spec, save_index_spec
+
+
+def make_embeddings(n: int = 400, dimension: int = 16) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((n, dimension)).astype("float32")
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def test_parse_compact_spec():
+    spec = IndexSpec.parse("ivf:nlist=256,nprobe=16")
+
+    assert spec.index_type == "ivf"
+    assert spec.nlist == 256
+    assert spec.nprobe == 16
+
+
+def test_parse_rejects_unknown_type_and_parameter():
+    with pytest.raises(ValueError):
+        IndexSpec.parse("annoy")
+    with pytest.raises(ValueError):
+        IndexSpec.parse("hnsw:depth=3")
+
+
+@pytest.mark.parametrize("config", ["flat", "ivf:nlist=4,nprobe=4", "hnsw", "sq8", "ivf_sq8:nlist=4,nprobe=4"])
+def test_built_index_finds_stored_vector(config):
+    embeddings = make_embeddings()
+    index = build_index(embeddings.copy(), IndexSpec.parse(config))
+
+    _, ids = index.search(embeddings[:1], 1)
+
+    assert index.ntotal == len(embeddings)
+    assert ids[0][0] == 0
+
+
+def test_ivf_nlist_is_reduced_for_small_corpora():
+    spec = IndexSpec.parse("ivf:nlist=1000")
+
+    build_index(make_embeddings(n=200), spec)
+
+    assert spec.nlist == 200 // 39
+
+
+def test_index_spec_round_trip(tmp_path):
+    spec = IndexSpec.parse("hnsw:hnsw_m=16,ef_search=32")
+    index = build_index(make_embeddings(), spec)
+    path = tmp_path / "index_config.json"
+
+    save_index_spec(str(path), spec, index)
+
+    assert load_index_spec(str(path)) == spec
+    assert load_index_spec(str(tmp_path / "missing.json")) is None
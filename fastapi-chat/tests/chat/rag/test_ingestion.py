@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.chat.ingestion import extract_records, iter_knowledge_base, resolve_columns
+
+ROWS = [
+    {
+        "Вопрос клиента": "Как открыть вклад?",
+        "Шаблонный ответ": "Откройте вклад в приложении.",
+        "Категория": "Вклады",
+        "Приоритет": 1,
+    },
+    {
+        "Вопрос клиента": None,
+        "Шаблонный ответ": "Без вопроса",
+        "Категория": "Вклады",
+        "Приоритет": 2,
+    },
+    {
+        "Вопрос клиента": "  Где выписка?  ",
+        "Шаблонный ответ": "nan",
+        "Категория": "Счета",
+        "Приоритет": 3,
+    },
+    {
+        "Вопрос клиента": "Как закрыть карту?",
+        "Шаблонный ответ": "Закройте карту в отделении.",
+        "Категория": None,
+        "Приоритет": 4,
+    },
+]
+
+
+def test_resolve_columns_keeps_present_candidates_in_priority_order():
+    mapping = resolve_columns(["question", "Пример вопроса", "Ответ", "Приоритет"])
+
+    assert mapping["question"] == ["Пример вопроса", "question"]
+    assert mapping["template"] == ["Ответ"]
+    assert mapping["keywords"] == []
+
+
+def test_resolve_columns_requires_question_and_template():
+    with pytest.raises(ValueError, match="template"):
+        resolve_columns(["Вопрос клиента", "Категория"])
+
+
+def test_extract_records_falls_back_to_lower_priority_columns_per_row():
+    frame = pd.DataFrame(
+        {
+            "Пример вопроса": ["Основной вопрос", np.nan, "nan"],
+            "question": ["запасной", "Запасной вопрос", "  "],
+            "template": ["ответ 1", "ответ 2", "ответ 3"],
+        }
+    )
+
+    records, skipped = extract_records(frame, resolve_columns(frame.columns), start_row=10)
+
+    assert records["question"].tolist() == ["Основной вопрос", "Запасной вопрос"]
+    assert records["index"].tolist() == [10, 11]
+    assert records["category"].tolist() == ["", ""]
+    assert skipped == 1
+
+
+def test_csv_is_streamed_in_chunks_with_dataset_row_numbers(tmp_path):
+    path = tmp_path / "kb.csv"
+    pd.DataFrame(ROWS).to_csv(path, index=False)
+
+    chunks = list(iter_knowledge_base(str(path), chunk_rows=2))
+
+    assert [len(chunk) for chunk in chunks] == [1, 1]
+    records = pd.concat(chunks)
+    assert records["index"].tolist() == [0, 3]
+    assert records["question"].tolist() == ["Как открыть вклад?", "Как закрыть карту?"]
+    assert records["category"].tolist() == ["Вклады", ""]
+
+
+def test_excel_and_csv_give_the_same_records(tmp_path):
+    pd.DataFrame(ROWS).to_excel(tmp_path / "kb.xlsx", index=False)
+    pd.DataFrame(ROWS).to_csv(tmp_path / "kb.csv", index=False)
+
+    excel = pd.concat(iter_knowledge_base(str(tmp_path / "kb.xlsx"), chunk_rows=3))
+    csv = pd.concat(iter_knowledge_base(str(tmp_path / "kb.csv"), chunk_rows=3))
+
+    pd.testing.assert_frame_equal(excel.reset_index(drop=True), csv.reset_index(drop=True))
+
+
+def test_parquet_is_streamed_in_batches(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "kb.parquet"
+    pd.DataFrame(ROWS).to_parquet(path, index=False)
+
+    records = pd.concat(iter_knowledge_base(str(path), chunk_rows=2))
+
+    assert records["index"].tolist() == [0, 3]
+
+
+def test_unsupported_format_is_rejected(tmp_path):
+    path = tmp_path / "kb.json"
+    path.write_text("[]")
+
+    with pytest.raises(ValueError, match="Unsupported dataset format"):
+        list(iter_knowledge_base(str(path)))
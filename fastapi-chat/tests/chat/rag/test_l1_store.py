@@ -0,0 +1,110 @@
+import numpy as np
+
+from src.chat.l1_store import EMPTY_KEY, L1Store, build_table, text_key
+from src.chat.metadata_store import MetadataStore, write_metadata_store
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split()).rstrip("?")
+
+
+RECORDS = [
+    {
+        "index": 0,
+        "question": "Как сбросить пароль?",
+        "template": "Старый ответ",
+        "category": "Доступ",
+        "subcategory": "",
+        "keywords": "",
+    },
+    {
+        "index": 1,
+        "question": "Где посмотреть выписку?",
+        "template": "",
+        "category": "Счета",
+        "subcategory": "",
+        "keywords": "",
+    },
+    {
+        "index": 2,
+        "question": "Как открыть вклад?",
+        "template": "Откройте вклад в приложении",
+        "category": "Вклады",
+        "subcategory": "Открытие",
+        "keywords": "вклад",
+    },
+    {
+        "index": 3,
+        "question": "как  сбросить ПАРОЛЬ",
+        "template": "Перейдите в раздел «Безопасность»",
+        "category": "Доступ",
+        "subcategory": "Пароль",
+        "keywords": "",
+    },
+]
+
+
+def make_store(tmp_path) -> L1Store:
+    path = str(tmp_path / "metadata_store")
+    write_metadata_store(path, RECORDS)
+    return L1Store.build(MetadataStore(path), normalize)
+
+
+def test_build_table_finds_every_key_by_linear_probing():
+    rng = np.random.default_rng(0)
+    keys = np.unique(rng.integers(1, 1 << 63, 5000, dtype=np.uint64))
+    # force collisions on the home slot as well
+    keys = np.concatenate([keys, np.arange(1, 50, dtype=np.uint64) << np.uint64(20)])
+    rows = np.arange(len(keys), dtype=np.int32)
+
+    table = build_table(keys, rows)
+
+    assert len(table) == 16384
+    assert np.count_nonzero(table["key"] != EMPTY_KEY) == len(keys)
+    mask = len(table) - 1
+    for key, row in zip(keys.tolist(), rows.tolist()):
+        slot = key & mask
+        while int(table["key"][slot]) != key:
+            assert int(table["key"][slot]) != EMPTY_KEY
+            slot = (slot + 1) & mask
+        assert int(table["row"][slot]) == row
+
+
+def test_lookup_reads_entry_from_metadata(tmp_path):
+    store = make_store(tmp_path)
+
+    entry = store.get("как открыть вклад")
+
+    assert entry["template"] == "Откройте вклад в приложении"
+    assert entry["category"] == "Вклады"
+    assert entry["normalized_question"] == "как открыть вклад"
+    assert store.get("как закрыть вклад") is None
+
+
+def test_last_repeated_question_wins_and_rows_without_template_are_skipped(tmp_path):
+    store = make_store(tmp_path)
+
+    assert len(store) == 2
+    assert store.get("как сбросить пароль")["template"] == "Перейдите в раздел «Безопасность»"
+    assert store.get("где посмотреть выписку") is None
+    assert [entry["index"] for entry in store.entries()] == [2, 3]
+
+
+def test_hash_collision_is_a_miss(tmp_path):
+    store = make_store(tmp_path)
+    # a key pointing at a row with another question
+    table = build_table(np.array([text_key("курс доллара")], dtype=np.uint64), np.array([2], dtype=np.int32))
+
+    assert L1Store(table, store.metadata, normalize).get("курс доллара") is None
+
+
+def test_saved_store_is_memory_mapped(tmp_path):
+    store = make_store(tmp_path)
+    path = str(tmp_path / "l1_index.npy")
+    store.save(path)
+
+    loaded = L1Store.load(path, store.metadata, normalize)
+
+    assert isinstance(loaded.table, np.memmap)
+    assert len(loaded) == 2
+    assert loaded.get("как сбросить пароль")["subcategory"] == "Пароль"
@@ -0,0 +1,68 @@
+import json
+
+from src.chat.metadata_store import MetadataJsonWriter, MetadataStore, write_metadata_store
+
+RECORDS = [
+    {
+        "index": 3,
+        "question": "Как сбросить пароль?",
+        "template": "Перейдите в раздел «Безопасность».",
+        "category": "Доступ",
+        "subcategory": "Пароль",
+        "keywords": "пароль, сброс",
+    },
+    {
+        "index": 7,
+        "question": "Где посмотреть выписку?",
+        "template": "",
+        "category": "Счета",
+        "subcategory": "Выписки",
+        "keywords": "",
+    },
+]
+
+
+def test_metadata_store_round_trips_records(tmp_path):
+    path = str(tmp_path / "metadata_store")
+    write_metadata_store(path, RECORDS)
+
+    store = MetadataStore(path)
+
+    assert len(store) == 2
+    assert store[0] == RECORDS[0]
+    assert store[1] == RECORDS[1]
+    assert list(store) == RECORDS
+
+
+def test_metadata_store_reads_single_field_lazily(tmp_path):
+    path = str(tmp_path / "metadata_store")
+    write_metadata_store(path, RECORDS)
+
+    store = MetadataStore(path)
+
+    assert store.get_value(0, "template") == "Перейдите в раздел «Безопасность»."
+    assert store[-1]["index"] == 7
+
+
+def test_metadata_store_is_replaced_on_rewrite(tmp_path):
+    path = str(tmp_path / "metadata_store")
+    write_metadata_store(path, RECORDS)
+    write_metadata_store(path, RECORDS[:1])
+
+    assert len(MetadataStore(path)) == 1
+
+
+def test_metadata_store_supports_empty_knowledge_base(tmp_path):
+    path = str(tmp_path / "metadata_store")
+    write_metadata_store(path, [])
+
+    assert len(MetadataStore(path)) == 0
+
+
+def test_streamed_metadata_json_matches_json_dump(tmp_path):
+    path = tmp_path / "metadata.json"
+    with MetadataJsonWriter(str(path)) as writer:
+        for record in RECORDS:
+            writer.append(record)
+
+    assert path.read_text(encoding="utf-8") == json.dumps(RECORDS, ensure_ascii=False, indent=2)
@@ -0,0 +1,26 @@
+from prometheus_client import REGISTRY
+
+from src.chat.metrics import observe_hint, render_metrics
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_observe_hint_records_route_and_stage_timings():
+    before = sample("rag_hints_total", route="L2 test")
+    before_stage = sample("rag_hint_stage_duration_seconds_count", stage="embed", route="L2 test")
+
+    observe_hint("L2 test", 120.0, {"embed": 80.0, "search": 1.5})
+
+    assert sample("rag_hints_total", route="L2 test") == before + 1
+    assert sample("rag_hint_stage_duration_seconds_count", stage="embed", route="L2 test") == before_stage + 1
+    assert sample("rag_hint_stage_duration_seconds_sum", stage="search", route="L2 test") >= 0.0015
+
+
+def test_render_metrics_exposes_hint_metrics():
+    content, content_type = render_metrics()
+
+    assert content_type.startswith("text/plain")
+    assert b"rag_hint_duration_seconds" in content
+    assert b"rag_rerank_parse_errors_total" in content
@@ -0,0 +1,84 @@
+import json
+
+import httpx
+import numpy as np
+import pytest
+from openai import AsyncOpenAI, OpenAI
+
+from src.chat.offline_scibox import OFFLINE_BASE_URL, OfflineScibox, hashing_embedding
+
+RERANK_PROMPT = """Вопрос клиента:
+Забыл пароль от приложения
+
+Кандидаты из базы знаний:
+
+Кандидат 1:
+Вопрос из базы: Как открыть вклад
+Ответ: ...
+
+Кандидат 2:
+Вопрос из базы: Забыл пароль от мобильного приложения
+Ответ: ..."""
+
+
+def make_client(scibox: OfflineScibox) -> OpenAI:
+    return OpenAI(
+        api_key="test", base_url=OFFLINE_BASE_URL, max_retries=0, http_client=httpx.Client(transport=scibox.transport())
+    )
+
+
+def test_hashing_embedding_is_deterministic_and_similarity_aware():
+    vector = hashing_embedding("Как открыть вклад", dimension=256)
+
+    assert np.allclose(vector, hashing_embedding("как  открыть вклад", dimension=256))
+    assert abs(np.linalg.norm(vector) - 1.0) < 1e-5
+    typo = float(np.dot(vector, hashing_embedding("Как открыть вклд", dimension=256)))
+    unrelated = float(np.dot(vector, hashing_embedding("Курс доллара на сегодня", dimension=256)))
+    assert typo > 0.6 > unrelated
+
+
+def test_offline_embeddings_through_openai_client():
+    scibox = OfflineScibox(dimension=64)
+
+    response = make_client(scibox).embeddings.create(model="bge-m3", input=["первый", "второй"])
+
+    assert [len(item.embedding) for item in response.data] == [64, 64]
+    assert scibox.stats()["requests"] == {"embeddings": 1}
+
+
+def test_offline_rerank_ranks_matching_candidate_first():
+    response = make_client(OfflineScibox()).chat.completions.create(
+        model="llm", messages=[{"role": "user", "content": RERANK_PROMPT}]
+    )
+
+    rankings = json.loads(response.choices[0].message.content)["rankings"]
+    assert [ranking["candidate"] for ranking in rankings] == [2, 1]
+    assert rankings[0]["confidence"] > rankings[1]["confidence"]
+
+
+def test_offline_failure_injection():
+    scibox = OfflineScibox(failure_rate=1.0)
+
+    response = httpx.Client(transport=scibox.transport()).post(f"{OFFLINE_BASE_URL}/embeddings", json={"input": "x"})
+
+    assert response.status_code == 503
+    assert scibox.stats()["failures"] == {"embeddings": 1}
+
+
+async def test_offline_async_transport():
+    scibox = OfflineScibox(dimension=32, embedding_latency_ms=1)
+    client = AsyncOpenAI(
+        api_key="test", base_url=OFFLINE_BASE_URL, http_client=httpx.AsyncClient(transport=scibox.async_transport())
+    )
+
+    response = await client.embeddings.create(model="bge-m3", input="вопрос")
+
+    assert len(response.data[0].embedding) == 32
+    await client.close()
+
+
+def test_offline_transport_honours_read_timeout():
+    scibox = OfflineScibox(chat_latency_ms=500)
+
+    with pytest.raises(httpx.ReadTimeout):
+        httpx.Client(transport=scibox.transport(), timeout=0.01).post(f"{OFFLINE_BASE_URL}/chat/completions", json={})
@@ -0,0 +1,314 @@
+import asyncio
+import json
+
+import httpx
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from openai import APITimeoutError
+
+from src.chat import rag
+from src.chat.circuit_breaker import CircuitBreaker, CircuitState
+from src.chat.deadline import RerankDeadlineExceeded
+from src.chat.hint_cache import HintCache
+from src.chat.registry import ComponentRegistry
+from src.chat.router import chat_router
+from src.config import settings
+
+KB = [
+    ("Как сбросить пароль от мобильного приложения?", "Нажмите «Забыли пароль» на экране входа.", "Доступ", "Пароль"),
+    ("Как открыть вклад онлайн?", "Откройте вклад в разделе «Вклады» приложения.", "Вклады", "Открытие"),
+    ("Как закрыть кредитную карту?", "Погасите задолженность и подайте заявление в отделении.", "Карты", "Закрытие"),
+    ("Какой лимит на снятие наличных в банкомате?", "Лимит составляет 5000 рублей в сутки.", "Карты", "Лимиты"),
+    ("Как заказать выписку по счету?", "Выписку можно заказать в интернет-банке.", "Счета", "Выписки"),
+    ("Как подключить уведомления об операциях?", "Подключите SMS-уведомления в настройках.", "Счета", "Уведомления"),
+    ("Как оформить ипотеку на квартиру?", "Подайте заявку на ипотеку на сайте банка.", "Кредиты", "Ипотека"),
+    ("Как перевести деньги на карту другого банка?", "Используйте перевод по номеру карты.", "Переводы", "Карты"),
+]
+
+# routes of these queries over KB with the offline Scibox
+L1_QUERY = "Как сбросить пароль от мобильного приложения?"
+L2_QUERY = "пароль от мобильного приложения как сбросить"
+L3_QUERY = "ипотека на квартиру"
+UNKNOWN_QUERY = "какая погода завтра"
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    """Loaded components over KB, with Scibox served offline and no Redis."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    pd.DataFrame(KB, columns=["Пример вопроса", "Шаблонный ответ", "Основная категория", "Подкатегория"]).to_excel(
+        tmp_path / "data" / "smart_support.xlsx", index=False
+    )
+    monkeypatch.setattr(settings, "SCIBOX_OFFLINE", True)
+    monkeypatch.setattr(settings, "REDIS_CACHE_ENABLED", False)
+    monkeypatch.setattr(rag, "embedding_cache", None)
+    monkeypatch.setattr(rag, "rerank_cache", None)
+    monkeypatch.setattr(rag, "hint_cache", None)
+
+    registry = ComponentRegistry("RAG", rag._load_components)
+    assert registry.load() is not None
+    monkeypatch.setattr(rag, "rag_registry", registry)
+    return registry
+
+
+@pytest.mark.parametrize(
+    "query, route",
+    [
+        (L1_QUERY, "L1 Точное совпадение"),
+        (L2_QUERY, "L2 Гибридный поиск"),
+        (L3_QUERY, "L3 LLM rerank"),
+        (UNKNOWN_QUERY, "L3 LLM rerank (failed)"),
+    ],
+)
+async def test_async_hint_matches_sync_pipeline(registry, query, route):
+    hint = await rag.generate_hint_async(query)
+    sync_hint = await asyncio.to_thread(rag.generate_hint, query)
+
+    assert hint.route == sync_hint.route == route
+    assert hint.response == sync_hint.response
+    assert hint.confidence == sync_hint.confidence
+    assert hint.candidates_found == sync_hint.candidates_found
+
+
+async def test_async_hint_records_stage_timings(registry):
+    hint = await rag.generate_hint_async(L3_QUERY)
+
+    assert {"normalize", "l1", "embed", "search"} <= set(hint.stage_timings_ms)
+
+
+async def test_async_hints_are_bounded_by_max_concurrent_hints(registry, monkeypatch):
+    monkeypatch.setattr(settings, "RAG_MAX_CONCURRENT_HINTS", 2)
+    monkeypatch.setattr(rag, "hint_semaphore", asyncio.Semaphore(settings.RAG_MAX_CONCURRENT_HINTS))
+    embed_question_async = rag.embed_question_async
+    active = []
+    peak = []
+
+    async def slow_embed(question, components):
+        active.append(question)
+        peak.append(len(active))
+        try:
+            await asyncio.sleep(0.02)
+            return await embed_question_async(question, components)
+        finally:
+            active.remove(question)
+
+    monkeypatch.setattr(rag, "embed_question_async", slow_embed)
+    queries = [f"{L3_QUERY} {n}" for n in range(6)]
+
+    hints = await asyncio.gather(*(rag.generate_hint_async(query) for query in queries))
+
+    assert max(peak) == 2
+    assert len(peak) == 6
+    assert all(hint.route.startswith("L3") for hint in hints)
+
+
+async def test_async_hint_while_components_load(registry, monkeypatch):
+    monkeypatch.setattr(rag, "rag_registry", ComponentRegistry("RAG", lambda: None))
+    monkeypatch.setattr(rag.rag_registry, "start_background_load", lambda: None)
+
+    hint = await rag.generate_hint_async(L1_QUERY)
+
+    assert hint.route == "Warming up"
+
+
+def test_sync_rerank_budget_timeouts_leave_chat_circuit_closed(registry, monkeypatch):
+    breaker = CircuitBreaker("chat", failure_threshold=2, recovery_seconds=60)
+    monkeypatch.setattr(rag, "chat_breaker", breaker)
+    components = registry.components
+    client = components.client.with_options(timeout=0.001, max_retries=0)
+
+    def timed_out(**kwargs):
+        raise APITimeoutError(httpx.Request("POST", "http://scibox.test/v1/chat/completions"))
+
+    monkeypatch.setattr(client.chat.completions, "create", timed_out)
+    monkeypatch.setattr(components.client, "with_options", lambda **kwargs: client)
+    candidates = [
+        {"question": question, "template": template, "category": category, "subcategory": subcategory}
+        for question, template, category, subcategory in KB[:2]
+    ]
+
+    for _ in range(5):
+        with pytest.raises(RerankDeadlineExceeded):
+            rag.l3_llm_rerank(L3_QUERY, candidates, components, timeout=0.001)
+
+    assert breaker.state == CircuitState.CLOSED
+
+
+def parse_sse(body: str) -> list:
+    events = []
+    for block in body.split("\n\n"):
+        if not block:
+            continue
+        event_line, data_line = block.split("\n")
+        assert event_line.startswith("event: ") and data_line.startswith("data: ")
+        events.append((event_line[len("event: ") :], json.loads(data_line[len("data: ") :])))
+    return events
+
+
+@pytest.fixture
+async def client(registry):
+    app = FastAPI()
+    app.include_router(chat_router)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+async def test_stream_sends_candidates_before_hint(client):
+    response = await client.get("/chat/hint/stream/", params={"query": L3_QUERY})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(response.text)
+    assert [event for event, _ in events] == ["candidates", "hint"]
+    candidates, hint = events[0][1], events[1][1]
+    assert candidates["route"] == "L2 Семантический поиск"
+    assert candidates["candidates"][0]["response"] == "Подайте заявку на ипотеку на сайте банка."
+    assert {"embed", "search"} <= set(candidates["timings_ms"])
+    assert hint["route"] == "L3 LLM rerank"
+    assert hint["response"] == "Подайте заявку на ипотеку на сайте банка."
+    assert set(candidates["timings_ms"]) < set(hint["timings_ms"])
+
+
+async def test_stream_sends_only_hint_when_l3_is_not_needed(client):
+    response = await client.get("/chat/hint/stream/", params={"query": L1_QUERY})
+
+    events = parse_sse(response.text)
+    assert [event for event, _ in events] == ["hint"]
+    assert events[0][1]["route"] == "L1 Точное совпадение"
+
+
+class FakeAsyncRedis:
+    """In-memory stand-in for the commands the hint cache sends to Redis."""
+
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    async def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def set(self, key, value, ex=None):
+        self.commands.append((key, value))
+
+    async def execute(self):
+        for key, value in self.commands:
+            await self.redis.set(key, value)
+
+
+@pytest.fixture
+def redis(registry, monkeypatch):
+    redis = FakeAsyncRedis()
+    cache = HintCache(rag.Hint, ttl_seconds=60, lock_timeout_seconds=1, wait_seconds=1, async_redis_client=redis)
+    monkeypatch.setattr(rag, "hint_cache", cache)
+    return redis
+
+
+def cache_key(registry, query: str) -> str:
+    return HintCache.key(registry.components.index_version, rag.normalize_text(query))
+
+
+async def test_batch_keeps_input_order_across_routes(registry, redis, monkeypatch):
+    cached_query = "как закрыть кредитку"
+    await redis.set(
+        cache_key(registry, cached_query),
+        rag.Hint(response="Погасите задолженность.", confidence=90, route="L3 LLM rerank").model_dump_json(),
+    )
+    observed = []
+    monkeypatch.setattr(rag, "observe_stages", lambda route, timings: observed.append((route, set(timings))))
+
+    hints = await rag.generate_hints_batch([L3_QUERY, L1_QUERY, cached_query, L2_QUERY, UNKNOWN_QUERY])
+
+    assert [hint.route for hint in hints] == [
+        "L3 LLM rerank",
+        "L1 Точное совпадение",
+        "L3 LLM rerank",
+        "L2 Гибридный поиск",
+        "L3 LLM rerank (failed)",
+    ]
+    assert [hint.cached for hint in hints] == [False, False, True, False, False]
+    assert hints[0].response == "Подайте заявку на ипотеку на сайте банка."
+    assert hints[2].response == "Погасите задолженность."
+    # each hint reports the stages its query went through, shared ones are observed once
+    assert set(hints[1].stage_timings_ms) == {"l1"}
+    assert set(hints[2].stage_timings_ms) == {"l1", "hint_cache"}
+    assert set(hints[3].stage_timings_ms) == {"l1", "hint_cache", "embed", "search"}
+    assert {"l1", "hint_cache", "embed", "search"} < set(hints[0].stage_timings_ms)
+    assert observed == [("batch", {"l1", "hint_cache", "embed", "search"})]
+    # computed confident hints are shared with later requests
+    assert cache_key(registry, L3_QUERY) in redis.values
+    assert cache_key(registry, UNKNOWN_QUERY) not in redis.values
+
+
+async def test_batch_matches_single_query_pipeline(registry, monkeypatch):
+    monkeypatch.setattr(settings, "RAG_BATCH_CHUNK_SIZE", 2)
+    queries = [L3_QUERY, L1_QUERY, L2_QUERY, UNKNOWN_QUERY, "выписка по счету"]
+
+    hints = [hint async for hint in rag.iter_hints_batch(queries)]
+
+    for query, hint in zip(queries, hints, strict=True):
+        single = await rag.generate_hint_async(query)
+        assert (hint.route, hint.response, hint.confidence) == (single.route, single.response, single.confidence)
+
+
+async def test_empty_batch(client):
+    assert await rag.generate_hints_batch([]) == []
+
+    response = await client.post("/chat/hint/batch/", json={"queries": []})
+
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+async def test_batch_uses_lexical_search_while_embeddings_circuit_is_open(registry, monkeypatch):
+    breaker = CircuitBreaker("embeddings", failure_threshold=1, recovery_seconds=60)
+    breaker.record_failure()
+    monkeypatch.setattr(rag, "embeddings_breaker", breaker)
+
+    hints = await rag.generate_hints_batch([L1_QUERY, L3_QUERY])
+
+    assert [hint.route for hint in hints] == ["L1 Точное совпадение", rag.LEXICAL_ROUTE]
+    assert hints[1].response == "Подайте заявку на ипотеку на сайте банка."
+
+
+async def test_batch_endpoint_rejects_too_many_queries(client, monkeypatch):
+    monkeypatch.setattr(settings, "RAG_BATCH_MAX_QUERIES", 2)
+
+    response = await client.post("/chat/hint/batch/", json={"queries": [L1_QUERY, L2_QUERY, L3_QUERY]})
+
+    assert response.status_code == 413
+
+
+async def test_batch_endpoint_returns_json_list(client):
+    response = await client.post("/chat/hint/batch/", json={"queries": [L3_QUERY, L1_QUERY]})
+
+    assert response.status_code == 200
+    assert [hint["route"] for hint in response.json()] == ["L3 LLM rerank", "L1 Точное совпадение"]
+
+
+async def test_batch_endpoint_streams_ndjson(client, monkeypatch):
+    monkeypatch.setattr(settings, "RAG_BATCH_CHUNK_SIZE", 2)
+    queries = [L3_QUERY, L1_QUERY, L2_QUERY]
+
+    response = await client.post("/chat/hint/batch/", json={"queries": queries, "stream": True})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["index"] for line in lines] == [0, 1, 2]
+    assert [line["route"] for line in lines] == ["L3 LLM rerank", "L1 Точное совпадение", "L2 Гибридный поиск"]
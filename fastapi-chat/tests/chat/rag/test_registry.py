@@ -0,0 +1,90 @@
+import asyncio
+
+from src.chat.registry import ComponentRegistry, ComponentState
+
+
+def failing_loader():
+    raise RuntimeError("index is missing")
+
+
+def test_registry_is_idle_until_first_load():
+    registry = ComponentRegistry("test", lambda: {"index": [1, 2, 3]})
+
+    assert registry.state == ComponentState.IDLE
+    assert registry.get() is None
+
+
+def test_registry_load_makes_components_available():
+    registry = ComponentRegistry("test", lambda: {"index": [1, 2, 3]}, describe=lambda c: {"size": len(c["index"])})
+
+    registry.load()
+
+    assert registry.get() == {"index": [1, 2, 3]}
+    assert registry.status()["state"] == "ready"
+    assert registry.status()["size"] == 3
+    assert registry.status()["load_time_ms"] is not None
+
+
+def test_registry_reports_failed_load():
+    registry = ComponentRegistry("test", failing_loader)
+
+    assert registry.load() is None
+    assert registry.state == ComponentState.FAILED
+    assert registry.status()["error"] == "index is missing"
+    assert not registry.can_retry
+
+
+async def test_registry_background_load_does_not_block():
+    registry = ComponentRegistry("test", lambda: "components")
+
+    task = registry.start_background_load()
+    assert registry.state == ComponentState.LOADING
+    await asyncio.wait_for(task, timeout=1)
+
+    assert registry.get() == "components"
+    assert registry.start_background_load() is task
+
+
+def test_registry_reload_swaps_components_and_keeps_old_snapshot():
+    versions = iter(["v1", "v2"])
+    registry = ComponentRegistry("test", lambda: {"version": next(versions)})
+    registry.load()
+    in_flight = registry.get()
+
+    assert registry.reload()
+
+    assert registry.get() == {"version": "v2"}
+    assert in_flight == {"version": "v1"}
+    assert registry.status()["reloads"] == 1
+
+
+def test_registry_failed_reload_keeps_serving_current_components():
+    def reloader(previous):
+        raise RuntimeError("bundle is corrupt")
+
+    registry = ComponentRegistry("test", lambda: "v1", reloader=reloader)
+    registry.load()
+
+    assert not registry.reload()
+    assert registry.get() == "v1"
+    assert registry.state == ComponentState.READY
+    assert registry.status()["reload_error"] == "bundle is corrupt"
+
+
+async def test_registry_background_reload_passes_previous_components():
+    registry = ComponentRegistry("test", lambda: ["v1"], reloader=lambda previous: previous + ["v2"])
+    registry.load()
+
+    assert await asyncio.wait_for(registry.start_background_reload(), timeout=1)
+    assert registry.get() == ["v1", "v2"]
+
+
+async def test_registry_background_load_keeps_components_loaded_before_fork():
+    loads = []
+    registry = ComponentRegistry("test", lambda: loads.append(1) or "components")
+    registry.load()
+
+    await asyncio.wait_for(registry.start_background_load(), timeout=1)
+
+    assert registry.get() == "components"
+    assert loads == [1]